@@ -0,0 +1,204 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Protocol
+
+import numpy as np # type: ignore
+from dotenv import load_dotenv # type: ignore
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))  # per collection
+
+
+def answer_scope(retriever_filter: Optional[Dict], custom_system_prompt: Optional[str], k_retrieval: int,
+                 profile_id: str, conversation_history: str) -> str:
+    """
+    Key for the request settings and conversation a cached answer is only valid under.
+
+    Answers are generated with the profile's conversation history in the prompt,
+    so the profile and a hash of that history are part of the key: an answer is
+    never served to another profile, nor to a follow-up asked in a different
+    conversation state.
+    """
+    payload = json.dumps(
+        {"filter": retriever_filter or {}, "prompt": custom_system_prompt or "", "k": k_retrieval,
+         "profile": profile_id or "",
+         "history": hashlib.sha256((conversation_history or "").encode("utf-8")).hexdigest()},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationStore(Protocol):
+    """Per-collection generation counters shared by every worker process."""
+
+    def generation(self, collection: str) -> int: ...
+
+    def bump_generation(self, collection: str) -> int: ...
+
+
+class _Bucket:
+    """Entries of one (collection, scope) pair with their query vectors stacked for a single matmul."""
+
+    def __init__(self):
+        self.vectors: List[np.ndarray] = []
+        self.responses: List[Dict] = []
+        self.created: List[float] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.vstack(self.vectors)
+        return self._matrix
+
+    def add(self, vector: np.ndarray, response: Dict, created: float):
+        self.vectors.append(vector)
+        self.responses.append(response)
+        self.created.append(created)
+        self._matrix = None
+
+    def expire(self, cutoff: float, keep: int):
+        """Drop entries older than `cutoff` and trim to the newest `keep`."""
+        live = [i for i, created in enumerate(self.created) if created >= cutoff][-keep:]
+        if len(live) != len(self.created):
+            self.vectors = [self.vectors[i] for i in live]
+            self.responses = [self.responses[i] for i in live]
+            self.created = [self.created[i] for i in live]
+            self._matrix = None
+
+
+class SemanticAnswerCache:
+    """
+    Per-collection cache of RAG answers looked up by query similarity.
+
+    A new query is a hit when its embedding lies within `threshold` cosine
+    similarity of a cached query asked under the same filter, system prompt and
+    k. Entries expire after `ttl` seconds, and a collection's entries are
+    dropped whenever documents are added to or removed from it.
+
+    Entries live in each worker's memory, but a collection's generation lives in
+    `generations` (the SQLite document index by default), which every worker
+    reads on lookup: a change made through any worker bumps it, and the other
+    workers drop their entries for that collection on their next lookup. An
+    answer computed under an older generation (the documents changed while it
+    was being generated) is not stored.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, ttl: float = ANSWER_CACHE_TTL,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES, generations: Optional[GenerationStore] = None):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._generation_store = generations
+        self._buckets: Dict[str, Dict[str, _Bucket]] = {}
+        self._generations: Dict[str, int] = {}  # generation the local entries of each collection belong to
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "stale_stores": 0, "invalidations": 0}
+
+    def generation(self, collection: str) -> int:
+        """Current shared generation of a collection; read it before looking up and pass it to `store`."""
+        return self._store().generation(collection)
+
+    def lookup(self, collection: str, scope: str, embedding: List[float],
+               generation: Optional[int] = None) -> Optional[Dict]:
+        """Return a copy of the closest cached response above the threshold, if any."""
+        if generation is None:
+            generation = self.generation(collection)
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._sync(collection, generation)
+            bucket = self._buckets.get(collection, {}).get(scope)
+            if bucket is not None:
+                bucket.expire(time.time() - self.ttl, self.max_entries)
+            if bucket is None or not bucket.vectors:
+                self._stats["misses"] += 1
+                return None
+
+            similarities = bucket.matrix() @ vector
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            response = copy.deepcopy(bucket.responses[best])
+
+        response["answer_cache_similarity"] = round(similarity, 4)
+        return response
+
+    def store(self, collection: str, scope: str, embedding: List[float], response: Dict,
+              generation: Optional[int] = None):
+        """Cache a response, unless the collection was invalidated since `generation` was read."""
+        vector = self._normalize(embedding)
+        current = self.generation(collection)
+        with self._lock:
+            if generation is not None and generation != current:
+                self._stats["stale_stores"] += 1
+                return
+            self._sync(collection, current)
+            bucket = self._buckets.setdefault(collection, {}).setdefault(scope, _Bucket())
+            bucket.add(vector, copy.deepcopy(response), time.time())
+            bucket.expire(time.time() - self.ttl, self.max_entries)
+            self._stats["stores"] += 1
+
+    def invalidate(self, collection: str, generation: Optional[int] = None):
+        """
+        Forget every cached answer for a collection (its documents changed), in every
+        worker. Bumps the collection generation unless the caller already did.
+        """
+        if generation is None:
+            generation = self._store().bump_generation(collection)
+        with self._lock:
+            self._sync(collection, generation)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "collections": len(self._buckets),
+                "entries": sum(len(b.vectors) for buckets in self._buckets.values() for b in buckets.values()),
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl
+            }
+
+    def _store(self) -> GenerationStore:
+        if self._generation_store is None:
+            from .document_index import get_document_index
+            self._generation_store = get_document_index()
+        return self._generation_store
+
+    def _sync(self, collection: str, generation: int):
+        # Caller holds self._lock; drops entries built under another generation
+        if self._generations.get(collection) != generation:
+            self._generations[collection] = generation
+            if self._buckets.pop(collection, None) is not None:
+                self._stats["invalidations"] += 1
+                logger.info(f"Invalidated answer cache for collection '{collection}' (generation {generation})")
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+_answer_cache: Optional[SemanticAnswerCache] = SemanticAnswerCache() if ANSWER_CACHE_ENABLED else None
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Return the process-wide answer cache, or None when disabled."""
+    return _answer_cache
+
+def invalidate_answer_cache(collection: str, generation: Optional[int] = None):
+    if _answer_cache is not None:
+        _answer_cache.invalidate(collection, generation)
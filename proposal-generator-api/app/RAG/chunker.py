@@ -0,0 +1,174 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv # type: ignore
+
+load_dotenv()
+
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "64"))
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "512"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+
+_HEADING = re.compile(r"#{1,6} \S")
+_WORD = re.compile(r"\S+")
+_PIECE = re.compile(r"\S+\s*")
+
+
+def _word_tokens(word: str) -> int:
+    # Roughly four characters per token for English text with subword tokenizers
+    return max(1, (len(word) + 3) // 4)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, additive token estimate used for chunk budgets."""
+    return sum(_word_tokens(m.group()) for m in _WORD.finditer(text))
+
+
+class MarkdownChunker:
+    """
+    Single-pass, incremental markdown chunker with token budgets.
+
+    Text is fed in any number of pieces (e.g. one page at a time) and complete
+    chunks are returned as soon as they are known. Chunks follow heading
+    boundaries where possible:
+
+    - consecutive sections are merged while they fit in `max_tokens`;
+    - a section that would leave a chunk under `min_tokens` is merged into a
+      neighbour instead of being dropped;
+    - a section over `max_tokens` is split into sliding windows of at most
+      `max_tokens` tokens that overlap by `overlap_tokens`, each repeating the
+      section heading.
+
+    Every line is scanned once and the last emitted chunk is held back one step
+    so a small trailing section can still be merged into it.
+    """
+
+    def __init__(self, source: str, min_tokens: int = CHUNK_MIN_TOKENS,
+                 max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        if max_tokens <= 0 or not 0 <= min_tokens <= max_tokens:
+            raise ValueError("Chunk budgets must satisfy 0 <= min_tokens <= max_tokens and max_tokens > 0")
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens must be >= 0 and smaller than max_tokens")
+        self.source = source
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+        self._partial = ""  # incomplete trailing line of the last fed piece
+        self._heading: Optional[str] = None
+        self._heading_tokens = 0
+        self._lines: List[str] = []
+        self._body_tokens = 0
+        self._pending: List[str] = []  # whole sections waiting to be emitted together
+        self._pending_tokens = 0
+        self._held: Optional[Tuple[str, int]] = None
+
+    def feed(self, markdown: str) -> List[Dict]:
+        """Consume more markdown and return the chunks completed by it."""
+        out: List[Dict] = []
+        lines = (self._partial + markdown).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line, out)
+        return out
+
+    def flush(self) -> List[Dict]:
+        """Finish the document and return the remaining chunks."""
+        out: List[Dict] = []
+        if self._partial:
+            self._line(self._partial, out)
+            self._partial = ""
+        self._close_section(out)
+        if self._pending:
+            text, tokens = "\n\n".join(self._pending), self._pending_tokens
+            self._pending, self._pending_tokens = [], 0
+            if tokens < self.min_tokens and self._held and self._held[1] + tokens <= self.max_tokens:
+                self._held = (f"{self._held[0]}\n\n{text}", self._held[1] + tokens)
+            else:
+                self._emit(text, tokens, out)
+        if self._held:
+            out.append(self._chunk(self._held[0]))
+            self._held = None
+        return out
+
+    def _chunk(self, text: str) -> Dict:
+        return {"text": text, "source": self.source}
+
+    def _line(self, line: str, out: List[Dict]):
+        if _HEADING.match(line):
+            self._close_section(out)
+            self._heading = line.strip()
+            self._heading_tokens = estimate_tokens(self._heading)
+        else:
+            self._lines.append(line)
+            self._body_tokens += estimate_tokens(line)
+
+    def _close_section(self, out: List[Dict]):
+        heading, body = self._heading, "\n".join(self._lines).strip()
+        tokens = self._heading_tokens + self._body_tokens
+        self._heading, self._heading_tokens, self._lines, self._body_tokens = None, 0, [], 0
+        if body or heading:
+            self._add_section(heading, body, tokens, out)
+
+    def _add_section(self, heading: Optional[str], body: str, tokens: int, out: List[Dict]):
+        text = f"{heading}\n\n{body}" if heading and body else (heading or body)
+        if self._pending_tokens + tokens <= self.max_tokens:
+            self._pending.append(text)
+            self._pending_tokens += tokens
+            return
+
+        lead, lead_tokens = "\n\n".join(self._pending), self._pending_tokens
+        self._pending, self._pending_tokens = [], 0
+        if lead and lead_tokens < self.min_tokens and self._held and self._held[1] + lead_tokens <= self.max_tokens:
+            # Too small to stand alone: fold into the previous chunk
+            self._held = (f"{self._held[0]}\n\n{lead}", self._held[1] + lead_tokens)
+            lead, lead_tokens = "", 0
+        elif lead and lead_tokens >= self.min_tokens:
+            self._emit(lead, lead_tokens, out)
+            lead, lead_tokens = "", 0
+
+        if lead_tokens + tokens <= self.max_tokens:
+            self._pending = [f"{lead}\n\n{text}" if lead else text]
+            self._pending_tokens = lead_tokens + tokens
+        else:
+            self._split(heading, body, lead, lead_tokens, out)
+
+    def _split(self, heading: Optional[str], body: str, lead: str, lead_tokens: int, out: List[Dict]):
+        """Emit `body` as overlapping windows, each carrying the heading; `lead` opens the first one."""
+        pieces = [m.group() for m in _PIECE.finditer(body)]
+        weights = [_word_tokens(piece.rstrip()) for piece in pieces]
+        prefix = f"{heading}\n\n" if heading else ""
+        heading_tokens = estimate_tokens(heading) if heading else 0
+
+        start, count = 0, len(pieces)
+        while start < count:
+            budget = self.max_tokens - heading_tokens - (lead_tokens if start == 0 else 0)
+            end, total = start, 0
+            while end < count and (total + weights[end] <= budget or end == start):
+                total += weights[end]
+                end += 1
+            window = prefix + "".join(pieces[start:end]).rstrip()
+            if start == 0 and lead:
+                window, total = f"{lead}\n\n{window}", total + lead_tokens
+            self._emit(window, total + heading_tokens, out)
+            if end >= count:
+                break
+            # Step back `overlap_tokens` worth of words, always moving forward
+            back, overlap = end, 0
+            while back > start + 1 and overlap + weights[back - 1] <= self.overlap_tokens:
+                back -= 1
+                overlap += weights[back]
+            start = back
+
+    def _emit(self, text: str, tokens: int, out: List[Dict]):
+        if self._held:
+            out.append(self._chunk(self._held[0]))
+        self._held = (text, tokens)
+
+
+def chunk_markdown(markdown: str, source: str, min_tokens: int = CHUNK_MIN_TOKENS,
+                   max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Dict]:
+    """Chunk a whole markdown document in one pass."""
+    chunker = MarkdownChunker(source, min_tokens, max_tokens, overlap_tokens)
+    return chunker.feed(markdown) + chunker.flush()
@@ -0,0 +1,140 @@
+import os
+import re
+import logging
+from typing import Dict, List, Set
+
+from dotenv import load_dotenv # type: ignore
+from langchain_core.documents import Document # type: ignore
+
+from .chunker import estimate_tokens
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))  # history + documents
+CONTEXT_HISTORY_SHARE = float(os.getenv("CONTEXT_HISTORY_SHARE", "0.25"))  # max share of the budget for history
+CONTEXT_DEDUPE_THRESHOLD = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.8"))  # shingle overlap that drops a chunk
+CONTEXT_MIN_TRUNCATED_TOKENS = 48  # a partially fitting chunk is only kept if this much of it fits
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORDS = re.compile(r"\w+")
+_SHINGLE = 5
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Longest prefix of `text` that ends at a sentence boundary and fits in `budget` tokens."""
+    if estimate_tokens(text) <= budget:
+        return text
+    kept, used, position = [], 0, 0
+    for match in _SENTENCE_END.finditer(text + "\n"):
+        sentence = text[position:match.start()]
+        tokens = estimate_tokens(sentence)
+        if used + tokens > budget:
+            break
+        kept.append(text[position:match.end()])
+        used += tokens
+        position = match.end()
+    if kept:
+        return "".join(kept).rstrip()
+    # Not even one sentence fits: cut at a word boundary
+    words, used = [], 0
+    for word in text.split():
+        used += estimate_tokens(word)
+        if used > budget:
+            break
+        words.append(word)
+    return " ".join(words) + " ..." if words else ""
+
+
+def _truncate_history(history: str, budget: int) -> str:
+    """Keep the most recent history lines that fit; the newest line is truncated if it alone is too long."""
+    lines = history.splitlines()
+    kept, used = [], 0
+    for line in reversed(lines):
+        tokens = estimate_tokens(line)
+        if used + tokens > budget:
+            if not kept:
+                kept.append(truncate_to_tokens(line, budget))
+            break
+        kept.append(line)
+        used += tokens
+    return "\n".join(reversed(kept))
+
+
+def _shingles(text: str) -> Set[int]:
+    words = _WORDS.findall(text.lower())
+    if len(words) < _SHINGLE:
+        return {hash(tuple(words))}
+    return {hash(tuple(words[i:i + _SHINGLE])) for i in range(len(words) - _SHINGLE + 1)}
+
+
+def _relevance_order(documents: List[Document]) -> List[Document]:
+    # Retrieval returns documents best first; a rerank score, when present, takes precedence
+    if all("rerank_score" in doc.metadata for doc in documents):
+        return sorted(documents, key=lambda doc: doc.metadata["rerank_score"], reverse=True)
+    return list(documents)
+
+
+def pack_context(documents: List[Document], history: str, budget: int = CONTEXT_TOKEN_BUDGET,
+                 history_share: float = CONTEXT_HISTORY_SHARE) -> Dict:
+    """
+    Fit conversation history and retrieved documents into a prompt token budget.
+
+    History gets at most `history_share` of the budget, keeping its most recent
+    lines; whatever it leaves unused goes to documents. Documents are taken in
+    relevance order, skipping chunks whose word shingles are mostly covered by
+    chunks already taken (e.g. overlapping windows of one section); the first
+    chunk that does not fit is truncated at a sentence boundary and the rest are
+    dropped.
+
+    Returns:
+        Dictionary with the packed "documents", their joined "context" text, the
+        trimmed "history" and a "usage" summary of tokens per section
+    """
+    history = history or ""
+    history_budget = int(budget * max(0.0, min(1.0, history_share)))
+    packed_history = _truncate_history(history, history_budget) if estimate_tokens(history) > history_budget else history
+    history_tokens = estimate_tokens(packed_history)
+
+    remaining = budget - history_tokens
+    packed: List[Document] = []
+    seen: Set[int] = set()
+    duplicates = dropped = truncated = 0
+    for doc in _relevance_order(documents):
+        shingles = _shingles(doc.page_content)
+        if shingles and len(shingles & seen) >= CONTEXT_DEDUPE_THRESHOLD * len(shingles):
+            duplicates += 1
+            continue
+        tokens = estimate_tokens(doc.page_content)
+        if tokens <= remaining:
+            packed.append(doc)
+        elif remaining >= CONTEXT_MIN_TRUNCATED_TOKENS and not truncated:
+            text = truncate_to_tokens(doc.page_content, remaining)
+            if not text:
+                dropped += 1
+                continue
+            packed.append(Document(page_content=text, metadata={**doc.metadata, "truncated": True}))
+            truncated += 1
+            tokens = estimate_tokens(text)
+        else:
+            dropped += 1
+            continue
+        remaining -= tokens
+        seen |= shingles
+
+    document_tokens = budget - history_tokens - remaining
+    return {
+        "documents": packed,
+        "context": "\n\n".join(doc.page_content for doc in packed),
+        "history": packed_history,
+        "usage": {
+            "budget": budget,
+            "history_tokens": history_tokens,
+            "history_truncated": packed_history != history,
+            "document_tokens": document_tokens,
+            "documents_used": len(packed),
+            "documents_deduplicated": duplicates,
+            "documents_dropped": dropped,
+            "documents_truncated": truncated
+        }
+    }
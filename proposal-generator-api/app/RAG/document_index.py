@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional
+
+from dotenv import load_dotenv # type: ignore
+
+from .vectorstore import CHROMA_PERSIST_DIRECTORY
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Kept next to the Chroma data it describes, so a fresh store starts with a fresh index
+DOCUMENT_INDEX_PATH = os.getenv(
+    "DOCUMENT_INDEX_PATH", os.path.join(CHROMA_PERSIST_DIRECTORY, "document_index.sqlite3")
+)
+
+
+class DocumentIndex:
+    """
+    Local index of ingested documents keyed by (collection, content hash).
+
+    Lets an upload of a PDF that is already stored in a collection resolve to
+    the existing document id without parsing, embedding or storing it again.
+    Entries are written once ingestion completes and removed when the document
+    or its collection is deleted. The same file holds a generation counter per
+    collection, bumped on every change, which worker processes compare to
+    notice changes made by another worker, and the progress of ingestion jobs
+    so any worker can report on a job another worker is running.
+    """
+
+    def __init__(self, path: str = DOCUMENT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "duplicates": 0, "stale": 0, "writes": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "collection TEXT NOT NULL, content_hash TEXT NOT NULL, document_id TEXT NOT NULL, "
+            "filename TEXT, chunks INTEGER, created_at REAL NOT NULL, "
+            "PRIMARY KEY (collection, content_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_id ON documents(collection, document_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations (collection TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "document_id TEXT PRIMARY KEY, collection TEXT NOT NULL, content_hash TEXT, "
+            "status TEXT NOT NULL, record TEXT NOT NULL, updated_at REAL NOT NULL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_hash ON jobs(collection, content_hash)")
+        self._conn.commit()
+
+    def lookup(self, collection: str, content_hash: str) -> Optional[Dict]:
+        """Return the stored document with this content hash in `collection`, if any."""
+        with self._lock:
+            self._stats["lookups"] += 1
+            row = self._conn.execute(
+                "SELECT document_id, filename, chunks FROM documents WHERE collection = ? AND content_hash = ?",
+                (collection, content_hash)
+            ).fetchone()
+            if row is None:
+                return None
+            self._stats["duplicates"] += 1
+        return {"document_id": row[0], "filename": row[1], "chunks": row[2]}
+
+    def add(self, collection: str, content_hash: str, document_id: str, filename: str, chunks: int) -> bool:
+        """
+        Record a stored document. An entry for the same content owned by another
+        document is kept, so its id stays the one duplicates resolve to; returns
+        False in that case.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(collection, content_hash) DO UPDATE SET "
+                "filename = excluded.filename, chunks = excluded.chunks, created_at = excluded.created_at "
+                "WHERE documents.document_id = excluded.document_id",
+                (collection, content_hash, document_id, filename, chunks, time.time())
+            )
+            self._conn.commit()
+            if not cursor.rowcount:
+                return False
+            self._stats["writes"] += 1
+        return True
+
+    def remove_document(self, collection: str, document_id: str, stale: bool = False):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM documents WHERE collection = ? AND document_id = ?", (collection, document_id)
+            )
+            self._conn.commit()
+            if stale:
+                self._stats["duplicates"] -= 1
+                self._stats["stale"] += 1
+
+    def remove_collection(self, collection: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE collection = ?", (collection,))
+            self._conn.commit()
+
+    def generation(self, collection: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT generation FROM generations WHERE collection = ?", (collection,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_generation(self, collection: str) -> int:
+        """Mark a collection as changed; returns its new generation."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO generations VALUES (?, 1) "
+                "ON CONFLICT(collection) DO UPDATE SET generation = generation + 1", (collection,)
+            )
+            row = self._conn.execute("SELECT generation FROM generations WHERE collection = ?", (collection,)).fetchone()
+            self._conn.commit()
+        return row[0]
+
+    def save_job(self, record: Dict):
+        """Write the latest snapshot of an ingestion job (see IngestionJob.snapshot)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (record["document_id"], record["collection_name"], record["content_hash"], record["status"],
+                 json.dumps(record), record["updated_at"], record["finished_at"])
+            )
+            self._conn.commit()
+
+    def load_job(self, document_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM jobs WHERE document_id = ?", (document_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def active_job(self, collection: str, content_hash: str, updated_since: float) -> Optional[Dict]:
+        """Return a queued or running job for this content, ignoring jobs not updated since `updated_since`."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM jobs WHERE collection = ? AND content_hash = ? "
+                "AND status IN ('queued', 'processing') AND updated_at >= ? ORDER BY updated_at DESC LIMIT 1",
+                (collection, content_hash, updated_since)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def prune_jobs(self, finished_before: float):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (finished_before,))
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            return {**self._stats, "entries": entries}
+
+
+_index: Optional[DocumentIndex] = None
+_index_lock = threading.Lock()
+
+def get_document_index() -> DocumentIndex:
+    """Return the process-wide document index, opening it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DocumentIndex()
+    return _index
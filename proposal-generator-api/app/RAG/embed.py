@@ -1,19 +1,32 @@
 import os
-import re
+import time
+import hashlib
 import logging
-from typing import List, Dict
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Dict, Optional
 from datetime import datetime
 
 import pymupdf4llm # type: ignore
 import pymupdf # type: ignore
-import chromadb # type: ignore
 import google.generativeai as genai # type: ignore
 from dotenv import load_dotenv # type: ignore
 from fastapi import HTTPException # type: ignore
 
+from .embedding_engine import EMBEDDING_BACKEND, EMBEDDING_BACKENDS, get_embedding_engine
+from .embedding_cache import normalize_text
+from .document_index import get_document_index
+from . import vectorstore, lexical_index
+from .answer_cache import invalidate_answer_cache
+from .pdf_parser import get_pdf_parser
+from .chunker import MarkdownChunker, chunk_markdown
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "128"))  # chunks embedded and inserted per step
+INGEST_PIPELINE = os.getenv("INGEST_PIPELINE", "true").lower() in ("1", "true", "yes")  # embed batch N+1 while storing N
+
 # Configure Google API
 google_api_key = os.getenv("GOOGLE_API_KEY", "")
 if google_api_key:
@@ -21,85 +34,69 @@ if google_api_key:
 else:
     logger.warning("GOOGLE_API_KEY not set. Google AI features will be disabled.")
 
-def read_pdf(file_path: str, source: str = None) -> List[Dict]:
+def read_pdf(file_path: str, source: str = None, progress: Optional[Callable[..., None]] = None) -> List[Dict]:
     """
     Read a PDF file and convert it to markdown chunks.
     
     Args:
         file_path: Path to the PDF file
         source: Original filename or source identifier
+        progress: Optional callback receiving counters (pages_total, pages_parsed)
         
     Returns:
         List of dictionaries containing text chunks and metadata
     """
-    try:
-        # Convert PDF to markdown
-        markdown_text = pymupdf4llm.to_markdown(file_path)
-        if not markdown_text.strip():
-            raise HTTPException(status_code=422, detail="No text content could be extracted from the PDF.")
-        
-        # Create markdown document with source information
-        markdown_docs = [{
-            "filename": source or os.path.basename(file_path),
-            "markdown": markdown_text
-        }]
-        
-        # Chunk the markdown text
-        chunks = chunk_by_headings(markdown_docs)
-        
-        if not chunks:
-            raise HTTPException(status_code=422, detail="No chunks could be created from the PDF content.")
-        
-        logger.info(f"Successfully processed PDF: {len(chunks)} chunks created")
-        return chunks
-        
-    except Exception as e:
-        logger.error(f"Error reading PDF {file_path}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+    chunks = list(iter_pdf_chunks(file_path, source=source, progress=progress))
+    logger.info(f"Successfully processed PDF: {len(chunks)} chunks created")
+    return chunks
 
-# def chunk_by_headings(markdown_docs: List[Dict]) -> List[Dict]:
-#     markdown_docs: List[Dict], fallback_chunk_size: int = 300) -> List[Dict]
-#     """
-#     Split markdown documents into chunks based on headings.
-    
-#     Args:
-#         markdown_docs: List of markdown documents with filename and content
-        
-#     Returns:
-#         List of text chunks with source metadata
-#     """
-#     chunks = []
+def iter_pdf_chunks(file_path: str, source: str = None,
+                    progress: Optional[Callable[..., None]] = None) -> Iterator[Dict]:
+    """
+    Stream a PDF as chunks while it is being parsed.
 
-#     for doc in markdown_docs:
-#         sections = re.split(r"(#+ .+)", doc["markdown"])  # capture headings
-        
-#         for i in range(1, len(sections), 2):
-#             heading = sections[i].strip()
-#             body = sections[i + 1].strip()
-#             section_text = f"{heading}\n\n{body}"
-
-#             chunks.append({
-#                 "text": section_text,
-#                 "source": doc["filename"]
-#             })
-    
-#     if not chunks:
-#         if not markdown_docs:
-#             raise HTTPException(status_code=422, detail="No markdown documents provided for chunking.")
-#         else:
-#             raise HTTPException(status_code=422, detail="No actionable chunks created from the document (no headings found).")
+    Markdown arrives from the parser one page range at a time and is fed to an
+    incremental MarkdownChunker, so chunks are yielded as soon as they are
+    complete and the whole document is never held in memory.
 
-#     return chunks
+    Args:
+        file_path: Path to the PDF file
+        source: Original filename or source identifier
+        progress: Optional callback receiving counters (pages_total, pages_parsed)
 
+    Yields:
+        Dictionaries containing text chunks and metadata
+    """
+    chunker = MarkdownChunker(source or os.path.basename(file_path))
+    produced = 0
+    try:
+        for markdown in get_pdf_parser().iter_markdown(file_path, progress=progress):
+            for chunk in chunker.feed(markdown):
+                produced += 1
+                yield chunk
+        for chunk in chunker.flush():
+            produced += 1
+            yield chunk
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reading PDF {file_path}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
+    if not produced:
+        raise HTTPException(status_code=422, detail="No text content could be extracted from the PDF.")
 
 def chunk_by_headings(markdown_docs: List[Dict], fallback_chunk_size: int = 300) -> List[Dict]:
     """
-    Chunk markdown documents by headings if available, else by paragraphs.
+    Chunk markdown documents along headings within the configured token budgets.
+
+    Small sections are merged into their neighbours and oversized ones are split
+    into overlapping windows (see MarkdownChunker). Budgets come from
+    CHUNK_MIN_TOKENS, CHUNK_MAX_TOKENS and CHUNK_OVERLAP_TOKENS.
 
     Args:
         markdown_docs: List of markdown documents with filename and markdown.
-        fallback_chunk_size: Approximate number of words per fallback chunk.
+        fallback_chunk_size: Unused; kept for backward compatibility.
 
     Returns:
         List of chunks with source metadata.
@@ -107,35 +104,7 @@ def chunk_by_headings(markdown_docs: List[Dict], fallback_chunk_size: int = 300)
     chunks = []
 
     for doc in markdown_docs:
-        source = doc["filename"]
-        markdown = doc["markdown"].strip()
-
-        # Try heading-based split
-        sections = re.split(r"(#+ .+)", markdown)
-        if len(sections) > 1:
-            for i in range(1, len(sections), 2):
-                heading = sections[i].strip()
-                body = sections[i + 1].strip() if i + 1 < len(sections) else ""
-                if len(body.split()) < 10:
-                    continue  # skip very short sections
-                section_text = f"{heading}\n\n{body}"
-                chunks.append({"text": section_text, "source": source})
-        else:
-            # Fallback: paragraph chunking
-            words = markdown.split()
-            chunk = []
-            for word in words:
-                chunk.append(word)
-                if len(chunk) >= fallback_chunk_size:
-                    chunk_text = " ".join(chunk).strip()
-                    if chunk_text:
-                        chunks.append({"text": chunk_text, "source": source})
-                    chunk = []
-            # Add remaining chunk
-            if chunk:
-                chunk_text = " ".join(chunk).strip()
-                if chunk_text:
-                    chunks.append({"text": chunk_text, "source": source})
+        chunks.extend(chunk_markdown(doc["markdown"], doc["filename"]))
 
     if not chunks:
         raise HTTPException(status_code=422, detail="Unable to chunk the document meaningfully.")
@@ -143,41 +112,180 @@ def chunk_by_headings(markdown_docs: List[Dict], fallback_chunk_size: int = 300)
     return chunks
 
 
-def create_google_embeddings(texts: List[str], model: str = "text-embedding-004") -> List[List[float]]:
+def create_google_embeddings(texts: List[str], model: str = "text-embedding-004",
+                             progress: Optional[Callable[[int], None]] = None,
+                             backend: Optional[str] = None) -> List[List[float]]:
     """
     Create embeddings for text chunks using Google's embedding model.
+
+    Chunks are packed into batch requests and a bounded number of batches is
+    dispatched concurrently by the shared embedding engine.
     
     Args:
         texts: List of text strings to embed
         model: Google embedding model to use
+        progress: Optional callback receiving the number of chunks embedded so far
+        backend: Embedding backend to use instead of EMBEDDING_BACKEND (e.g. "local")
         
     Returns:
         List of embedding vectors
     """
-    if not google_api_key:
+    try:
+        engine = get_embedding_engine(backend)
+    except Exception as e:
+        # e.g. the local backend without sentence-transformers or its model
         raise HTTPException(
-            status_code=500, 
-            detail="Google API key not configured. Cannot create embeddings."
+            status_code=500,
+            detail=f"Embedding backend '{backend or EMBEDDING_BACKEND}' could not be loaded: {e}. Cannot create embeddings."
         )
-    
-    embeddings = []
-    for i, text in enumerate(texts):
-        try:
-            result = genai.embed_content(
-                model=f"models/{model}",
-                content=text,
-                task_type="retrieval_document"
-            )
-            embeddings.append(result['embedding'])
-        except Exception as e:
-            logger.error(f"Error embedding chunk {i}: {e}")
-            # Use zero vector as fallback
-            embeddings.append([0.0] * 768)
+    if not engine.backend.is_available():
+        raise HTTPException(
+            status_code=500,
+            detail=f"{engine.backend.unavailable_reason()}. Cannot create embeddings."
+        )
+    if engine.backend.name == "google" and model != engine.backend.model:
+        logger.warning(f"Requested embedding model '{model}' differs from engine model '{engine.backend.model}'")
+
+    # No zero-vector fallback: a stored placeholder would carry a valid chunk_hash
+    # and be copied into later documents, so a failed batch fails the ingestion
+    try:
+        embeddings = engine.embed(texts, task_type="retrieval_document", progress=progress)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Embedding failed after retries: {e}")
     
     logger.info(f"Created embeddings for {len(texts)} text chunks")
     return embeddings
 
-def store_chunks_in_chromadb(chunks: List[Dict], collection_name: str, document_id: str):
+def chunk_content_hash(text: str) -> str:
+    """sha256 of a chunk's normalised text, stored as `chunk_hash` chunk metadata."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+def _stored_embeddings(collection, chunk_hashes: List[str], batch_size: int = 500) -> Dict[str, List[float]]:
+    """Map chunk hashes already present in `collection` to their stored embeddings."""
+    unique = list(dict.fromkeys(chunk_hashes))
+    found: Dict[str, List[float]] = {}
+    for start in range(0, len(unique), batch_size):
+        batch = unique[start:start + batch_size]
+        result = collection.get(where={"chunk_hash": {"$in": batch}}, include=["embeddings", "metadatas"])
+        for metadata, embedding in zip(result["metadatas"], result["embeddings"]):
+            # Zero vectors are placeholders written by older versions after failed batches
+            if any(embedding):
+                found.setdefault(metadata["chunk_hash"], [float(x) for x in embedding])
+    return found
+
+def document_exists(collection_name: str, document_id: str) -> bool:
+    """Whether `collection_name` holds any chunks for `document_id`."""
+    try:
+        return vectorstore.with_collection(
+            collection_name, lambda collection: bool(collection.get(where={"file_id": document_id}, limit=1, include=[])["ids"])
+        )
+    except ValueError:
+        return False
+
+def find_duplicate_document(collection_name: str, content_hash: str) -> Optional[Dict]:
+    """
+    Return the document already stored in `collection_name` with this file content
+    hash, or None. Index entries whose chunks are gone from Chroma are dropped.
+    """
+    index = get_document_index()
+    existing = index.lookup(collection_name, content_hash)
+    if existing is None:
+        return None
+    if document_exists(collection_name, existing["document_id"]):
+        return existing
+    index.remove_document(collection_name, existing["document_id"], stale=True)
+    return None
+
+def _collection_changed(collection_name: str):
+    """Bump the shared generation of a collection whose chunks changed; caches in every worker follow it."""
+    generation = get_document_index().bump_generation(collection_name)
+    lexical_index.note_generation(collection_name, generation)
+    invalidate_answer_cache(collection_name, generation)
+
+def _chunk_records(chunks: List[Dict], document_id: str, occurrences: Optional[Dict[str, int]] = None):
+    """
+    Texts, chunk hashes, metadatas and ids for a document's chunks.
+
+    Ids are keyed by content (`{document_id}_{hash prefix}_{occurrence}`), so
+    inserting or removing a section leaves the ids of every other chunk alone;
+    repeated sections are told apart by their occurrence in the document. Pass
+    the same `occurrences` dict for consecutive batches of one document.
+    """
+    occurrences = {} if occurrences is None else occurrences
+    texts = [chunk["text"] for chunk in chunks]
+    chunk_hashes = [chunk_content_hash(text) for text in texts]
+    metadatas = [{
+        "source": chunk.get("source", "unknown"),
+        "file_id": document_id,
+        "chunk_hash": chunk_hash,
+        "upload_timestamp": datetime.utcnow().isoformat()
+    } for chunk, chunk_hash in zip(chunks, chunk_hashes)]
+    ids = []
+    for chunk_hash in chunk_hashes:
+        occurrence = occurrences.get(chunk_hash, 0)
+        occurrences[chunk_hash] = occurrence + 1
+        ids.append(f"{document_id}_{chunk_hash[:16]}_{occurrence}")
+    return texts, chunk_hashes, metadatas, ids
+
+def _resolve_embeddings(collection, texts: List[str], chunk_hashes: List[str],
+                        known: Optional[Dict[str, List[float]]] = None,
+                        progress: Optional[Callable[..., None]] = None,
+                        backend: Optional[str] = None):
+    """
+    Embeddings for `texts`, reusing `known` vectors and those of identical
+    sections already stored in `collection`; only the remainder is embedded.
+
+    Returns:
+        Tuple of (embeddings aligned with `texts`, number of reused vectors)
+    """
+    stored = dict(known or {})
+    missing = [h for h in chunk_hashes if h not in stored]
+    if missing:
+        stored.update(_stored_embeddings(collection, missing))
+    pending = [i for i, chunk_hash in enumerate(chunk_hashes) if chunk_hash not in stored]
+    reused = len(texts) - len(pending)
+    if progress:
+        progress(chunks_embedded=reused, chunks_reused=reused)
+    fresh = create_google_embeddings(
+        [texts[i] for i in pending],
+        progress=(lambda done: progress(chunks_embedded=reused + done)) if progress else None,
+        backend=backend
+    ) if pending else []
+    fresh_by_index = dict(zip(pending, fresh))
+    embeddings = [fresh_by_index[i] if i in fresh_by_index else stored[chunk_hashes[i]] for i in range(len(texts))]
+    return embeddings, reused
+
+def _open_for_ingest(collection_name: str, embedding_backend: Optional[str] = None):
+    """
+    Open (or create) a collection for writing and return it with its embedding backend.
+
+    A new collection records the backend and model in its metadata, so queries
+    and later uploads embed with the same model. Asking for a different backend
+    than an existing collection was built with is a 409.
+    """
+    if embedding_backend and embedding_backend not in EMBEDDING_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"Unknown embedding backend '{embedding_backend}'.")
+    # Checked against Chroma: another worker may have deleted or re-created the collection
+    recorded = vectorstore.collection_metadata(collection_name, check=True)
+    if recorded is not None:
+        backend = recorded.get("embedding_backend") or EMBEDDING_BACKEND
+        if embedding_backend and embedding_backend != backend:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Collection '{collection_name}' uses embedding backend '{backend}', not '{embedding_backend}'."
+            )
+        model = get_embedding_engine(backend).backend.model
+        if recorded.get("embedding_model") and recorded["embedding_model"] != model:
+            logger.warning(f"Collection '{collection_name}' was embedded with '{recorded['embedding_model']}' "
+                           f"but backend '{backend}' is configured with '{model}'")
+        return vectorstore.get_collection(collection_name), backend
+
+    backend = embedding_backend or EMBEDDING_BACKEND
+    metadata = {"embedding_backend": backend, "embedding_model": get_embedding_engine(backend).backend.model}
+    return vectorstore.get_collection(collection_name, create=True, metadata=metadata), backend
+
+def store_chunks_in_chromadb(chunks: List[Dict], collection_name: str, document_id: str,
+                             progress: Optional[Callable[..., None]] = None):
     """
     Store document chunks in ChromaDB with embeddings.
     
@@ -185,38 +293,200 @@ def store_chunks_in_chromadb(chunks: List[Dict], collection_name: str, document_
         chunks: List of dictionaries containing text chunks and metadata
         collection_name: Name of the collection (profile_id)
         document_id: Unique identifier for the document from Supabase
+        progress: Optional callback receiving counters (chunks_total, chunks_embedded, chunks_stored)
         
     Returns:
         ChromaDB collection object
     """
+    store_chunk_stream(chunks, collection_name, document_id, progress=progress)
+    return vectorstore.get_collection(collection_name)
+
+def store_chunk_stream(chunks: Iterable[Dict], collection_name: str, document_id: str,
+                       progress: Optional[Callable[..., None]] = None,
+                       batch_size: int = INGEST_BATCH_SIZE, pipeline: bool = INGEST_PIPELINE,
+                       embedding_backend: Optional[str] = None) -> int:
+    """
+    Embed and store chunks in batches of `batch_size` as they arrive from `chunks`.
+
+    Batches are upserted through vectorstore.upsert_batched, so a retried
+    document overwrites its own ids instead of failing on duplicates. With a
+    streaming source such as iter_pdf_chunks the first chunks are searchable
+    while later pages are still being parsed; with `pipeline` the write of one
+    batch overlaps embedding of the next. If the stream fails part-way the
+    chunks already stored for `document_id` are removed again.
+
+    Args:
+        chunks: Iterable of dictionaries containing text chunks and metadata
+        collection_name: Name of the collection (profile_id)
+        document_id: Unique identifier for the document from Supabase
+        progress: Optional callback receiving counters (chunks_total, chunks_embedded,
+            chunks_reused, chunks_stored); chunks_total grows as chunks arrive
+        batch_size: Chunks embedded and inserted per step
+        pipeline: Store each batch in a background thread while the next one is embedded
+        embedding_backend: Backend for a new collection; must match an existing one's
+
+    Returns:
+        Number of chunks stored
+    """
     if not collection_name:
         raise HTTPException(status_code=400, detail="Collection name (profile_id) is required.")
 
     if not document_id:
         raise HTTPException(status_code=400, detail="Document ID is required.")
 
-    # Prepare data for ChromaDB
-    texts = [chunk["text"] for chunk in chunks]
-    metadatas = [{
-        "source": chunk.get("source", "unknown"),
-        "file_id": document_id,
-        "upload_timestamp": datetime.utcnow().isoformat()
-    } for chunk in chunks]
-    ids = [f"{document_id}_chunk_{i}" for i in range(len(chunks))]
-    embeddings = create_google_embeddings(texts)
-
-    # Store in ChromaDB
-    chroma_client = chromadb.PersistentClient(path="chromadb_store")
-    collection = chroma_client.get_or_create_collection(name=collection_name)
-    collection.add(
-        documents=texts, 
-        embeddings=embeddings, 
-        metadatas=metadatas, 
-        ids=ids
+    collection, backend = _open_for_ingest(collection_name, embedding_backend)
+    iterator = iter(chunks)
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-write") if pipeline else None
+    pending: Optional[Future] = None
+    started = time.perf_counter()
+    embedded = stored = reused_total = 0
+    occurrences: Dict[str, int] = {}
+
+    def write(texts, embeddings, metadatas, ids, already_stored):
+        count = vectorstore.upsert_batched(collection, ids, texts, embeddings, metadatas)
+        lexical_index.index_chunks(collection_name, ids, texts, metadatas)
+        if progress:
+            progress(chunks_stored=already_stored + count)
+        return count
+
+    try:
+        while True:
+            batch = list(islice(iterator, max(1, batch_size)))
+            if not batch:
+                break
+            texts, chunk_hashes, metadatas, ids = _chunk_records(batch, document_id, occurrences)
+            if progress:
+                progress(chunks_total=embedded + len(batch))
+
+            # Reuse embeddings of identical sections already stored in this collection
+            offsets = {"chunks_embedded": embedded, "chunks_reused": reused_total}
+            embeddings, reused = _resolve_embeddings(
+                collection, texts, chunk_hashes,
+                progress=(lambda **counts: progress(**{k: v + offsets[k] for k, v in counts.items()}))
+                         if progress else None,
+                backend=backend
+            )
+            embedded += len(batch)
+            reused_total += reused
+
+            if pending is not None:
+                stored += pending.result()
+                pending = None
+            if writer is not None:
+                pending = writer.submit(write, texts, embeddings, metadatas, ids, stored)
+            else:
+                stored += write(texts, embeddings, metadatas, ids, stored)
+        if pending is not None:
+            stored += pending.result()
+            pending = None
+    except BaseException:
+        if pending is not None:
+            pending.cancel()
+        if writer is not None:
+            writer.shutdown(wait=True)
+        if embedded:
+            logger.warning(f"Removing partially stored chunks of document '{document_id}'")
+            collection.delete(where={"file_id": document_id})
+            lexical_index.remove_document(collection_name, document_id)
+            _collection_changed(collection_name)
+        raise
+    if writer is not None:
+        writer.shutdown(wait=True)
+
+    elapsed = time.perf_counter() - started
+    if reused_total:
+        logger.info(f"Reused stored embeddings for {reused_total} of {stored} chunks in collection '{collection_name}'")
+    if stored:
+        _collection_changed(collection_name)
+    logger.info(f"Stored {stored} chunks in ChromaDB collection '{collection_name}' for document '{document_id}' "
+                f"in {elapsed:.2f}s ({stored / elapsed if elapsed else 0:.1f} chunks/s)")
+    return stored
+
+def replace_document_chunks(chunks: List[Dict], collection_name: str, document_id: str,
+                            progress: Optional[Callable[..., None]] = None) -> Dict:
+    """
+    Replace a stored document with a revised version, touching only what changed.
+
+    The new chunks are diffed against the stored ones by content hash: unchanged
+    chunks keep their stored embedding and id, only new or edited sections are
+    embedded and upserted, and chunks no longer present are deleted. Chunks
+    stored under older positional ids are re-keyed once, reusing their
+    embeddings. Embedding and write cost therefore follow the size of the edit.
+
+    Args:
+        chunks: Chunks of the revised document, as produced by read_pdf
+        collection_name: Name of the collection (profile_id)
+        document_id: ID of the document being replaced
+        progress: Optional callback receiving counters (chunks_total, chunks_embedded,
+            chunks_reused, chunks_stored, chunks_removed)
+
+    Returns:
+        Counts of added/changed, unchanged and removed chunks and of chunks embedded
+    """
+    try:
+        collection = vectorstore.open_collection(collection_name)
+    except ValueError:
+        raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found.")
+
+    existing = collection.get(where={"file_id": document_id}, include=["documents", "metadatas", "embeddings"])
+    if not existing["ids"]:
+        raise HTTPException(status_code=404, detail=f"Document '{document_id}' not found in collection '{collection_name}'.")
+
+    # Chunks stored before chunk hashes were recorded are hashed from their text
+    stored_hash_by_id = {}
+    stored_embeddings: Dict[str, List[float]] = {}
+    for chunk_id, text, metadata, embedding in zip(
+            existing["ids"], existing["documents"], existing["metadatas"], existing["embeddings"]):
+        chunk_hash = metadata.get("chunk_hash") or chunk_content_hash(text)
+        stored_hash_by_id[chunk_id] = chunk_hash
+        stored_embeddings.setdefault(chunk_hash, [float(x) for x in embedding])
+
+    texts, chunk_hashes, metadatas, ids = _chunk_records(chunks, document_id)
+    if progress:
+        progress(chunks_total=len(chunks))
+
+    changed = [i for i, (chunk_id, chunk_hash) in enumerate(zip(ids, chunk_hashes))
+               if stored_hash_by_id.get(chunk_id) != chunk_hash]
+    new_ids = set(ids)
+    removed = [chunk_id for chunk_id in existing["ids"] if chunk_id not in new_ids]
+
+    embeddings, reused = _resolve_embeddings(
+        collection, [texts[i] for i in changed], [chunk_hashes[i] for i in changed],
+        known=stored_embeddings,
+        progress=(lambda **counts: progress(**{k: v + len(chunks) - len(changed) for k, v in counts.items()}))
+                 if progress else None,
+        backend=vectorstore.collection_embedding_backend(collection_name)
     )
-    
-    logger.info(f"Stored {len(texts)} chunks in ChromaDB collection '{collection_name}' for document '{document_id}'")
-    return collection
+
+    # Upsert before deleting so the document is never missing from retrieval
+    if changed:
+        vectorstore.upsert_batched(
+            collection,
+            ids=[ids[i] for i in changed],
+            documents=[texts[i] for i in changed],
+            embeddings=embeddings,
+            metadatas=[metadatas[i] for i in changed]
+        )
+        lexical_index.index_chunks(
+            collection_name, [ids[i] for i in changed], [texts[i] for i in changed], [metadatas[i] for i in changed]
+        )
+    if removed:
+        collection.delete(ids=removed)
+        lexical_index.remove_chunks(collection_name, removed)
+
+    summary = {
+        "chunks_total": len(chunks),
+        "chunks_changed": len(changed),
+        "chunks_unchanged": len(chunks) - len(changed),
+        "chunks_removed": len(removed),
+        "chunks_embedded": len(changed) - reused
+    }
+    if progress:
+        progress(chunks_stored=len(chunks), chunks_removed=len(removed))
+    if changed or removed:
+        _collection_changed(collection_name)
+    logger.info(f"Replaced document '{document_id}' in collection '{collection_name}': {summary}")
+    return summary
 
 def delete_file_from_collection(collection_name: str, file_id: str):
     """
@@ -227,11 +497,11 @@ def delete_file_from_collection(collection_name: str, file_id: str):
         file_id: Document ID to delete chunks for
     """
     try:
-        chroma_client = chromadb.PersistentClient(path="chromadb_store")
-        collection = chroma_client.get_collection(name=collection_name)
-        
         # Delete all chunks for this file_id
-        collection.delete(where={"file_id": file_id})
+        vectorstore.with_collection(collection_name, lambda collection: collection.delete(where={"file_id": file_id}))
+        lexical_index.remove_document(collection_name, file_id)
+        _collection_changed(collection_name)
+        get_document_index().remove_document(collection_name, file_id)
         logger.info(f"Deleted chunks for file '{file_id}' from collection '{collection_name}'")
         
     except ValueError as ve:
@@ -249,8 +519,10 @@ def delete_collection_from_chromadb(collection_name: str):
         collection_name: Name of the collection to delete
     """
     try:
-        chroma_client = chromadb.PersistentClient(path="chromadb_store")
-        chroma_client.delete_collection(name=collection_name)
+        vectorstore.delete_collection(collection_name)
+        lexical_index.drop_index(collection_name)
+        _collection_changed(collection_name)
+        get_document_index().remove_collection(collection_name)
         logger.info(f"Successfully deleted collection: {collection_name}")
         
     except ValueError as ve:
@@ -279,7 +551,7 @@ def parse_pdfs_to_markdown(folder_path: str, save_output: bool = True) -> List[D
             file_path = os.path.join(folder_path, file)
             
             try:
-                md_text = pymupdf4llm.to_markdown(file_path)
+                md_text = get_pdf_parser().to_markdown(file_path)
                 all_markdown.append({
                     "filename": file,
                     "markdown": md_text
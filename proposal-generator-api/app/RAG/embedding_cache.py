@@ -0,0 +1,210 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv # type: ignore
+
+from app.utils.cache import LRUCache
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "4096"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+EMBEDDING_CACHE_TOUCH_INTERVAL = float(os.getenv("EMBEDDING_CACHE_TOUCH_INTERVAL", "30"))  # seconds between access-time flushes
+EMBEDDING_CACHE_TOUCH_BATCH = int(os.getenv("EMBEDDING_CACHE_TOUCH_BATCH", "1024"))  # pending access times that force a flush
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalise text so trivially different copies share one cache entry."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_cache_key(model: str, task_type: str, text: str) -> str:
+    """Content address of an embedding: sha256 of (model, task_type, normalised text)."""
+    payload = f"{model}\x1f{task_type}\x1f{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding cache.
+
+    Vectors live in a local SQLite file as float32 blobs, fronted by an in-memory
+    LRU. The on-disk store is bounded by `max_entries`; when it grows past the
+    limit the least recently used tenth is evicted. Access times of hits (memory
+    and disk) are collected in memory and written in one batch every
+    `touch_interval` seconds or `touch_batch` keys, so lookups stay read-only.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH,
+                 memory_items: int = EMBEDDING_CACHE_MEMORY_ITEMS,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+                 touch_interval: float = EMBEDDING_CACHE_TOUCH_INTERVAL,
+                 touch_batch: int = EMBEDDING_CACHE_TOUCH_BATCH):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.touch_batch = touch_batch
+        self._memory = LRUCache(maxsize=memory_items)
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # key -> last access not yet written to disk
+        self._flushed = time.monotonic()
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0,
+                       "touch_flushes": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up `keys`, returning the cached vector or None for each."""
+        results: List[Optional[List[float]]] = [None] * len(keys)
+        disk_lookups = {}
+        hit_keys = []
+        memory_hits = 0
+        for i, key in enumerate(keys):
+            vector = self._memory.get(key)
+            if vector is not None:
+                results[i] = vector
+                hit_keys.append(key)
+                memory_hits += 1
+            else:
+                disk_lookups.setdefault(key, []).append(i)
+
+        disk_hits = 0
+        if disk_lookups:
+            found = self._read(list(disk_lookups))
+            for key, vector in found.items():
+                self._memory.set(key, vector)
+                hit_keys.append(key)
+                for i in disk_lookups[key]:
+                    results[i] = vector
+                    disk_hits += 1
+
+        now = time.time()
+        with self._lock:
+            for key in hit_keys:
+                self._touched[key] = now
+            if len(self._touched) >= self.touch_batch or time.monotonic() - self._flushed >= self.touch_interval:
+                self._flush_touches()
+            self._stats["memory_hits"] += memory_hits
+            self._stats["disk_hits"] += disk_hits
+            self._stats["hits"] += memory_hits + disk_hits
+            self._stats["misses"] += len(keys) - memory_hits - disk_hits
+        return results
+
+    def set_many(self, items: Dict[str, List[float]]):
+        """Store vectors under their content keys."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+        for key, vector in items.items():
+            self._memory.set(key, list(vector))
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+            inserted = self._conn.total_changes - before
+            self._entries += inserted
+            self._stats["writes"] += inserted
+            if self._entries > self.max_entries:
+                self._flush_touches()
+                self._evict()
+
+    def flush(self):
+        """Write pending access times to disk."""
+        with self._lock:
+            self._flush_touches()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "disk_entries": self._entries,
+                "max_entries": self.max_entries,
+                "memory_entries": len(self._memory),
+                "pending_touches": len(self._touched)
+            }
+
+    def _read(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def _flush_touches(self):
+        # Caller holds self._lock
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?", [(t, key) for key, t in self._touched.items()]
+            )
+            self._conn.commit()
+            self._touched.clear()
+            self._stats["touch_flushes"] += 1
+        self._flushed = time.monotonic()
+
+    def _evict(self):
+        # Caller holds self._lock
+        target = int(self.max_entries * 0.9)
+        excess = self._entries - target
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)", (excess,)
+        )
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._stats["evictions"] += excess
+        logger.info(f"Embedding cache evicted {excess} entries (now {self._entries})")
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide embedding cache, or None when caching is disabled."""
+    global _cache
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+                logger.info(f"Embedding cache opened at '{EMBEDDING_CACHE_PATH}' ({_cache.stats()['disk_entries']} entries)")
+    return _cache
@@ -0,0 +1,483 @@
+import os
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import google.generativeai as genai # type: ignore
+from dotenv import load_dotenv # type: ignore
+
+from .embedding_cache import EmbeddingCache, embedding_cache_key, get_embedding_cache
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Engine configuration (overridable through the environment / .env)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "google")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-004")
+EMBEDDING_DIMENSION = 768
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "50"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "100"))  # Gemini batchEmbedContents limit
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+EMBEDDING_BACKENDS = ("google", "local", "fake")
+
+# Local sentence-transformers backend
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_RUNTIME = os.getenv("LOCAL_EMBEDDING_RUNTIME", "torch")  # torch | onnx | openvino
+LOCAL_EMBEDDING_WEIGHTS = os.getenv("LOCAL_EMBEDDING_WEIGHTS", "")  # e.g. onnx/model_qint8_avx512_vnni.onnx
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))  # 0 keeps the runtime default
+
+
+class EmbeddingBackend:
+    """
+    Interface for the provider that turns a batch of texts into vectors.
+
+    Backends only need to implement `embed_batch`; batching, concurrency,
+    retries and fallbacks are handled by `EmbeddingEngine`.
+    """
+    name: str = "base"
+    model: str = ""
+    dimension: int = EMBEDDING_DIMENSION
+
+    def is_available(self) -> bool:
+        return True
+
+    def unavailable_reason(self) -> str:
+        """Why `is_available` is False, for error messages."""
+        return f"Embedding backend '{self.name}' is not available"
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        raise NotImplementedError
+
+    async def aembed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_batch, texts, task_type)
+
+
+class GoogleEmbeddingBackend(EmbeddingBackend):
+    """Google Generative AI embeddings, one batchEmbedContents call per batch."""
+    name = "google"
+
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        self.model = model
+        self.api_key = os.getenv("GOOGLE_API_KEY", "")
+        if self.api_key:
+            genai.configure(api_key=self.api_key)
+
+    def is_available(self) -> bool:
+        return bool(self.api_key)
+
+    def unavailable_reason(self) -> str:
+        return "Google API key not configured"
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        result = genai.embed_content(
+            model=f"models/{self.model}",
+            content=texts,
+            task_type=task_type
+        )
+        return result["embedding"]
+
+    async def aembed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        result = await genai.embed_content_async(
+            model=f"models/{self.model}",
+            content=texts,
+            task_type=task_type
+        )
+        return result["embedding"]
+
+
+class FakeEmbeddingBackend(EmbeddingBackend):
+    """
+    Deterministic offline embedder for benchmarks and local development.
+
+    Vectors are derived from a hash of the text, so identical inputs always map
+    to identical unit vectors. `latency` simulates the per-request round trip and
+    `per_item_latency` the server-side cost of each text in a batch.
+    """
+    name = "fake"
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, latency: float = 0.0,
+                 per_item_latency: float = 0.0, model: str = "fake-embedding"):
+        self.model = model
+        self.dimension = dimension
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        delay = self.latency + self.per_item_latency * len(texts)
+        if delay:
+            time.sleep(delay)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        delay = self.latency + self.per_item_latency * len(texts)
+        if delay:
+            await asyncio.sleep(delay)
+        return [self._vector(text) for text in texts]
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.dimension)]
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    sentence-transformers model running on the local CPU; no network or API key.
+
+    `runtime` selects the torch, ONNX or OpenVINO backend of sentence-transformers
+    and `weights` an alternative weights file inside the model repo, such as a
+    quantized ONNX export. Encoding is serialised because one call already uses
+    every configured thread. Models that define "query" / "document" prompts get
+    them applied according to the task type.
+    """
+    name = "local"
+
+    def __init__(self, model: str = LOCAL_EMBEDDING_MODEL, runtime: str = LOCAL_EMBEDDING_RUNTIME,
+                 weights: str = LOCAL_EMBEDDING_WEIGHTS, threads: int = LOCAL_EMBEDDING_THREADS):
+        from sentence_transformers import SentenceTransformer # type: ignore
+
+        if threads > 0:
+            import torch # type: ignore
+            torch.set_num_threads(threads)
+        kwargs = {"device": "cpu"}
+        if runtime != "torch":
+            kwargs["backend"] = runtime
+        if weights:
+            kwargs["model_kwargs"] = {"file_name": weights}
+        self._model = SentenceTransformer(model, **kwargs)
+        # Vectors from other weights differ slightly, so they get their own cache keys
+        self.model = f"{model}@{weights}" if weights else model
+        self.dimension = self._model.get_sentence_embedding_dimension()
+        self._lock = threading.Lock()
+
+    def embed_batch(self, texts: List[str], task_type: str) -> List[List[float]]:
+        prompt = "query" if task_type == "retrieval_query" else "document"
+        prompt_name = prompt if prompt in (self._model.prompts or {}) else None
+        with self._lock:
+            vectors = self._model.encode(
+                texts, batch_size=len(texts), prompt_name=prompt_name,
+                normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False
+            )
+        return vectors.tolist()
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Return True for quota / rate-limit errors that are worth retrying."""
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable"):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in ("429", "rate limit", "quota", "resource exhausted"))
+
+
+class EmbeddingEngine:
+    """
+    Packs texts into batch requests and dispatches a bounded number of them concurrently.
+
+    The batch size adapts at runtime: it is halved whenever the backend reports a
+    rate limit and grows back gradually after a run of successful batches.
+    Rate-limited batches are retried with exponential backoff and jitter.
+    When a cache is attached, only texts missing from it are sent to the backend.
+    """
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        cache: Optional[EmbeddingCache] = None,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+        max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+        max_retries: int = EMBEDDING_MAX_RETRIES,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        grow_after: int = 5,
+    ):
+        self.backend = backend
+        self.cache = cache
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.grow_after = grow_after
+
+        self._batch_size = max(1, min(batch_size, self.max_batch_size))
+        self._success_streak = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="embed"
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        self._stats = {"texts": 0, "batches": 0, "retries": 0, "rate_limited": 0, "failed_batches": 0,
+                       "fallback_texts": 0}
+
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "model": self.backend.model,
+                "batch_size": self._batch_size,
+                "max_concurrency": self.max_concurrency,
+                **self._stats
+            }
+
+    def embed(self, texts: List[str], task_type: str = "retrieval_document",
+              fallback_to_zero: bool = False,
+              progress: Optional[Callable[[int], None]] = None) -> List[List[float]]:
+        """
+        Embed `texts` and return vectors in input order.
+
+        Args:
+            texts: Texts to embed
+            task_type: Embedding task type passed to the backend
+            fallback_to_zero: Replace vectors of batches that ultimately fail with
+                zero vectors instead of raising. Every text of a failed batch is
+                zeroed and counted in the `fallback_texts` stat; ingestion never
+                uses this, since a stored zero vector silently breaks retrieval
+            progress: Optional callback receiving the number of texts resolved so far
+
+        Returns:
+            List of embedding vectors aligned with `texts`
+        """
+        if not texts:
+            return []
+
+        embeddings, keys, missing = self._lookup(texts, task_type)
+        resolved = len(texts) - sum(len(indices) for indices in missing.values())
+        if progress:
+            progress(resolved)
+        if missing:
+            batches = self._pack(texts, missing)
+            futures = [
+                self._executor.submit(self._run_batch, batch, task_type, fallback_to_zero)
+                for batch in batches
+            ] if len(batches) > 1 else None
+            results = []
+            groups = iter(missing.values())
+            for b, batch in enumerate(batches):
+                result = futures[b].result() if futures else self._run_batch(batch, task_type, fallback_to_zero)
+                results.append(result)
+                if progress:
+                    resolved += sum(len(next(groups)) for _ in batch)
+                    progress(resolved)
+            self._merge(embeddings, keys, missing, results)
+
+        with self._lock:
+            self._stats["texts"] += len(texts)
+        return embeddings
+
+    async def aembed(self, texts: List[str], task_type: str = "retrieval_document",
+                     fallback_to_zero: bool = False) -> List[List[float]]:
+        """
+        Async counterpart of `embed`; batches are awaited without blocking the event loop.
+        Cache reads and writes touch SQLite, so they run in a worker thread.
+        """
+        if not texts:
+            return []
+
+        if self.cache is not None:
+            embeddings, keys, missing = await asyncio.to_thread(self._lookup, texts, task_type)
+        else:
+            embeddings, keys, missing = self._lookup(texts, task_type)
+        if missing:
+            batches = self._pack(texts, missing)
+            semaphore = self._async_semaphore()
+
+            async def run(batch):
+                async with semaphore:
+                    return await self._arun_batch(batch, task_type, fallback_to_zero)
+
+            results = await asyncio.gather(*(run(batch) for batch in batches))
+            if self.cache is not None:
+                await asyncio.to_thread(self._merge, embeddings, keys, missing, results)
+            else:
+                self._merge(embeddings, keys, missing, results)
+
+        with self._lock:
+            self._stats["texts"] += len(texts)
+        return embeddings
+
+    def _lookup(self, texts: List[str], task_type: str):
+        """Resolve cached vectors and group the remaining texts by content key."""
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        keys = None
+        if self.cache is not None:
+            keys = [embedding_cache_key(self.backend.model, task_type, text) for text in texts]
+            embeddings = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once
+        missing: Dict[str, List[int]] = {}
+        for i, vector in enumerate(embeddings):
+            if vector is None:
+                missing.setdefault(keys[i] if keys else texts[i], []).append(i)
+        return embeddings, keys, missing
+
+    def _pack(self, texts: List[str], missing: Dict[str, List[int]]) -> List[List[str]]:
+        pending = [texts[indices[0]] for indices in missing.values()]
+        size = self._batch_size
+        return [pending[i:i + size] for i in range(0, len(pending), size)]
+
+    def _merge(self, embeddings, keys, missing, results):
+        """Scatter batch results back to input positions and cache successful vectors."""
+        fresh = {}
+        groups = iter(missing.items())
+        for vectors, ok in results:
+            for vector in vectors:
+                group, indices = next(groups)
+                for i in indices:
+                    embeddings[i] = vector
+                if ok and keys is not None:
+                    fresh[group] = vector
+        if fresh:
+            self.cache.set_many(fresh)
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _run_batch(self, texts: List[str], task_type: str, fallback_to_zero: bool):
+        """Embed one batch, returning (vectors, ok); ok is False for zero-vector fallbacks."""
+        try:
+            return self._embed_with_retry(texts, task_type), True
+        except Exception as e:
+            return self._batch_failed(texts, e, fallback_to_zero), False
+
+    async def _arun_batch(self, texts: List[str], task_type: str, fallback_to_zero: bool):
+        try:
+            return await self._aembed_with_retry(texts, task_type), True
+        except Exception as e:
+            return self._batch_failed(texts, e, fallback_to_zero), False
+
+    def _batch_failed(self, texts: List[str], error: Exception, fallback_to_zero: bool) -> List[List[float]]:
+        with self._lock:
+            self._stats["failed_batches"] += 1
+            if fallback_to_zero:
+                self._stats["fallback_texts"] += len(texts)
+        if not fallback_to_zero:
+            raise error
+        # The whole batch degrades, not just one text: callers opting in must not persist these
+        logger.error(f"Error embedding batch of {len(texts)} texts, returning zero vectors: {error}")
+        return [[0.0] * self.backend.dimension for _ in texts]
+
+    def _embed_with_retry(self, texts: List[str], task_type: str) -> List[List[float]]:
+        attempt = 0
+        while True:
+            # The batch size may have shrunk since this batch was packed
+            if len(texts) > self._batch_size:
+                size = self._batch_size
+                vectors = []
+                for i in range(0, len(texts), size):
+                    vectors.extend(self._embed_with_retry(texts[i:i + size], task_type))
+                return vectors
+
+            try:
+                return self._check(texts, self.backend.embed_batch(texts, task_type))
+            except Exception as e:
+                attempt = self._backoff_attempt(e, attempt)
+                time.sleep(self._backoff_delay(attempt))
+
+    async def _aembed_with_retry(self, texts: List[str], task_type: str) -> List[List[float]]:
+        attempt = 0
+        while True:
+            if len(texts) > self._batch_size:
+                size = self._batch_size
+                vectors = []
+                for i in range(0, len(texts), size):
+                    vectors.extend(await self._aembed_with_retry(texts[i:i + size], task_type))
+                return vectors
+
+            try:
+                return self._check(texts, await self.backend.aembed_batch(texts, task_type))
+            except Exception as e:
+                attempt = self._backoff_attempt(e, attempt)
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+    def _check(self, texts: List[str], vectors: List[List[float]]) -> List[List[float]]:
+        if len(vectors) != len(texts):
+            raise ValueError(f"Backend returned {len(vectors)} vectors for {len(texts)} texts")
+        self._record_success()
+        return vectors
+
+    def _backoff_attempt(self, error: Exception, attempt: int) -> int:
+        """Re-raise non-retryable errors; otherwise record the rate limit and return the next attempt."""
+        if not is_rate_limit_error(error) or attempt >= self.max_retries:
+            raise error
+        self._record_rate_limit()
+        attempt += 1
+        logger.warning(
+            f"Embedding rate limited ({error}); retry {attempt}/{self.max_retries} "
+            f"with batch size {self._batch_size}"
+        )
+        return attempt
+
+    def _backoff_delay(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _record_success(self):
+        with self._lock:
+            self._stats["batches"] += 1
+            self._success_streak += 1
+            if self._success_streak >= self.grow_after and self._batch_size < self.max_batch_size:
+                self._batch_size = min(self.max_batch_size, self._batch_size + max(1, self._batch_size // 4))
+                self._success_streak = 0
+
+    def _record_rate_limit(self):
+        with self._lock:
+            self._stats["retries"] += 1
+            self._stats["rate_limited"] += 1
+            self._success_streak = 0
+            self._batch_size = max(1, self._batch_size // 2)
+
+
+def create_embedding_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """Instantiate the embedding backend selected by name or EMBEDDING_BACKEND."""
+    name = (name or EMBEDDING_BACKEND).lower()
+    if name == "google":
+        return GoogleEmbeddingBackend()
+    if name == "local":
+        return LocalEmbeddingBackend()
+    if name == "fake":
+        return FakeEmbeddingBackend(latency=float(os.getenv("FAKE_EMBEDDING_LATENCY", "0")))
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+_engines: Dict[str, EmbeddingEngine] = {}
+_engine_lock = threading.Lock()
+
+def get_embedding_engine(backend: Optional[str] = None) -> EmbeddingEngine:
+    """
+    Return the process-wide embedding engine for a backend (EMBEDDING_BACKEND by
+    default), creating it on first use. Engines share the embedding cache, whose
+    keys include the model name.
+    """
+    name = (backend or EMBEDDING_BACKEND).lower()
+    engine = _engines.get(name)
+    if engine is None:
+        with _engine_lock:
+            engine = _engines.get(name)
+            if engine is None:
+                engine = EmbeddingEngine(create_embedding_backend(name), cache=get_embedding_cache())
+                _engines[name] = engine
+                logger.info(f"Embedding engine initialised with backend '{name}' ({engine.backend.model})")
+    return engine
+
+def engine_stats() -> Dict[str, Dict]:
+    """Stats of every embedding engine created so far, keyed by backend name."""
+    return {name: engine.stats() for name, engine in list(_engines.items())}
@@ -0,0 +1,237 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv # type: ignore
+
+from app.utils.cache import LRUCache
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+HISTORY_CACHE_ENABLED = os.getenv("HISTORY_CACHE_ENABLED", "true").lower() == "true"
+HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", "50"))  # recent messages kept per profile
+HISTORY_CACHE_PROFILES = int(os.getenv("HISTORY_CACHE_PROFILES", "1024"))  # profiles kept in memory
+HISTORY_CACHE_MAX_STALENESS = float(os.getenv("HISTORY_CACHE_MAX_STALENESS", "5"))  # seconds between delta queries
+HISTORY_PROVISIONAL_TTL = float(os.getenv("HISTORY_PROVISIONAL_TTL", "120"))  # seconds a turn may wait for its stored row
+
+# fetch_recent(profile_id, limit) -> newest-first rows; fetch_since(profile_id, created_at, limit) -> oldest-first rows
+RecentFetcher = Callable[[str, int], List[Dict]]
+DeltaFetcher = Callable[[str, str, int], List[Dict]]
+AsyncRecentFetcher = Callable[[str, int], Awaitable[List[Dict]]]
+AsyncDeltaFetcher = Callable[[str, str, int], Awaitable[List[Dict]]]
+
+
+def _created_ts(row: Dict) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(row["created_at"].replace("Z", "+00:00")).timestamp()
+    except (KeyError, AttributeError, ValueError):
+        return None
+
+
+def _settle(messages: List[Dict], rows: List[Dict], ttl: float) -> List[Dict]:
+    """
+    Drop the provisional entries that `rows` (newly stored, oldest first) stand
+    for. A stored row takes the place of the oldest provisional entry of the
+    same role appended within `ttl` seconds of its created_at; the stored text
+    does not have to match what was appended.
+    """
+    provisional = [m for m in messages if m.get("provisional")]
+    settled = set()
+    for row in rows:
+        created = _created_ts(row)
+        for i, m in enumerate(provisional):
+            if i in settled or m["role"] != row["role"]:
+                continue
+            if created is None or abs(created - m["appended_at"]) <= ttl:
+                settled.add(i)
+                break
+    dropped = {id(provisional[i]) for i in settled}
+    return [m for m in messages if id(m) not in dropped]
+
+
+class _ProfileHistory:
+    """Ring buffer of one profile's most recent messages in chronological order."""
+
+    def __init__(self, size: int):
+        self.messages: Deque[Dict] = deque(maxlen=size)
+        self.last_seen: Optional[str] = None  # created_at of the newest stored row
+        self.refreshed = 0.0
+        self.lock = threading.Lock()
+
+
+class ConversationHistoryCache:
+    """
+    Per-profile in-process cache of recent conversation messages.
+
+    A profile is loaded once with a "newest N" query, then kept current by
+    delta queries for rows created after the newest one seen, issued at most
+    every `max_staleness` seconds. Turns produced by this process are appended
+    immediately as provisional entries and replaced by their stored rows when a
+    delta query returns them, matched by role and time rather than by text;
+    provisional entries never persisted are dropped after `provisional_ttl`
+    seconds. Messages edited or deleted in the database stay visible until the
+    profile is evicted or invalidated.
+
+    The profile lock is only held to read and update the buffer, never across a
+    query, so a slow fetch in `get` cannot stall `aget` on the event loop;
+    `aget` serves coroutines with the async fetchers.
+    """
+
+    def __init__(self, fetch_recent: RecentFetcher, fetch_since: DeltaFetcher,
+                 size: int = HISTORY_CACHE_SIZE, max_profiles: int = HISTORY_CACHE_PROFILES,
+                 max_staleness: float = HISTORY_CACHE_MAX_STALENESS,
+                 provisional_ttl: float = HISTORY_PROVISIONAL_TTL,
+                 afetch_recent: Optional[AsyncRecentFetcher] = None, afetch_since: Optional[AsyncDeltaFetcher] = None):
+        self.fetch_recent = fetch_recent
+        self.fetch_since = fetch_since
+        self.afetch_recent = afetch_recent
+        self.afetch_since = afetch_since
+        self.size = max(1, size)
+        self.max_staleness = max_staleness
+        self.provisional_ttl = provisional_ttl
+        self._profiles = LRUCache(maxsize=max_profiles)
+        self._lock = threading.Lock()
+        self._stats = {"memory_reads": 0, "full_loads": 0, "delta_queries": 0, "delta_rows": 0,
+                       "appended": 0, "provisional_expired": 0, "bypassed": 0}
+
+    def get(self, profile_id: str, limit: int) -> List[Dict]:
+        """Return up to `limit` most recent messages of a profile, oldest first."""
+        if limit > self.size:
+            # Deeper than the ring buffer holds: go to the database
+            self._count("bypassed")
+            return list(reversed(self.fetch_recent(profile_id, limit)))
+
+        history = self._profile(profile_id)
+        with history.lock:
+            fetch, since = self._due(history)
+            if fetch is None:
+                return self._read(history, limit)
+        if fetch == "delta":
+            rows = self.fetch_since(profile_id, since, self.size)
+            with history.lock:
+                if self._apply_delta(history, rows):
+                    return self._read(history, limit)
+        rows = self.fetch_recent(profile_id, self.size)
+        with history.lock:
+            self._apply_load(history, rows)
+            return self._read(history, limit)
+
+    async def aget(self, profile_id: str, limit: int) -> List[Dict]:
+        """Async variant of `get`; falls back to `get` in a worker thread without async fetchers."""
+        if self.afetch_recent is None or self.afetch_since is None:
+            return await asyncio.to_thread(self.get, profile_id, limit)
+        if limit > self.size:
+            self._count("bypassed")
+            return list(reversed(await self.afetch_recent(profile_id, limit)))
+
+        history = self._profile(profile_id)
+        with history.lock:
+            fetch, since = self._due(history)
+            if fetch is None:
+                return self._read(history, limit)
+        # Concurrent readers of a profile may both query; identical requests are coalesced by the client
+        if fetch == "delta":
+            rows = await self.afetch_since(profile_id, since, self.size)
+            with history.lock:
+                if self._apply_delta(history, rows):
+                    return self._read(history, limit)
+        rows = await self.afetch_recent(profile_id, self.size)
+        with history.lock:
+            self._apply_load(history, rows)
+            return self._read(history, limit)
+
+    def append(self, profile_id: str, role: str, content: str):
+        """Record a turn produced by this process ahead of its row reaching the database."""
+        history = self._profiles.get(profile_id)
+        if history is None:
+            return  # loaded from the database on first read
+        with history.lock:
+            history.messages.append({"role": role, "content": content, "provisional": True, "appended_at": time.time()})
+        self._count("appended")
+
+    def invalidate(self, profile_id: str):
+        self._profiles.pop(profile_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": True,
+                "size": self.size,
+                "max_staleness": self.max_staleness,
+                "profiles": self._profiles.stats(),
+                **self._stats
+            }
+
+    def _profile(self, profile_id: str) -> _ProfileHistory:
+        history = self._profiles.get(profile_id)
+        if history is None:
+            with self._lock:
+                history = self._profiles.get(profile_id)
+                if history is None:
+                    history = _ProfileHistory(self.size)
+                    self._profiles.set(profile_id, history)
+        return history
+
+    def _due(self, history: _ProfileHistory) -> Tuple[Optional[str], Optional[str]]:
+        # Caller holds history.lock; returns ("load", None), ("delta", created_at) or (None, None) for a memory read
+        if history.refreshed and time.monotonic() - history.refreshed < self.max_staleness:
+            self._count("memory_reads")
+            return None, None
+        if not history.refreshed or history.last_seen is None:
+            return "load", None
+        return "delta", history.last_seen
+
+    def _apply_load(self, history: _ProfileHistory, rows: List[Dict]):
+        # Caller holds history.lock; rows are newest first
+        rows = list(reversed(rows))
+        history.messages.clear()
+        history.messages.extend(rows)
+        history.last_seen = rows[-1]["created_at"] if rows else None
+        history.refreshed = time.monotonic()
+        self._count("full_loads")
+
+    def _apply_delta(self, history: _ProfileHistory, rows: List[Dict]) -> bool:
+        """Merge rows newer than the buffer (oldest first); False when a full load is needed instead."""
+        # Caller holds history.lock
+        self._count("delta_queries", delta_rows=len(rows))
+        if len(rows) >= self.size:
+            # More arrived than the buffer holds; a full load is just as cheap
+            return False
+        if history.last_seen is not None:
+            rows = [row for row in rows if row["created_at"] > history.last_seen]  # another reader merged some
+        if rows:
+            kept = _settle(list(history.messages), rows, self.provisional_ttl)
+            history.messages.clear()
+            history.messages.extend(kept + rows)
+            history.last_seen = rows[-1]["created_at"]
+        history.refreshed = time.monotonic()
+        return True
+
+    def _read(self, history: _ProfileHistory, limit: int) -> List[Dict]:
+        # Caller holds history.lock
+        self._expire_provisional(history)
+        messages = [{k: v for k, v in m.items() if k != "appended_at"} if m.get("provisional") else m
+                    for m in history.messages]
+        return messages[-limit:] if limit > 0 else []
+
+    def _expire_provisional(self, history: _ProfileHistory):
+        # Caller holds history.lock; drops turns whose row never reached the database
+        cutoff = time.time() - self.provisional_ttl
+        if any(m.get("provisional") and m["appended_at"] < cutoff for m in history.messages):
+            kept = [m for m in history.messages if not (m.get("provisional") and m["appended_at"] < cutoff)]
+            expired = len(history.messages) - len(kept)
+            history.messages.clear()
+            history.messages.extend(kept)
+            with self._lock:
+                self._stats["provisional_expired"] += expired
+
+    def _count(self, name: str, delta_rows: int = 0):
+        with self._lock:
+            self._stats[name] += 1
+            self._stats["delta_rows"] += delta_rows
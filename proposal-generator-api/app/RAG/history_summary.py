@@ -0,0 +1,176 @@
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv # type: ignore
+
+from .llm import LLM_MODEL, get_chat_model
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+HISTORY_SUMMARY_ENABLED = os.getenv("HISTORY_SUMMARY_ENABLED", "false").lower() == "true"  # opt-in: one LLM call per refresh
+HISTORY_RAW_MESSAGES = int(os.getenv("HISTORY_RAW_MESSAGES", "4"))  # most recent messages kept verbatim
+HISTORY_SUMMARY_MAX_WORDS = int(os.getenv("HISTORY_SUMMARY_MAX_WORDS", "200"))
+HISTORY_SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL") or LLM_MODEL  # unset or empty: the chat model
+HISTORY_SUMMARY_PATH = os.getenv("HISTORY_SUMMARY_PATH", "history_summaries/summaries.sqlite3")
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an AI assistant.
+Update the summary with the new messages below. Keep facts, names, numbers, decisions and open questions
+the user may refer back to; drop greetings and document content the assistant only quoted.
+Write plain prose of at most {max_words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+
+Updated summary:"""
+
+
+class SummaryStore:
+    """SQLite table of one rolling summary per profile and the newest message it covers."""
+
+    def __init__(self, path: str = HISTORY_SUMMARY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "profile_id TEXT PRIMARY KEY, summary TEXT NOT NULL, covered_until TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, profile_id: str) -> Tuple[str, Optional[str]]:
+        """Return (summary, created_at of the newest summarized message); ("", None) if there is none yet."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, covered_until FROM summaries WHERE profile_id = ?", (profile_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else ("", None)
+
+    def put(self, profile_id: str, summary: str, covered_until: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)", (profile_id, summary, covered_until, time.time())
+            )
+            self._conn.commit()
+
+
+def _unsummarized(messages: List[Dict], covered_until: Optional[str]) -> List[Dict]:
+    # Only stored rows (with created_at) can be summarized; turns not yet persisted stay raw
+    return [m for m in messages if m.get("created_at") and (covered_until is None or m["created_at"] > covered_until)]
+
+
+class HistorySummarizer:
+    """
+    Keeps prompt history flat: a rolling summary plus the last few raw messages.
+
+    `compose` replaces every message older than the last `raw_messages` with the
+    stored summary of the profile. Older messages the summary does not cover
+    yet are kept verbatim for that request and folded into the summary by a
+    background worker, so answering never waits on the summarization call.
+    """
+
+    def __init__(self, store: SummaryStore, raw_messages: int = HISTORY_RAW_MESSAGES,
+                 max_words: int = HISTORY_SUMMARY_MAX_WORDS, model: str = HISTORY_SUMMARY_MODEL):
+        self.store = store
+        self.raw_messages = max(1, raw_messages)
+        self.max_words = max_words
+        self.model = model
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stats = {"composed": 0, "refreshes": 0, "folded_messages": 0, "failures": 0, "seconds": 0.0}
+
+    def compose(self, profile_id: str, messages: List[Dict]) -> List[Dict]:
+        """Summary (as a "summary" role message) followed by the messages it does not cover, oldest first."""
+        older, recent = messages[:-self.raw_messages], messages[-self.raw_messages:]
+        summary, covered_until = self.store.get(profile_id)
+        uncovered = [m for m in older
+                     if not m.get("created_at") or covered_until is None or m["created_at"] > covered_until]
+        if _unsummarized(uncovered, covered_until):
+            self.schedule(profile_id, lambda: older)
+        with self._lock:
+            self._stats["composed"] += 1
+        head = [{"role": "summary", "content": summary}] if summary else []
+        return head + uncovered + recent
+
+    async def acompose(self, profile_id: str, messages: List[Dict]) -> List[Dict]:
+        """Async variant of `compose`; the stored summary is read in a worker thread."""
+        return await asyncio.to_thread(self.compose, profile_id, messages)
+
+    def schedule(self, profile_id: str, load: Callable[[], List[Dict]]):
+        """Fold the messages returned by `load` (run on the worker) into the profile's summary."""
+        with self._lock:
+            if profile_id in self._pending:
+                return
+            self._pending.add(profile_id)
+        self._executor.submit(self._refresh, profile_id, load)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": True,
+                "model": self.model,
+                "raw_messages": self.raw_messages,
+                "pending": len(self._pending),
+                **self._stats,
+                "seconds": round(self._stats["seconds"], 3)
+            }
+
+    def _refresh(self, profile_id: str, load: Callable[[], List[Dict]]):
+        start = time.perf_counter()
+        try:
+            summary, covered_until = self.store.get(profile_id)
+            messages = _unsummarized(load(), covered_until)
+            if not messages:
+                return
+            prompt = SUMMARY_PROMPT.format(
+                max_words=self.max_words,
+                summary=summary or "(none yet)",
+                messages="\n".join(f"{m['role'].upper()}: {m['content']}" for m in messages)
+            )
+            response = get_chat_model(self.model).invoke(prompt)
+            content = response.content if isinstance(response.content, str) else "".join(
+                part if isinstance(part, str) else part.get("text", "") for part in response.content
+            )
+            if not content.strip():
+                raise ValueError("empty summary")
+            self.store.put(profile_id, content.strip(), max(m["created_at"] for m in messages))
+            with self._lock:
+                self._stats["refreshes"] += 1
+                self._stats["folded_messages"] += len(messages)
+        except Exception as e:
+            with self._lock:
+                self._stats["failures"] += 1
+            logger.error(f"Conversation summary refresh failed for profile {profile_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(profile_id)
+                self._stats["seconds"] += time.perf_counter() - start
+
+
+_summarizer: Optional[HistorySummarizer] = None
+_summarizer_lock = threading.Lock()
+
+def get_history_summarizer() -> Optional[HistorySummarizer]:
+    """Return the process-wide summarizer, or None when HISTORY_SUMMARY_ENABLED is off."""
+    global _summarizer
+    if not HISTORY_SUMMARY_ENABLED:
+        return None
+    if _summarizer is None:
+        with _summarizer_lock:
+            if _summarizer is None:
+                _summarizer = HistorySummarizer(SummaryStore())
+    return _summarizer
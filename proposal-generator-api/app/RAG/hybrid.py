@@ -0,0 +1,128 @@
+import os
+import logging
+from typing import Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv # type: ignore
+from langchain_core.documents import Document # type: ignore
+
+from . import vectorstore
+from .lexical_index import get_lexical_index
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "4"))  # candidates per ranking, as a multiple of k
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], rrf_k: int = HYBRID_RRF_K) -> List[str]:
+    """
+    Fuse ranked id lists by reciprocal rank: each id scores sum(1 / (rrf_k + rank)).
+
+    Ties keep the order in which ids were first seen, so earlier rankings win.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=lambda item: scores[item], reverse=True)
+
+
+def _file_ids(where: Optional[Dict]) -> Optional[List[str]]:
+    """Document ids of a filter on file_id alone ({"file_id": x}, $eq or $in); None for any other filter."""
+    if not where or set(where) != {"file_id"}:
+        return None
+    condition = where["file_id"]
+    if isinstance(condition, str):
+        return [condition]
+    if isinstance(condition, dict) and len(condition) == 1:
+        if "$eq" in condition:
+            return [condition["$eq"]]
+        if "$in" in condition:
+            return list(condition["$in"])
+    return None
+
+
+def _lexical_candidates(collection_name: str, collection, query: str, candidates: int,
+                        where: Optional[Dict], records: Dict) -> List[str]:
+    """
+    Up to `candidates` BM25-ranked ids that satisfy `where`, adding their text and
+    metadata to `records`.
+
+    A file_id filter is applied inside the index before ranking. Any other filter
+    is checked in Chroma, over-fetching a doubling pool of BM25 hits until enough
+    of them pass or the index has no more matches. While the collection's index
+    is still being built there are no lexical candidates.
+    """
+    index = get_lexical_index(collection_name, collection)
+    if index is None:
+        return []
+    file_ids = _file_ids(where)
+    if file_ids is not None or not where:
+        ranked = [chunk_id for chunk_id, _ in index.search(query, candidates, file_ids=file_ids)]
+        missing = [chunk_id for chunk_id in ranked if chunk_id not in records]
+        if missing:
+            fetched = collection.get(ids=missing, include=["documents", "metadatas"])
+            for chunk_id, text, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+                records[chunk_id] = (text, metadata)
+        return [chunk_id for chunk_id in ranked if chunk_id in records]
+
+    pool, passed, checked = candidates, [], set()
+    while True:
+        ranked = [chunk_id for chunk_id, _ in index.search(query, pool)]
+        unchecked = [chunk_id for chunk_id in ranked if chunk_id not in checked]
+        if unchecked:
+            fetched = collection.get(ids=unchecked, where=where, include=["documents", "metadatas"])
+            for chunk_id, text, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"]):
+                records.setdefault(chunk_id, (text, metadata))
+            checked.update(unchecked)
+            passing = set(fetched["ids"])
+            passed.extend(chunk_id for chunk_id in unchecked if chunk_id in passing)
+        if len(passed) >= candidates or len(ranked) < pool:
+            return passed[:candidates]
+        pool *= 2
+
+
+def hybrid_search(collection_name: str, query: str, query_embedding: List[float], k: int,
+                  where: Optional[Dict] = None) -> List[Document]:
+    """
+    Retrieve `k` chunks by fusing dense similarity and BM25 rankings.
+
+    Both sides contribute HYBRID_CANDIDATES * k candidates. The `where` filter
+    applies to both rankings, before the lexical candidates are cut (see
+    `_lexical_candidates`).
+
+    Args:
+        collection_name: ChromaDB collection name
+        query: Question text, used for the lexical ranking
+        query_embedding: Query vector, used for the dense ranking
+        k: Number of chunks to return
+        where: Optional Chroma metadata filter
+
+    Returns:
+        Retrieved documents, best first
+    """
+    candidates = max(k, k * HYBRID_CANDIDATES)
+
+    def search(collection):
+        dense = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=candidates,
+            where=where or None,
+            include=["documents", "metadatas"]
+        )
+        records = {
+            chunk_id: (text, metadata)
+            for chunk_id, text, metadata in zip(dense["ids"][0], dense["documents"][0], dense["metadatas"][0])
+        }
+        lexical_ids = _lexical_candidates(collection_name, collection, query, candidates, where, records)
+        return list(dense["ids"][0]), lexical_ids, records
+
+    try:
+        dense_ids, lexical_ids, records = vectorstore.with_collection(collection_name, search)
+    except vectorstore.CollectionNotFoundError:
+        return []
+
+    fused = reciprocal_rank_fusion([dense_ids, lexical_ids])[:k]
+    return [Document(page_content=records[chunk_id][0], metadata=records[chunk_id][1] or {}) for chunk_id in fused]
@@ -0,0 +1,286 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from dotenv import load_dotenv # type: ignore
+
+from .embed import read_pdf, iter_pdf_chunks, store_chunk_stream, replace_document_chunks
+from .document_index import get_document_index
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_MAX_QUEUE = int(os.getenv("INGEST_MAX_QUEUE", "32"))
+INGEST_JOB_RETENTION = float(os.getenv("INGEST_JOB_RETENTION", "3600"))  # seconds to keep finished jobs
+INGEST_JOB_SYNC_INTERVAL = float(os.getenv("INGEST_JOB_SYNC_INTERVAL", "1.0"))  # seconds between progress writes
+INGEST_JOB_STALE_AFTER = float(os.getenv("INGEST_JOB_STALE_AFTER", "1800"))  # unfinished job without updates is abandoned
+INGEST_WAIT_DEFAULT = os.getenv("INGEST_WAIT_DEFAULT", "true").lower() == "true"  # upload answers once stored
+
+_STAGES = ("queued", "parsing", "embedding", "storing", "done")
+_COUNTERS = (
+    "pages_total", "pages_parsed", "chunks_total", "chunks_embedded",
+    "chunks_reused", "chunks_stored", "chunks_removed"
+)
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue is at capacity."""
+
+
+def job_status(record: Dict) -> Dict:
+    """Public status of a job snapshot, as served by /doc/status/{document_id}."""
+    status, error = record["status"], record["error"]
+    now = time.time()
+    if status in ("queued", "processing") and record["updated_at"] < now - INGEST_JOB_STALE_AFTER:
+        # The worker process that owned the job stopped before finishing it
+        status, error = "failed", "Ingestion was interrupted; please upload the document again"
+    started_at, finished_at = record["started_at"], record["finished_at"]
+    return {
+        "document_id": record["document_id"],
+        "collection_id": record["collection_name"],
+        "filename": record["filename"],
+        "operation": "replace" if record["replace"] else "upload",
+        "status": status,
+        "stage": record["stage"],
+        **{name: record[name] for name in _COUNTERS},
+        "error": error,
+        "queued_seconds": round((started_at or now) - record["created_at"], 3),
+        "elapsed_seconds": round((finished_at or now) - started_at, 3) if started_at else None
+    }
+
+
+class IngestionJob:
+    """
+    Progress record for one document moving through parse -> embed -> store.
+
+    With INGEST_PIPELINE the embedding and storing threads report progress
+    concurrently, so updates are serialised, counters never go back and the
+    stage only moves forward (it reads "storing" from the first stored batch on).
+    Every state change, and progress at most every INGEST_JOB_SYNC_INTERVAL
+    seconds, is written to the shared document index.
+    """
+
+    def __init__(self, document_id: str, collection_name: str, filename: str, file_path: str,
+                 content_hash: Optional[str] = None, replace: bool = False,
+                 embedding_backend: Optional[str] = None):
+        self.document_id = document_id
+        self.collection_name = collection_name
+        self.filename = filename
+        self.file_path = file_path
+        self.content_hash = content_hash
+        self.replace = replace  # diff against the stored version instead of inserting
+        self.embedding_backend = embedding_backend  # requested backend; the collection's recorded one wins
+        self.status = "queued"  # queued | processing | completed | failed
+        self.stage = "queued"   # queued | parsing | embedding | storing | done
+        self.pages_total: Optional[int] = None
+        self.pages_parsed = 0
+        self.chunks_total: Optional[int] = None
+        self.chunks_embedded = 0
+        self.chunks_reused = 0
+        self.chunks_stored = 0
+        self.chunks_removed = 0
+        self.chunks_created: Optional[int] = None  # chunks in the document once completed
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None  # resolves when the worker is done with the job
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, **counters):
+        """Progress callback handed to the parse / embed / store steps."""
+        with self._lock:
+            for name, value in counters.items():
+                current = getattr(self, name)
+                setattr(self, name, value if current is None else max(current, value))
+            if "chunks_stored" in counters:
+                self._advance("storing")
+            elif "chunks_embedded" in counters:
+                self._advance("embedding")
+        self.sync()
+
+    def set_state(self, **fields):
+        """Change status / stage / timestamps and write the job through right away."""
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+        self.sync(force=True)
+
+    def sync(self, force: bool = False):
+        now = time.time()
+        with self._lock:
+            if not force and now - self._synced_at < INGEST_JOB_SYNC_INTERVAL:
+                return
+            self._synced_at = now
+            record = self.snapshot()
+        try:
+            get_document_index().save_job(record)
+        except Exception as e:
+            logger.warning(f"Could not record progress of document '{self.document_id}': {e}")
+
+    def _advance(self, stage: str):
+        # Caller holds self._lock
+        if _STAGES.index(stage) > _STAGES.index(self.stage):
+            self.stage = stage
+
+    def snapshot(self) -> Dict:
+        # Caller holds self._lock
+        return {
+            "document_id": self.document_id,
+            "collection_name": self.collection_name,
+            "filename": self.filename,
+            "content_hash": self.content_hash,
+            "replace": self.replace,
+            "status": self.status,
+            "stage": self.stage,
+            **{name: getattr(self, name) for name in _COUNTERS},
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "updated_at": time.time()
+        }
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return job_status(self.snapshot())
+
+
+class IngestionQueue:
+    """
+    Local worker pool that ingests uploaded PDFs in the background.
+
+    At most `workers` documents are processed at once and at most `max_queue`
+    may be waiting; submissions beyond that raise QueueFullError. Jobs run in
+    the worker process that accepted the upload, but their progress is kept in
+    the shared document index, so status and duplicate checks see the jobs of
+    every worker process.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, max_queue: int = INGEST_MAX_QUEUE):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest")
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def submit(self, document_id: str, collection_name: str, filename: str, file_path: str,
+               content_hash: Optional[str] = None, replace: bool = False,
+               embedding_backend: Optional[str] = None) -> IngestionJob:
+        """
+        Queue a spooled PDF for ingestion. The queue takes ownership of `file_path`
+        and deletes it once the job finishes. When `content_hash` is given the
+        document is recorded in the document index on success. With `replace`
+        the PDF is a revision of the already stored `document_id`.
+        `embedding_backend` selects the backend of a collection created by this job.
+        Await `job.future` to wait for the job to finish.
+        """
+        with self._lock:
+            self._prune()
+            if self._count("queued") >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise QueueFullError(f"Ingestion queue is full ({self.max_queue} documents waiting)")
+            current = self.status(document_id)
+            if current is not None and current["status"] in ("queued", "processing"):
+                raise ValueError(f"Document '{document_id}' is already being processed")
+            job = IngestionJob(
+                document_id, collection_name, filename, file_path, content_hash, replace, embedding_backend
+            )
+            self._jobs[document_id] = job
+            self._stats["submitted"] += 1
+        job.sync(force=True)
+
+        job.future = self._executor.submit(self._run, job)
+        logger.info(f"Queued document '{document_id}' ({filename}) for collection '{collection_name}'")
+        return job
+
+    def status(self, document_id: str) -> Optional[Dict]:
+        """Status of the latest job for `document_id`, run by this or any other worker process."""
+        job = self._jobs.get(document_id)
+        if job is not None:
+            return job.to_dict()
+        record = get_document_index().load_job(document_id)
+        return job_status(record) if record else None
+
+    def find_active(self, collection_name: str, content_hash: str) -> Optional[Dict]:
+        """Return the status of a queued or running job for the same file content in `collection_name`."""
+        record = get_document_index().active_job(
+            collection_name, content_hash, time.time() - INGEST_JOB_STALE_AFTER
+        )
+        return job_status(record) if record else None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self._count("queued"),
+                "processing": self._count("processing"),
+                "tracked_jobs": len(self._jobs),
+                **self._stats
+            }
+
+    def _count(self, status: str) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def _prune(self):
+        # Caller holds self._lock
+        cutoff = time.time() - INGEST_JOB_RETENTION
+        for document_id in [d for d, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[document_id]
+        get_document_index().prune_jobs(cutoff)
+
+    def _run(self, job: IngestionJob):
+        job.set_state(status="processing", stage="parsing", started_at=time.time())
+        try:
+            if job.replace:
+                chunks = read_pdf(job.file_path, source=job.filename, progress=job.update)
+                replace_document_chunks(chunks, job.collection_name, job.document_id, progress=job.update)
+                chunk_count = len(chunks)
+            else:
+                # Pages are parsed, chunked, embedded and stored as a stream
+                chunk_count = store_chunk_stream(
+                    iter_pdf_chunks(job.file_path, source=job.filename, progress=job.update),
+                    job.collection_name, job.document_id, progress=job.update,
+                    embedding_backend=job.embedding_backend
+                )
+            if job.content_hash:
+                if job.replace:
+                    get_document_index().remove_document(job.collection_name, job.document_id)
+                if not get_document_index().add(
+                        job.collection_name, job.content_hash, job.document_id, job.filename, chunk_count):
+                    logger.info(f"Document '{job.document_id}' has the same content as another document "
+                                f"in '{job.collection_name}'; duplicates keep resolving to that one")
+            job.set_state(status="completed", stage="done", chunks_created=chunk_count, finished_at=time.time())
+            with self._lock:
+                self._stats["completed"] += 1
+            logger.info(f"Ingested document '{job.document_id}': {job.chunks_stored} chunks stored")
+        except Exception as e:
+            job.set_state(status="failed", error=str(getattr(e, "detail", e)), finished_at=time.time())
+            with self._lock:
+                self._stats["failed"] += 1
+            logger.error(f"Ingestion failed for document '{job.document_id}': {job.error}", exc_info=True)
+        finally:
+            try:
+                os.unlink(job.file_path)
+            except OSError:
+                pass
+
+
+_queue: Optional[IngestionQueue] = None
+_queue_lock = threading.Lock()
+
+def get_ingestion_queue() -> IngestionQueue:
+    """Return the process-wide ingestion queue, creating it on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = IngestionQueue()
+    return _queue
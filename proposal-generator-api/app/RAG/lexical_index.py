@@ -0,0 +1,373 @@
+import os
+import re
+import math
+import logging
+import time
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np # type: ignore
+from dotenv import load_dotenv # type: ignore
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+LEXICAL_COMPACT_RATIO = 0.25  # compact postings once this share of indexed chunks is deleted
+LEXICAL_REBUILD_PAGE = 5000   # chunks fetched per Chroma page when (re)building an index
+LEXICAL_RECONCILE_SECONDS = float(os.getenv("LEXICAL_RECONCILE_SECONDS", "60"))  # generation check for other processes' writes (0 = off)
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens; names, SKUs and numbers survive as single terms."""
+    return _TOKEN.findall(text.lower())
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 index over the chunks of one collection.
+
+    Postings are kept per term as two parallel `array('i')` buffers (chunk slot
+    and term frequency), so the index costs a few bytes per posting and a query
+    only touches the postings of its own terms, scored in bulk with numpy. Chunks are addressed by their
+    Chroma id. Removal tombstones the slot; postings are compacted once
+    LEXICAL_COMPACT_RATIO of the slots are dead. Document frequencies count
+    tombstoned slots until then, which only slightly skews IDF.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._terms: Dict[str, int] = {}
+        self._postings_slots: List[array] = []
+        self._postings_tf: List[array] = []
+        self._chunk_ids: List[Optional[str]] = []
+        self._files: List[Optional[str]] = []
+        self._lengths = array("i")
+        self._alive = bytearray()
+        self._slot_by_id: Dict[str, int] = {}
+        self._slots_by_file: Dict[str, List[int]] = {}
+        self._live_length = 0
+        self._dead = 0
+        self._stats = {"queries": 0, "compactions": 0}
+
+    def __len__(self) -> int:
+        return len(self._slot_by_id)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[Optional[Dict]]):
+        """Index chunks, replacing any already indexed under the same ids."""
+        with self._lock:
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                if chunk_id in self._slot_by_id:
+                    self._remove_slot(self._slot_by_id[chunk_id])
+                slot = len(self._chunk_ids)
+                terms = Counter(tokenize(text or ""))
+                for term, tf in terms.items():
+                    term_id = self._terms.get(term)
+                    if term_id is None:
+                        term_id = self._terms[term] = len(self._postings_slots)
+                        self._postings_slots.append(array("i"))
+                        self._postings_tf.append(array("i"))
+                    self._postings_slots[term_id].append(slot)
+                    self._postings_tf[term_id].append(tf)
+                length = sum(terms.values())
+                file_id = (metadata or {}).get("file_id")
+                self._chunk_ids.append(chunk_id)
+                self._files.append(file_id)
+                self._lengths.append(length)
+                self._alive.append(1)
+                self._slot_by_id[chunk_id] = slot
+                if file_id is not None:
+                    self._slots_by_file.setdefault(file_id, []).append(slot)
+                self._live_length += length
+            self._maybe_compact()
+
+    def remove_ids(self, ids: List[str]):
+        with self._lock:
+            for chunk_id in ids:
+                slot = self._slot_by_id.get(chunk_id)
+                if slot is not None:
+                    self._remove_slot(slot)
+            self._maybe_compact()
+
+    def remove_file(self, file_id: str):
+        """Remove every chunk of a document (chunk metadata `file_id`)."""
+        with self._lock:
+            for slot in self._slots_by_file.pop(file_id, []):
+                if self._alive[slot]:
+                    self._remove_slot(slot)
+            self._maybe_compact()
+
+    def search(self, query: str, limit: int, file_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Return up to `limit` (chunk id, BM25 score) pairs, best first.
+
+        With `file_ids`, only chunks of those documents are ranked, so the
+        limit applies after the filter.
+        """
+        with self._lock:
+            self._stats["queries"] += 1
+            live = len(self._slot_by_id)
+            if not live or limit <= 0:
+                return []
+            avg_length = (self._live_length / live) or 1.0
+            k1, b = self.k1, self.b
+            lengths = np.array(self._lengths, dtype=np.float64)
+            scores = np.zeros(len(self._chunk_ids), dtype=np.float64)
+            for term in set(tokenize(query)):
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    continue
+                # Copies, so no numpy view pins the growable buffers
+                slots = np.array(self._postings_slots[term_id], dtype=np.int64)
+                tfs = np.array(self._postings_tf[term_id], dtype=np.float64)
+                idf = math.log(1.0 + (live - len(slots) + 0.5) / (len(slots) + 0.5))
+                # Slots are unique within one term's postings, so fancy-index += is exact
+                scores[slots] += idf * tfs * (k1 + 1.0) / (tfs + k1 * (1.0 - b + b * lengths[slots] / avg_length))
+            scores *= np.array(self._alive, dtype=np.float64)
+            if file_ids is not None:
+                allowed = np.zeros(len(self._chunk_ids), dtype=np.float64)
+                for file_id in file_ids:
+                    allowed[self._slots_by_file.get(file_id, [])] = 1.0
+                scores *= allowed
+
+            matched = np.flatnonzero(scores > 0)
+            if len(matched) > limit:
+                matched = matched[np.argpartition(scores[matched], -limit)[-limit:]]
+            best = matched[np.argsort(scores[matched])[::-1]]
+            return [(self._chunk_ids[slot], float(scores[slot])) for slot in best]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "chunks": len(self._slot_by_id),
+                "terms": len(self._terms),
+                "postings": sum(len(p) for p in self._postings_slots),
+                "tombstones": self._dead,
+                **self._stats
+            }
+
+    def _remove_slot(self, slot: int):
+        # Caller holds self._lock
+        self._alive[slot] = 0
+        self._dead += 1
+        self._live_length -= self._lengths[slot]
+        del self._slot_by_id[self._chunk_ids[slot]]
+        self._chunk_ids[slot] = None
+
+    def _maybe_compact(self):
+        # Caller holds self._lock
+        if not self._dead or self._dead < LEXICAL_COMPACT_RATIO * len(self._chunk_ids):
+            return
+        remap = array("i", [-1]) * len(self._chunk_ids)
+        chunk_ids, files, lengths = [], [], array("i")
+        for slot, chunk_id in enumerate(self._chunk_ids):
+            if self._alive[slot]:
+                remap[slot] = len(chunk_ids)
+                chunk_ids.append(chunk_id)
+                files.append(self._files[slot])
+                lengths.append(self._lengths[slot])
+
+        terms: Dict[str, int] = {}
+        postings_slots: List[array] = []
+        postings_tf: List[array] = []
+        for term, term_id in self._terms.items():
+            slots, tfs = array("i"), array("i")
+            for slot, tf in zip(self._postings_slots[term_id], self._postings_tf[term_id]):
+                if remap[slot] >= 0:
+                    slots.append(remap[slot])
+                    tfs.append(tf)
+            if slots:
+                terms[term] = len(postings_slots)
+                postings_slots.append(slots)
+                postings_tf.append(tfs)
+
+        self._terms, self._postings_slots, self._postings_tf = terms, postings_slots, postings_tf
+        self._chunk_ids, self._files, self._lengths = chunk_ids, files, lengths
+        self._alive = bytearray(b"\x01") * len(chunk_ids)
+        self._slot_by_id = {chunk_id: slot for slot, chunk_id in enumerate(chunk_ids)}
+        self._slots_by_file = {}
+        for slot, file_id in enumerate(files):
+            if file_id is not None:
+                self._slots_by_file.setdefault(file_id, []).append(slot)
+        self._dead = 0
+        self._stats["compactions"] += 1
+
+
+# Indexes are built in the background on first use and then kept current by the
+# ingest / delete paths of this process. Writes from other worker processes are
+# noticed through the collection generation in the shared document index and
+# picked up by a background rebuild, never on the query path.
+_indexes: Dict[str, LexicalIndex] = {}
+_state: Dict[str, Dict] = {}  # collection -> build / reconciliation state
+_lock = threading.Lock()
+_stats = {"builds": 0, "rebuilds": 0, "reconcile_checks": 0, "unavailable": 0}
+_rebuilder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lexical-rebuild")
+
+
+def _build(collection) -> LexicalIndex:
+    index = LexicalIndex()
+    offset = 0
+    while True:
+        page = collection.get(limit=LEXICAL_REBUILD_PAGE, offset=offset, include=["documents", "metadatas"])
+        if not page["ids"]:
+            break
+        index.add(page["ids"], page["documents"], page["metadatas"])
+        offset += len(page["ids"])
+    return index
+
+
+def _new_state() -> Dict:
+    return {
+        "checked": time.monotonic(), "stale": False, "generation": None,
+        "rebuilding": True, "pending": [], "pending_generations": []
+    }
+
+
+def get_lexical_index(collection_name: str, collection) -> Optional[LexicalIndex]:
+    """
+    Return the BM25 index for a collection, or None while it is being built.
+
+    The first call queues a build from `collection` in the background, so callers
+    fall back to dense-only retrieval until it is ready. Afterwards the index is
+    served as is; staleness is handled off the query path by `invalidate` and by a
+    periodic generation check (LEXICAL_RECONCILE_SECONDS) whose rebuilds run in the
+    background and replace the index atomically.
+    """
+    index = _indexes.get(collection_name)
+    if index is None:
+        with _lock:
+            _stats["unavailable"] += 1
+            if collection_name in _state:
+                return _indexes.get(collection_name)
+            _state[collection_name] = _new_state()
+        _rebuilder.submit(_reconcile, collection_name, collection)
+        return None
+    _maybe_reconcile(collection_name, collection)
+    return index
+
+
+def invalidate(collection_name: str):
+    """Mark a collection's index stale; it is rebuilt in the background on its next use."""
+    with _lock:
+        state = _state.get(collection_name)
+        if state is not None:
+            state["stale"] = True
+
+
+def note_generation(collection_name: str, generation: int):
+    """
+    Record that this process changed a collection, moving it to `generation`.
+
+    Local writes are already applied to the index, so a generation that follows
+    directly on the one the index reflects needs no rebuild; any gap means
+    another process wrote in between and the next check rebuilds.
+    """
+    with _lock:
+        state = _state.get(collection_name)
+        if state is None:
+            return
+        if state["rebuilding"]:
+            state["pending_generations"].append(generation)
+        elif state["generation"] is not None and generation == state["generation"] + 1:
+            state["generation"] = generation
+
+
+def _maybe_reconcile(collection_name: str, collection):
+    now = time.monotonic()
+    with _lock:
+        state = _state.get(collection_name)
+        if state is None or state["rebuilding"]:
+            return
+        periodic = LEXICAL_RECONCILE_SECONDS > 0 and now - state["checked"] >= LEXICAL_RECONCILE_SECONDS
+        if not (state["stale"] or periodic):
+            return
+        state["checked"] = now
+        state["rebuilding"] = True
+    _rebuilder.submit(_reconcile, collection_name, collection)
+
+
+def _reconcile(collection_name: str, collection):
+    with _lock:
+        state = _state.get(collection_name)
+        index = _indexes.get(collection_name)
+    if state is None:
+        return
+    try:
+        from .document_index import get_document_index
+        generations = get_document_index()
+        if index is not None and not state["stale"]:
+            _stats["reconcile_checks"] += 1
+            if generations.generation(collection_name) == state["generation"]:
+                return
+        # Read before Chroma, so a write landing during the build shows up as a newer generation
+        generation = generations.generation(collection_name)
+        fresh = _build(collection)
+        with _lock:
+            if _state.get(collection_name) is not state:
+                return  # dropped while building
+            # Replay writes this process made while the build was reading Chroma
+            for operation, args in state["pending"]:
+                getattr(fresh, operation)(*args)
+            for noted in sorted(state["pending_generations"]):
+                if noted == generation + 1:
+                    generation = noted
+            _indexes[collection_name] = fresh
+            state["stale"], state["generation"] = False, generation
+            _stats["rebuilds" if index is not None else "builds"] += 1
+        logger.info(f"Built lexical index for collection '{collection_name}': {len(fresh)} chunks")
+    except Exception as e:
+        logger.error(f"Lexical index build failed for collection '{collection_name}': {e}")
+    finally:
+        with _lock:
+            state["rebuilding"] = False
+            state["pending"] = []
+            state["pending_generations"] = []
+            if _indexes.get(collection_name) is None and _state.get(collection_name) is state:
+                del _state[collection_name]  # failed first build: retried on the next query
+
+
+def _apply(collection_name: str, operation: str, *args):
+    with _lock:
+        index = _indexes.get(collection_name)
+        state = _state.get(collection_name)
+        if state is not None and state["rebuilding"]:
+            state["pending"].append((operation, args))
+    if index is not None:
+        getattr(index, operation)(*args)
+
+
+def index_chunks(collection_name: str, ids: List[str], texts: List[str], metadatas: List[Dict]):
+    """Add or replace chunks in a collection's index if it is loaded."""
+    _apply(collection_name, "add", ids, texts, metadatas)
+
+
+def remove_chunks(collection_name: str, ids: List[str]):
+    _apply(collection_name, "remove_ids", ids)
+
+
+def remove_document(collection_name: str, file_id: str):
+    _apply(collection_name, "remove_file", file_id)
+
+
+def drop_index(collection_name: str):
+    with _lock:
+        _indexes.pop(collection_name, None)
+        _state.pop(collection_name, None)
+
+
+def stats() -> Dict:
+    with _lock:
+        indexes = dict(_indexes)
+        counters = dict(_stats)
+    return {
+        **counters,
+        "collections": {name: index.stats() for name, index in indexes.items()}
+    }
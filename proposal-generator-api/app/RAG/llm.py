@@ -0,0 +1,117 @@
+import os
+import time
+import asyncio
+import logging
+import itertools
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv # type: ignore
+from langchain_core.language_models.chat_models import BaseChatModel # type: ignore
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage # type: ignore
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult # type: ignore
+from langchain_google_genai import ChatGoogleGenerativeAI # type: ignore
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "google")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash-preview-05-20")
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "2"))
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline chat model for benchmarks and local development.
+
+    Answers with a fixed response after `latency` seconds; the async path sleeps
+    without blocking the event loop, like a real network-bound model. When
+    streamed, the response is emitted word by word with the latency spread
+    evenly across chunks.
+    """
+    response: str = "This is a stubbed answer generated without calling Gemini."
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _chunks(self) -> List[str]:
+        words = self.response.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        chunks = self._chunks()
+        for text in chunks:
+            if self.latency:
+                time.sleep(self.latency / len(chunks))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        chunks = self._chunks()
+        for text in chunks:
+            if self.latency:
+                await asyncio.sleep(self.latency / len(chunks))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
+def create_chat_model(model: str = LLM_MODEL) -> BaseChatModel:
+    """Instantiate the chat model selected by LLM_BACKEND (google | fake)."""
+    backend = LLM_BACKEND.lower()
+    if backend == "google":
+        return ChatGoogleGenerativeAI(model=model)
+    if backend == "fake":
+        return FakeChatModel(latency=float(os.getenv("FAKE_LLM_LATENCY", "0")))
+    raise ValueError(f"Unknown LLM backend: {LLM_BACKEND}")
+
+
+# Long-lived chat model clients, LLM_POOL_SIZE per model, handed out round-robin.
+# Building a ChatGoogleGenerativeAI sets up its API client and costs far more
+# than the request it serves, so clients are created once and reused.
+_pools: Dict[str, List[BaseChatModel]] = {}
+_counters: Dict[str, "itertools.count"] = {}
+_pool_lock = threading.Lock()
+_pool_stats = {"created": 0, "reused": 0}
+
+def get_chat_model(model: str = LLM_MODEL) -> BaseChatModel:
+    """Return a pooled chat model client for `model`."""
+    pool = _pools.get(model)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(model)
+            if pool is None:
+                pool = [create_chat_model(model) for _ in range(max(1, LLM_POOL_SIZE))]
+                _counters[model] = itertools.count()
+                _pools[model] = pool
+                _pool_stats["created"] += len(pool)
+                logger.info(f"Created {len(pool)} pooled '{LLM_BACKEND}' chat clients for model '{model}'")
+    _pool_stats["reused"] += 1
+    return pool[next(_counters[model]) % len(pool)]
+
+def pool_stats() -> Dict:
+    return {
+        "backend": LLM_BACKEND,
+        "pool_size": max(1, LLM_POOL_SIZE),
+        "models": sorted(_pools),
+        **_pool_stats
+    }
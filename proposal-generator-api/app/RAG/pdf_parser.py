@@ -0,0 +1,163 @@
+import os
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+import pymupdf # type: ignore
+import pymupdf4llm # type: ignore
+from dotenv import load_dotenv # type: ignore
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))  # 0 parses in-process
+PDF_PARSE_PAGES_PER_TASK = int(os.getenv("PDF_PARSE_PAGES_PER_TASK", "16"))
+# Workers are never forked from the multi-threaded API process: a fork copies locks held by other threads
+PDF_PARSE_START_METHOD = os.getenv("PDF_PARSE_START_METHOD", "spawn")  # spawn | forkserver
+
+
+def _convert_pages(file_path: str, pages: Optional[List[int]] = None) -> str:
+    """Worker entry point: convert `pages` (0-based, all when None) of a PDF to markdown."""
+    return pymupdf4llm.to_markdown(file_path, pages=pages, show_progress=False)
+
+
+def page_ranges(page_count: int, pages_per_task: int) -> List[List[int]]:
+    """Split `page_count` pages into consecutive ranges of at most `pages_per_task` pages."""
+    size = max(1, pages_per_task)
+    return [list(range(start, min(start + size, page_count))) for start in range(0, page_count, size)]
+
+
+class PdfParser:
+    """
+    Converts PDFs to markdown in a pool of worker processes.
+
+    pymupdf4llm is CPU-bound and holds the GIL, so running it in threads stalls
+    the API process. Documents are split into ranges of `pages_per_task` pages
+    that are converted in parallel and handed back in page order.
+    With `workers=0` conversion runs in the calling process.
+    """
+
+    def __init__(self, workers: int = PDF_PARSE_WORKERS, pages_per_task: int = PDF_PARSE_PAGES_PER_TASK):
+        self.workers = max(0, workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {"documents": 0, "pages": 0, "tasks": 0, "pool_restarts": 0}
+
+    def to_markdown(self, file_path: str, progress: Optional[Callable[..., None]] = None) -> str:
+        """
+        Convert a PDF to markdown.
+
+        Args:
+            file_path: Path to the PDF file
+            progress: Optional callback receiving counters (pages_total, pages_parsed)
+
+        Returns:
+            Markdown text of the whole document
+        """
+        return "".join(self.iter_markdown(file_path, progress=progress))
+
+    def iter_markdown(self, file_path: str, progress: Optional[Callable[..., None]] = None) -> Iterator[str]:
+        """
+        Convert a PDF to markdown, yielding it one page range at a time in page order.
+
+        At most `workers * 2` ranges are converted ahead of the consumer, so memory
+        stays bounded by the window rather than the document length.
+
+        Args:
+            file_path: Path to the PDF file
+            progress: Optional callback receiving counters (pages_total, pages_parsed)
+
+        Yields:
+            Markdown text of consecutive page ranges
+        """
+        with pymupdf.open(file_path) as doc:
+            page_count = doc.page_count
+        if progress:
+            progress(pages_total=page_count)
+
+        ranges = page_ranges(page_count, self.pages_per_task)
+        if self.workers == 0:
+            parts = (_convert_pages(file_path, pages_range) for pages_range in ranges)
+        else:
+            parts = self._convert_parallel(file_path, ranges)
+
+        parsed = 0
+        for pages_range, markdown in zip(ranges, parts):
+            parsed += len(pages_range)
+            if progress:
+                progress(pages_parsed=parsed)
+            yield markdown
+
+        with self._lock:
+            self._stats["documents"] += 1
+            self._stats["pages"] += page_count
+            self._stats["tasks"] += len(ranges)
+
+    def warm_up(self):
+        """Start every worker process now, so the first upload does not pay for interpreter start-up."""
+        if self.workers == 0:
+            return
+        pool = self._pool()
+        for future in [pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+        logger.info(f"PDF parser pool started with {self.workers} '{PDF_PARSE_START_METHOD}' workers")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"workers": self.workers, "pages_per_task": self.pages_per_task, **self._stats}
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(PDF_PARSE_START_METHOD)
+                )
+            return self._executor
+
+    def _convert_parallel(self, file_path: str, ranges: List[List[int]]) -> Iterator[str]:
+        # Even a single range goes through the pool so the caller's process never runs pymupdf4llm
+        window = self.workers * 2
+        pending: Deque[Future] = deque()
+        try:
+            pool = self._pool()
+            next_range = 0
+            while next_range < len(ranges) or pending:
+                while next_range < len(ranges) and len(pending) < window:
+                    pending.append(pool.submit(_convert_pages, file_path, ranges[next_range]))
+                    next_range += 1
+                yield pending.popleft().result()
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a pathological PDF); start a fresh pool for the next document
+            with self._lock:
+                self._executor = None
+                self._stats["pool_restarts"] += 1
+            logger.error(f"PDF parser pool broke while converting '{file_path}'; pool will be recreated")
+            raise
+        finally:
+            # Consumer stopped early or failed: drop conversions nobody will read
+            for future in pending:
+                future.cancel()
+
+
+_parser: Optional[PdfParser] = None
+_parser_lock = threading.Lock()
+
+def get_pdf_parser() -> PdfParser:
+    """Return the process-wide PDF parser, creating it on first use."""
+    global _parser
+    if _parser is None:
+        with _parser_lock:
+            if _parser is None:
+                _parser = PdfParser()
+    return _parser
@@ -1,6 +1,9 @@
 import os
+import time
+import hashlib
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 from typing_extensions import TypedDict, Annotated
 
 import google.generativeai as genai # type: ignore
@@ -10,21 +13,44 @@ from fastapi import HTTPException # type: ignore
 from langchain_core.embeddings import Embeddings # type: ignore
 from langchain_core.documents import Document # type: ignore
 from langchain_core.prompts import ChatPromptTemplate # type: ignore
-from langchain_chroma import Chroma # type: ignore
-from langchain_google_genai import ChatGoogleGenerativeAI # type: ignore
-from langgraph.graph import START, StateGraph # type: ignore
+from langchain_core.runnables import RunnableLambda # type: ignore
+from langgraph.graph import END, START, StateGraph # type: ignore
 from langgraph.graph.message import add_messages # type: ignore
 
+from .embedding_engine import get_embedding_engine
+from .vectorstore import CollectionNotFoundError, collection_embedding_backend, get_vector_store, with_vector_store
+from .llm import get_chat_model
+from .answer_cache import answer_scope, get_answer_cache
+from .hybrid import HYBRID_SEARCH_ENABLED, hybrid_search
+from .reranker import RERANK_CANDIDATES, get_reranker, rerank_enabled
+from .context_packer import pack_context
+from .chunker import estimate_tokens
+from app.utils.cache import LRUCache
+
 # Import conversation history functions
 try:
-    from .conv import fetch_conversation_as_context_string
+    from .conv import (
+        fetch_conversation_as_context_string, afetch_conversation_as_context_string,
+        record_conversation_turn, history_cache_stats
+    )
 except ImportError:
     def fetch_conversation_as_context_string(profile_id: str, limit: int = 10) -> str:
         return "No conversation history available."
 
+    async def afetch_conversation_as_context_string(profile_id: str, limit: int = 10) -> str:
+        return "No conversation history available."
+
+    def record_conversation_turn(profile_id: str, query: str, answer: str):
+        pass
+
+    def history_cache_stats() -> Dict:
+        return {"enabled": False}
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+PROMPT_CACHE_SIZE = int(os.getenv("PROMPT_CACHE_SIZE", "128"))
+
 # Configure Google API
 google_api_key = os.getenv("GOOGLE_API_KEY")
 if google_api_key:
@@ -33,30 +59,55 @@ else:
     logger.warning("GOOGLE_API_KEY not found in environment variables")
 
 class GoogleEmbeddings(Embeddings):
+    """
+    LangChain adapter over the shared (cached, batched) embedding engine.
+
+    `backend` selects the engine (EMBEDDING_BACKEND when None); despite the name
+    this also serves the local and fake backends.
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend
+
     def embed_documents(self, texts):
         try:
-            return [genai.embed_content(
-                model="models/text-embedding-004",
-                content=text,
-                task_type="retrieval_document"
-            )['embedding'] for text in texts]
+            return get_embedding_engine(self.backend).embed(list(texts), task_type="retrieval_document")
         except Exception as e:
             logger.error(f"Error embedding documents: {e}")
             raise HTTPException(status_code=500, detail=f"Error embedding documents: {str(e)}")
 
     def embed_query(self, text):
         try:
-            return genai.embed_content(
-                model="models/text-embedding-004",
-                content=text,
-                task_type="retrieval_query"
-            )['embedding']
+            return get_embedding_engine(self.backend).embed([text], task_type="retrieval_query")[0]
+        except Exception as e:
+            logger.error(f"Error embedding query: {e}")
+            raise HTTPException(status_code=500, detail=f"Error embedding query: {str(e)}")
+
+    async def aembed_documents(self, texts):
+        try:
+            return await get_embedding_engine(self.backend).aembed(list(texts), task_type="retrieval_document")
+        except Exception as e:
+            logger.error(f"Error embedding documents: {e}")
+            raise HTTPException(status_code=500, detail=f"Error embedding documents: {str(e)}")
+
+    async def aembed_query(self, text):
+        try:
+            return (await get_embedding_engine(self.backend).aembed([text], task_type="retrieval_query"))[0]
         except Exception as e:
             logger.error(f"Error embedding query: {e}")
             raise HTTPException(status_code=500, detail=f"Error embedding query: {str(e)}")
 
 # Global embedding model instance
 embedding_model = GoogleEmbeddings()
+_collection_embeddings: Dict[str, GoogleEmbeddings] = {}
+
+def embeddings_for_collection(collection_name: str) -> GoogleEmbeddings:
+    """Embeddings matching the backend a collection was ingested with."""
+    backend = collection_embedding_backend(collection_name)
+    embeddings = _collection_embeddings.get(backend)
+    if embeddings is None:
+        embeddings = _collection_embeddings.setdefault(backend, GoogleEmbeddings(backend))
+    return embeddings
 
 # System prompt with conversation history support
 DEFAULT_SYSTEM_PROMPT = """You are a helpful AI assistant engaging in a conversation with the user.
@@ -76,73 +127,363 @@ Example tone: Think of how an experienced freelancer would respond on Upwork or
 
 
 """
+def merge_timings(left: Dict[str, float], right: Dict[str, float]) -> Dict[str, float]:
+    """Reducer that lets parallel graph branches each report their own stage timing."""
+    return {**(left or {}), **(right or {})}
+
 class State(TypedDict):
     question: str
     context: List[Document]
     answer: str
     retriever: Any
+    embeddings: Embeddings
+    collection_name: str
+    hybrid: bool
+    rerank: bool
+    k_retrieval: int
     prompt_template: ChatPromptTemplate
     # messages: Annotated[list, add_messages]
     profile_id: str
     conversation_history: str
+    conversation_limit: int
+    query_embedding: Optional[List[float]]
+    custom_system_prompt: Optional[str]
+    answer_cache_scope: Optional[str]
+    answer_cache_generation: Optional[int]
+    cached_response: Optional[Dict]
+    context_usage: Dict[str, Any]
+    timings: Annotated[Dict[str, float], merge_timings]
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+# Nodes run as parallel branches, so each returns only the keys it owns.
+
+def load_history(state: State):
+    """Load the conversation history for the profile."""
+    start = time.perf_counter()
+    conversation_history = fetch_conversation_as_context_string(
+        profile_id=state["profile_id"],
+        limit=state["conversation_limit"]
+    )
+    return {"conversation_history": conversation_history, "timings": {"history_ms": _elapsed_ms(start)}}
+
+async def aload_history(state: State):
+    start = time.perf_counter()
+    conversation_history = await afetch_conversation_as_context_string(
+        profile_id=state["profile_id"],
+        limit=state["conversation_limit"]
+    )
+    return {"conversation_history": conversation_history, "timings": {"history_ms": _elapsed_ms(start)}}
+
+def embed_query(state: State):
+    """Embed the query once; retrieval and the answer cache both use the vector."""
+    start = time.perf_counter()
+    query_embedding = state.get("query_embedding") or state["embeddings"].embed_query(state["question"])
+    return {"query_embedding": query_embedding, "timings": {"embedding_ms": _elapsed_ms(start)}}
+
+async def aembed_query(state: State):
+    start = time.perf_counter()
+    query_embedding = state.get("query_embedding") or await state["embeddings"].aembed_query(state["question"])
+    return {"query_embedding": query_embedding, "timings": {"embedding_ms": _elapsed_ms(start)}}
+
+def lookup_answer(state: State):
+    """Look the query up in the semantic answer cache, scoped to the profile and its loaded history."""
+    start = time.perf_counter()
+    answer_cache = get_answer_cache()
+    scope = answer_scope(
+        state["retriever"].search_kwargs.get("filter"), state.get("custom_system_prompt"), state["k_retrieval"],
+        state["profile_id"], state["conversation_history"]
+    )
+    # The generation is read first so that an invalidation during generation is caught at store time
+    generation = answer_cache.generation(state["collection_name"])
+    cached = answer_cache.lookup(state["collection_name"], scope, state["query_embedding"], generation)
+    return {"answer_cache_scope": scope, "answer_cache_generation": generation, "cached_response": cached,
+            "timings": {"answer_cache_ms": _elapsed_ms(start)}}
+
+async def alookup_answer(state: State):
+    # The shared generation is read from SQLite, so it stays off the event loop
+    return await asyncio.to_thread(lookup_answer, state)
+
+def _after_lookup(state: State) -> str:
+    # A hit ends the graph before retrieval and generation
+    return END if state.get("cached_response") is not None else "retrieve_documents"
+
+def _hybrid_search(state: State, query_embedding: List[float]) -> List[Document]:
+    search_kwargs = state["retriever"].search_kwargs
+    return hybrid_search(
+        state["collection_name"], state["question"], query_embedding,
+        search_kwargs["k"], search_kwargs.get("filter")
+    )
+
+def _vector_search(state: State, query_embedding: List[float]) -> List[Document]:
+    # The cached store may hold a handle to a collection another worker re-created
+    return with_vector_store(
+        state["collection_name"], state["embeddings"],
+        lambda store: store.similarity_search_by_vector(query_embedding, **state["retriever"].search_kwargs)
+    )
 
 def retrieve_documents(state: State):
     """Retrieve relevant documents from the vector store."""
     try:
-        retrieved_docs = state["retriever"].invoke(state["question"])
+        start = time.perf_counter()
+        retriever = state["retriever"]
+        if state.get("hybrid"):
+            query_embedding = state.get("query_embedding") or state["embeddings"].embed_query(state["question"])
+            retrieved_docs = _hybrid_search(state, query_embedding)
+        elif state.get("query_embedding"):
+            retrieved_docs = _vector_search(state, state["query_embedding"])
+        else:
+            retrieved_docs = with_vector_store(
+                state["collection_name"], state["embeddings"],
+                lambda store: store.similarity_search(state["question"], **retriever.search_kwargs)
+            )
         logger.info(f"Retrieved {len(retrieved_docs)} documents")
-        
-        return {
-            "context": retrieved_docs,
-            "question": state["question"],
-            "retriever": state["retriever"],
-            "prompt_template": state["prompt_template"],
-            # "messages": state["messages"],
-            "profile_id": state["profile_id"],
-            "conversation_history": state["conversation_history"]
-        }
+        return {"context": retrieved_docs, "timings": {"retrieval_ms": _elapsed_ms(start)}}
     except Exception as e:
         logger.error(f"Error in retrieve_documents: {e}")
         raise
 
+async def aretrieve_documents(state: State):
+    """Async retrieval: embed the query without blocking, then search in a worker thread."""
+    try:
+        start = time.perf_counter()
+        query_embedding = state.get("query_embedding") or await state["embeddings"].aembed_query(state["question"])
+        if state.get("hybrid"):
+            retrieved_docs = await asyncio.to_thread(_hybrid_search, state, query_embedding)
+        else:
+            retrieved_docs = await asyncio.to_thread(_vector_search, state, query_embedding)
+        logger.info(f"Retrieved {len(retrieved_docs)} documents")
+        return {"context": retrieved_docs, "timings": {"retrieval_ms": _elapsed_ms(start)}}
+    except Exception as e:
+        logger.error(f"Error in retrieve_documents: {e}")
+        raise
+
+def rerank_documents(state: State):
+    """Rerank the over-fetched candidate pool with the cross-encoder and keep the top k."""
+    reranker = get_reranker() if state.get("rerank") else None
+    if reranker is None or not state["context"]:
+        if state.get("rerank"):
+            # The model failed to load after the pool was over-fetched: keep the top k in retrieval order
+            return {"context": state["context"][:state["k_retrieval"]], "timings": {}}
+        return {"timings": {}}
+    try:
+        start = time.perf_counter()
+        reranked = reranker.rerank(state["question"], state["context"], state["k_retrieval"])
+        logger.info(f"Reranked {len(state['context'])} candidates down to {len(reranked)} documents")
+        return {"context": reranked, "timings": {"rerank_ms": _elapsed_ms(start)}}
+    except Exception as e:
+        logger.error(f"Error in rerank_documents: {e}")
+        raise
+
+async def arerank_documents(state: State):
+    """The cross-encoder is CPU-bound, so it runs in a worker thread."""
+    return await asyncio.to_thread(rerank_documents, state)
+
+def _build_messages(state: State):
+    """
+    Pack history and documents into the context token budget and build the prompt.
+
+    Returns:
+        Tuple of (prompt messages, documents that made it into the prompt, token usage per section)
+    """
+    packed = pack_context(state["context"], state.get("conversation_history", "No previous conversation."))
+    usage = {**packed["usage"], "question_tokens": estimate_tokens(state["question"])}
+
+    # Create messages with context and conversation history
+    messages = state["prompt_template"].invoke({
+        "question": state["question"],
+        "context": packed["context"],
+        "conversation_history": packed["history"]
+    })
+    return messages, packed["documents"], usage
+
 def generate_answer(state: State):
     """Generate answer using retrieved documents and conversation history."""
     try:
-        docs_content = "\n\n".join(doc.page_content for doc in state["context"])
-        conversation_history = state.get("conversation_history", "No previous conversation.")
-        
-        # Create messages with context and conversation history
-        messages = state["prompt_template"].invoke({
-            "question": state["question"],
-            "context": docs_content,
-            "conversation_history": conversation_history
-        })
+        start = time.perf_counter()
+        messages, documents, usage = _build_messages(state)
 
         # Generate response
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-preview-05-20")
+        llm = get_chat_model()
         response = llm.invoke(messages)
-        
         logger.info(f"Generated response: {len(response.content)} characters")
+        return {"answer": response.content, "context": documents, "context_usage": usage,
+                "timings": {"generation_ms": _elapsed_ms(start)}}
+    except Exception as e:
+        logger.error(f"Error in generate_answer: {e}")
+        raise
 
-        return {
-            "answer": response.content,
-            "context": state["context"],
-            "question": state["question"],
-            # "messages": state["messages"],
-            "profile_id": state["profile_id"],
-            "conversation_history": state["conversation_history"]
-        }
+async def agenerate_answer(state: State):
+    """Async variant of generate_answer; awaits the LLM instead of blocking the event loop."""
+    try:
+        start = time.perf_counter()
+        messages, documents, usage = _build_messages(state)
+        llm = get_chat_model()
+        response = await llm.ainvoke(messages)
+        logger.info(f"Generated response: {len(response.content)} characters")
+        return {"answer": response.content, "context": documents, "context_usage": usage,
+                "timings": {"generation_ms": _elapsed_ms(start)}}
     except Exception as e:
         logger.error(f"Error in generate_answer: {e}")
         raise
 
-# Build the RAG graph
-graph_builder = StateGraph(State)
-graph_builder.add_node("retrieve_documents", retrieve_documents)
-graph_builder.add_node("generate_answer", generate_answer)
-graph_builder.add_edge(START, "retrieve_documents")
-graph_builder.add_edge("retrieve_documents", "generate_answer")
-compiled_rag_graph = graph_builder.compile()
+def _add_context_nodes(builder: StateGraph, answer_cache: bool) -> Union[str, List[str]]:
+    """
+    Add the history and embedding -> retrieval -> rerank branches, which start in
+    parallel from START. Returns the node generation has to wait for.
+
+    With the answer cache, the lookup needs both the embedding and the history
+    (the cache is scoped to the conversation), so retrieval waits for that join
+    and a hit ends the graph with `cached_response` set.
+    """
+    builder.add_node("load_history", RunnableLambda(load_history, afunc=aload_history))
+    builder.add_node("embed_query", RunnableLambda(embed_query, afunc=aembed_query))
+    builder.add_node("retrieve_documents", RunnableLambda(retrieve_documents, afunc=aretrieve_documents))
+    builder.add_node("rerank_documents", RunnableLambda(rerank_documents, afunc=arerank_documents))
+    builder.add_edge(START, "load_history")
+    builder.add_edge(START, "embed_query")
+    builder.add_edge("retrieve_documents", "rerank_documents")
+    if answer_cache:
+        builder.add_node("lookup_answer", RunnableLambda(lookup_answer, afunc=alookup_answer))
+        builder.add_edge(["load_history", "embed_query"], "lookup_answer")
+        builder.add_conditional_edges("lookup_answer", _after_lookup, ["retrieve_documents", END])
+        return "rerank_documents"
+    builder.add_edge("embed_query", "retrieve_documents")
+    return ["load_history", "rerank_documents"]
+
+def _compile_graph(answer_cache: bool, generate: bool):
+    builder = StateGraph(State)
+    context_done = _add_context_nodes(builder, answer_cache)
+    if generate:
+        builder.add_node("generate_answer", RunnableLambda(generate_answer, afunc=agenerate_answer))
+        builder.add_edge(context_done, "generate_answer")
+    return builder.compile()
+
+# Build the RAG graphs. History loading and retrieval are independent I/O, so
+# they run as parallel branches that join before generate_answer. Reranking is
+# a pass-through unless enabled. Each node has a sync and an async
+# implementation so the same compiled graph serves both invoke() and ainvoke().
+compiled_rag_graph = _compile_graph(answer_cache=False, generate=True)
+compiled_cached_rag_graph = _compile_graph(answer_cache=True, generate=True)
+
+# Context-only graphs used by the streaming endpoint, which drives the LLM itself
+compiled_context_graph = _compile_graph(answer_cache=False, generate=False)
+compiled_cached_context_graph = _compile_graph(answer_cache=True, generate=False)
+
+# Compiled prompt templates keyed by a hash of the custom system prompt
+_prompt_cache = LRUCache(maxsize=PROMPT_CACHE_SIZE)
+
+def get_prompt_template(custom_system_prompt: Optional[str] = None) -> ChatPromptTemplate:
+    """Return the chat prompt template for a system prompt, compiling it at most once."""
+    key = hashlib.sha256((custom_system_prompt or "").encode("utf-8")).hexdigest()
+    prompt_template = _prompt_cache.get(key)
+    if prompt_template is not None:
+        return prompt_template
+
+    # Create system prompt
+    system_prompt = custom_system_prompt + "\n\n" + DEFAULT_SYSTEM_PROMPT if custom_system_prompt else DEFAULT_SYSTEM_PROMPT
+    
+    # Ensure required placeholders exist
+    if "{context}" not in system_prompt:
+        system_prompt += "\n\nDocument Context:\n{context}"
+    if "{conversation_history}" not in system_prompt:
+        system_prompt = "Previous Conversation History:\n{conversation_history}\n\n" + system_prompt
+
+    # Create chat prompt template
+    prompt_template = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("human", "{question}")
+    ])
+    _prompt_cache.set(key, prompt_template)
+    return prompt_template
+
+def prompt_cache_stats() -> Dict:
+    return _prompt_cache.stats()
+
+def _build_initial_state(
+    query: str,
+    collection_name: str,
+    profile_id: str,
+    conversation_limit: int,
+    k_retrieval: int,
+    retriever_filter: Optional[Dict],
+    custom_system_prompt: Optional[str]
+) -> Dict:
+    # Set up vector store retriever; with reranking it over-fetches a candidate pool
+    embeddings = embeddings_for_collection(collection_name)
+    vectordb = get_vector_store(collection_name, embeddings)
+    # Runs on the event loop in the async paths, so this must not load the model (see app.main lifespan)
+    rerank = rerank_enabled()
+
+    retriever = vectordb.as_retriever(
+        search_kwargs={
+            "k": k_retrieval * max(1, RERANK_CANDIDATES) if rerank else k_retrieval,
+            **({"filter": retriever_filter} if retriever_filter else {})
+        }
+    )
+
+    prompt_template = get_prompt_template(custom_system_prompt)
+
+    # Set up initial state
+    return {
+        "question": query,
+        "retriever": retriever,
+        "embeddings": embeddings,
+        "collection_name": collection_name,
+        "hybrid": HYBRID_SEARCH_ENABLED,
+        "rerank": rerank,
+        "k_retrieval": k_retrieval,
+        "prompt_template": prompt_template,
+        "context": [],
+        "answer": "",
+        # "messages": [],
+        "profile_id": profile_id,
+        "conversation_history": "",
+        "conversation_limit": conversation_limit,
+        "query_embedding": None,
+        "custom_system_prompt": custom_system_prompt,
+        "answer_cache_scope": None,
+        "answer_cache_generation": None,
+        "cached_response": None,
+        "context_usage": {},
+        "timings": {}
+    }
+
+def _source_documents(docs: List[Document]) -> List[Dict]:
+    return [
+        {
+            "page_content": doc.page_content,
+            "metadata": doc.metadata
+        }
+        for doc in docs
+    ]
+
+def _build_response(result_state: Dict, collection_name: str, profile_id: str, started: float) -> Dict:
+    source_documents = _source_documents(result_state.get("context", []))
+    conversation_history = result_state.get("conversation_history", "")
+    timings = {**result_state.get("timings", {}), "total_ms": _elapsed_ms(started)}
+
+    response = {
+        "answer": result_state.get("answer", "No answer generated."),
+        "source_documents": source_documents,
+        "collection_used": collection_name,
+        "num_source_documents": len(source_documents),
+        "profile_id": profile_id,
+        "conversation_history_used": len(conversation_history) > 0,
+        "conversation_history_length": len(conversation_history),
+        "answer_cache_hit": False,
+        "context_usage": result_state.get("context_usage", {}),
+        "timings": timings
+    }
+
+    logger.info(f"RAG response generated - Documents: {len(source_documents)}, History used: {response['conversation_history_used']}, Timings: {timings}")
+    return response
+
+def _cached_response(cached: Dict, profile_id: str, started: float) -> Dict:
+    cached.update({"profile_id": profile_id, "answer_cache_hit": True, "timings": {"total_ms": _elapsed_ms(started)}})
+    logger.info(f"RAG answer served from cache (similarity {cached.get('answer_cache_similarity')})")
+    return cached
 
 def get_rag_response(
     query: str,
@@ -151,7 +492,8 @@ def get_rag_response(
     k_retrieval: int = 6,
     retriever_filter: Optional[Dict] = None,
     custom_system_prompt: Optional[str] = None,
-    conversation_limit: int = 10
+    conversation_limit: int = 10,
+    use_answer_cache: bool = True
 ) -> Dict:
     """
     Generate a response using RAG with document context and conversation history.
@@ -164,95 +506,218 @@ def get_rag_response(
         retriever_filter: Optional filter for document retrieval
         custom_system_prompt: Optional custom system prompt
         conversation_limit: Number of previous messages to include
+        use_answer_cache: Serve near-identical repeated questions from the semantic answer cache
     """
     logger.info(f"RAG request - Query: {query[:50]}..., Collection: {collection_name}, Profile: {profile_id}")
     
     try:
-        # Fetch conversation history
-        conversation_history = fetch_conversation_as_context_string(
-            profile_id=profile_id, 
-            limit=conversation_limit
-        )   
-        
-        # Set up vector store retriever
-        vectordb = Chroma(
-            collection_name=collection_name,
-            persist_directory="chromadb_store",
-            embedding_function=embedding_model
+        started = time.perf_counter()
+        answer_cache = get_answer_cache() if use_answer_cache else None
+        initial_state = _build_initial_state(
+            query, collection_name, profile_id, conversation_limit,
+            k_retrieval, retriever_filter, custom_system_prompt
         )
 
-        retriever = vectordb.as_retriever(
-            search_kwargs={
-                "k": k_retrieval,
-                **({"filter": retriever_filter} if retriever_filter else {})
-            }
-        )
+        # Execute RAG pipeline (history runs in parallel with the cache lookup and retrieval)
+        graph = compiled_cached_rag_graph if answer_cache is not None else compiled_rag_graph
+        result_state = graph.invoke(initial_state)
+        if result_state.get("cached_response") is not None:
+            response = _cached_response(result_state["cached_response"], profile_id, started)
+            record_conversation_turn(profile_id, query, response["answer"])
+            return response
+        response = _build_response(result_state, collection_name, profile_id, started)
+        if answer_cache is not None:
+            answer_cache.store(collection_name, result_state["answer_cache_scope"], result_state["query_embedding"],
+                               response, result_state["answer_cache_generation"])
+        record_conversation_turn(profile_id, query, response["answer"])
+        return response
 
-        # Create system prompt
-        system_prompt = custom_system_prompt + "\n\n" + DEFAULT_SYSTEM_PROMPT if custom_system_prompt else DEFAULT_SYSTEM_PROMPT
-        
-        # Ensure required placeholders exist
-        if "{context}" not in system_prompt:
-            system_prompt += "\n\nDocument Context:\n{context}"
-        if "{conversation_history}" not in system_prompt:
-            system_prompt = "Previous Conversation History:\n{conversation_history}\n\n" + system_prompt
-
-        # Create chat prompt template
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "{question}")
-        ])
-
-        # Set up initial state
-        initial_state = {
-            "question": query,
-            "retriever": retriever,
-            "prompt_template": prompt_template,
-            "context": [],
-            "answer": "",
-            # "messages": [],
-            "profile_id": profile_id,
-            "conversation_history": conversation_history
-        }
+    except HTTPException:
+        raise
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in RAG response: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"RAG processing error: {str(e)}")
 
-        # Execute RAG pipeline
-        result_state = compiled_rag_graph.invoke(initial_state)
+async def aget_rag_response(
+    query: str,
+    collection_name: str,
+    profile_id: str,
+    k_retrieval: int = 6,
+    retriever_filter: Optional[Dict] = None,
+    custom_system_prompt: Optional[str] = None,
+    conversation_limit: int = 10,
+    use_answer_cache: bool = True
+) -> Dict:
+    """
+    Async variant of get_rag_response.
 
-        # Prepare response
-        source_documents = [
-            {
-                "page_content": doc.page_content,
-                "metadata": doc.metadata
-            }
-            for doc in result_state.get("context", [])
-        ]
+    History fetch, query embedding and the LLM call are awaited, so a single
+    worker can serve many concurrent chats. Takes the same arguments and returns
+    the same response shape as get_rag_response.
+    """
+    logger.info(f"RAG request - Query: {query[:50]}..., Collection: {collection_name}, Profile: {profile_id}")
 
-        response = {
-            "answer": result_state.get("answer", "No answer generated."),
-            "source_documents": source_documents,
-            "collection_used": collection_name,
-            "num_source_documents": len(source_documents),
-            "profile_id": profile_id,
-            "conversation_history_used": len(conversation_history) > 0,
-            "conversation_history_length": len(conversation_history)
-        }
+    try:
+        started = time.perf_counter()
+        answer_cache = get_answer_cache() if use_answer_cache else None
+        initial_state = _build_initial_state(
+            query, collection_name, profile_id, conversation_limit,
+            k_retrieval, retriever_filter, custom_system_prompt
+        )
 
-        logger.info(f"RAG response generated - Documents: {len(source_documents)}, History used: {response['conversation_history_used']}")
+        graph = compiled_cached_rag_graph if answer_cache is not None else compiled_rag_graph
+        result_state = await graph.ainvoke(initial_state)
+        if result_state.get("cached_response") is not None:
+            response = _cached_response(result_state["cached_response"], profile_id, started)
+            record_conversation_turn(profile_id, query, response["answer"])
+            return response
+        response = _build_response(result_state, collection_name, profile_id, started)
+        if answer_cache is not None:
+            await asyncio.to_thread(answer_cache.store, collection_name, result_state["answer_cache_scope"],
+                                    result_state["query_embedding"], response, result_state["answer_cache_generation"])
+        record_conversation_turn(profile_id, query, response["answer"])
         return response
 
     except HTTPException:
         raise
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error in RAG response: {str(e)}")
         raise HTTPException(status_code=500, detail=f"RAG processing error: {str(e)}")
 
+def _chunk_text(chunk) -> str:
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    # Some providers return a list of content parts
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+async def astream_rag_response(
+    query: str,
+    collection_name: str,
+    profile_id: str,
+    k_retrieval: int = 6,
+    retriever_filter: Optional[Dict] = None,
+    custom_system_prompt: Optional[str] = None,
+    conversation_limit: int = 10,
+    use_answer_cache: bool = True
+) -> AsyncIterator[Dict]:
+    """
+    Stream a RAG response as a sequence of events.
+
+    Yields dictionaries with an "event" name and a "data" payload:
+        - "sources": retrieved source documents, sent as soon as retrieval finishes
+        - "token": an incremental piece of the answer
+        - "done": summary with the full answer length, history usage, prompt tokens
+          per section and stage timings
+        - "error": emitted instead of the remaining events if the pipeline fails
+
+    A semantic answer cache hit is replayed as the same event sequence, with the
+    whole answer in a single token event.
+    """
+    logger.info(f"RAG stream request - Query: {query[:50]}..., Collection: {collection_name}, Profile: {profile_id}")
+    started = time.perf_counter()
+
+    try:
+        answer_cache = get_answer_cache() if use_answer_cache else None
+        initial_state = _build_initial_state(
+            query, collection_name, profile_id, conversation_limit,
+            k_retrieval, retriever_filter, custom_system_prompt
+        )
+        graph = compiled_cached_context_graph if answer_cache is not None else compiled_context_graph
+        context_state = await graph.ainvoke(initial_state)
+        if context_state.get("cached_response") is not None:
+            cached = _cached_response(context_state["cached_response"], profile_id, started)
+            record_conversation_turn(profile_id, query, cached["answer"])
+            yield {"event": "sources", "data": {
+                "source_documents": cached["source_documents"],
+                "num_source_documents": cached["num_source_documents"],
+                "profile_id": profile_id
+            }}
+            yield {"event": "token", "data": {"text": cached["answer"]}}
+            yield {"event": "done", "data": {
+                "answer_length": len(cached["answer"]),
+                "collection_used": collection_name,
+                "num_source_documents": cached["num_source_documents"],
+                "conversation_history_used": cached["conversation_history_used"],
+                "conversation_history_length": cached["conversation_history_length"],
+                "answer_cache_hit": True,
+                "context_usage": cached.get("context_usage", {}),
+                "timings": cached["timings"]
+            }}
+            return
+
+        generation_start = time.perf_counter()
+        messages, documents, usage = _build_messages(context_state)
+        source_documents = _source_documents(documents)
+        yield {"event": "sources", "data": {
+            "source_documents": source_documents,
+            "num_source_documents": len(source_documents),
+            "profile_id": profile_id
+        }}
+
+        timings = dict(context_state.get("timings", {}))
+        llm = get_chat_model()
+        answer_parts = []
+        async for chunk in llm.astream(messages):
+            text = _chunk_text(chunk)
+            if not text:
+                continue
+            if not answer_parts:
+                timings["first_token_ms"] = _elapsed_ms(started)
+            answer_parts.append(text)
+            yield {"event": "token", "data": {"text": text}}
+
+        answer = "".join(answer_parts)
+        conversation_history = context_state.get("conversation_history", "")
+        timings["generation_ms"] = _elapsed_ms(generation_start)
+        timings["total_ms"] = _elapsed_ms(started)
+        logger.info(f"RAG stream completed - {len(answer)} characters, Timings: {timings}")
+        if answer:
+            record_conversation_turn(profile_id, query, answer)
+        if answer_cache is not None and answer:
+            entry = {
+                "answer": answer,
+                "source_documents": source_documents,
+                "collection_used": collection_name,
+                "num_source_documents": len(source_documents),
+                "conversation_history_used": len(conversation_history) > 0,
+                "conversation_history_length": len(conversation_history),
+                "context_usage": usage
+            }
+            await asyncio.to_thread(answer_cache.store, collection_name, context_state["answer_cache_scope"],
+                                    context_state["query_embedding"], entry, context_state["answer_cache_generation"])
+        yield {"event": "done", "data": {
+            "answer_length": len(answer),
+            "collection_used": collection_name,
+            "num_source_documents": len(source_documents),
+            "conversation_history_used": len(conversation_history) > 0,
+            "conversation_history_length": len(conversation_history),
+            "answer_cache_hit": False,
+            "context_usage": usage,
+            "timings": timings
+        }}
+
+    except HTTPException as e:
+        logger.error(f"Error in RAG stream: {e.detail}")
+        yield {"event": "error", "data": {"error": str(e.detail), "status_code": e.status_code}}
+    except CollectionNotFoundError as e:
+        logger.error(f"Error in RAG stream: {e}")
+        yield {"event": "error", "data": {"error": str(e), "status_code": 404}}
+    except Exception as e:
+        logger.error(f"Error in RAG stream: {str(e)}")
+        yield {"event": "error", "data": {"error": f"RAG processing error: {str(e)}", "status_code": 500}}
+
 if __name__ == "__main__":
     # Example usage
     logger.info("Running RAG example...")
     example_collection = "google_embed_chunks"
     
     try:
-        vectordb = Chroma(collection_name=example_collection, persist_directory="chromadb_store", embedding_function=embedding_model)
+        vectordb = get_vector_store(example_collection, embedding_model)
         vectordb.get()
         
         print(f"Testing collection '{example_collection}'...")
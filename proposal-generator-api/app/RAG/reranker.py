@@ -0,0 +1,107 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv # type: ignore
+from langchain_core.documents import Document # type: ignore
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "4"))  # candidate pool as a multiple of k
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))  # tokens per (query, chunk) pair
+RERANK_DEVICE = os.getenv("RERANK_DEVICE", "cpu")
+
+
+class CrossEncoderReranker:
+    """
+    Scores (query, chunk) pairs with a local sentence-transformers cross-encoder.
+
+    The whole candidate pool goes through the model as one batch, and calls are
+    serialised because the model is CPU-bound and already uses every core.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, max_length: int = RERANK_MAX_LENGTH,
+                 device: str = RERANK_DEVICE):
+        from sentence_transformers import CrossEncoder # type: ignore
+
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, max_length=max_length, device=device)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "candidates": 0, "seconds": 0.0}
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """Relevance scores of `texts` for `query`, computed in a single forward pass."""
+        if not texts:
+            return []
+        with self._lock:
+            start = time.perf_counter()
+            scores = self.model.predict(
+                [(query, text) for text in texts], batch_size=len(texts), show_progress_bar=False
+            )
+            self._stats["calls"] += 1
+            self._stats["candidates"] += len(texts)
+            self._stats["seconds"] += time.perf_counter() - start
+        return [float(score) for score in scores]
+
+    def rerank(self, query: str, documents: List[Document], top_k: int) -> List[Document]:
+        """Return the `top_k` most relevant documents, best first, with `rerank_score` metadata."""
+        scores = self.score(query, [doc.page_content for doc in documents])
+        ranked = sorted(zip(scores, range(len(documents))), key=lambda item: item[0], reverse=True)[:top_k]
+        return [
+            Document(page_content=documents[i].page_content, metadata={**documents[i].metadata, "rerank_score": score})
+            for score, i in ranked
+        ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = self._stats["calls"]
+            return {
+                "enabled": True,
+                "model": self.model_name,
+                **self._stats,
+                "seconds": round(self._stats["seconds"], 3),
+                "avg_ms": round(self._stats["seconds"] * 1000 / calls, 2) if calls else None
+            }
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_failed = False
+_reranker_lock = threading.Lock()
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """
+    Return the process-wide reranker, loading the model on first use.
+
+    Returns None when RERANK_ENABLED is off or the model cannot be loaded, in
+    which case retrieval results are used as they are.
+    """
+    global _reranker, _reranker_failed
+    if not RERANK_ENABLED or _reranker_failed:
+        return None
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None and not _reranker_failed:
+                try:
+                    _reranker = CrossEncoderReranker()
+                    logger.info(f"Loaded rerank model '{RERANK_MODEL}' on {RERANK_DEVICE}")
+                except Exception as e:
+                    _reranker_failed = True
+                    logger.error(f"Reranking disabled, could not load '{RERANK_MODEL}': {e}")
+    return _reranker
+
+
+def rerank_enabled() -> bool:
+    """Whether reranking is on and its model has not failed to load; never loads the model."""
+    return RERANK_ENABLED and not _reranker_failed
+
+
+def reranker_stats() -> Dict:
+    reranker = _reranker
+    if reranker is None:
+        return {"enabled": RERANK_ENABLED, "loaded": False, "model": RERANK_MODEL}
+    return reranker.stats()
@@ -0,0 +1,268 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+import chromadb # type: ignore
+from chromadb.errors import NotFoundError # type: ignore
+from dotenv import load_dotenv # type: ignore
+from langchain_chroma import Chroma # type: ignore
+
+from .embedding_engine import EMBEDDING_BACKEND
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "chromadb_store")
+CHROMA_WRITE_BATCH_SIZE = int(os.getenv("CHROMA_WRITE_BATCH_SIZE", "1000"))  # capped by the client's max batch size
+
+
+class CollectionNotFoundError(ValueError):
+    """Raised when a ChromaDB collection does not exist."""
+
+
+T = TypeVar("T")
+
+# Raised by operations on a handle whose collection was deleted, possibly by another process
+_STALE_HANDLE_ERRORS = tuple(
+    error for error in (NotFoundError, getattr(chromadb.errors, "InvalidCollectionException", None))
+    if isinstance(error, type)
+)
+
+
+# One client per process, plus caches of opened collection handles and
+# LangChain vector stores keyed by collection name.
+_client: Optional[Any] = None
+_collections: Dict[str, Any] = {}
+_vector_stores: Dict[str, Chroma] = {}
+_max_batch_size: Optional[int] = None
+_lock = threading.RLock()
+_stats = {"collection_hits": 0, "collection_opens": 0, "store_hits": 0, "store_opens": 0, "invalidations": 0,
+          "stale_handles": 0, "write_batches": 0, "chunks_written": 0, "write_seconds": 0.0}
+
+
+def get_chroma_client():
+    """Return the process-wide persistent ChromaDB client."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIRECTORY)
+                logger.info(f"Opened ChromaDB client at '{CHROMA_PERSIST_DIRECTORY}'")
+    return _client
+
+
+def max_batch_size() -> int:
+    """Largest number of records the ChromaDB client accepts in one write."""
+    global _max_batch_size
+    if _max_batch_size is None:
+        client = get_chroma_client()
+        getter = getattr(client, "get_max_batch_size", None)
+        reported = getter() if callable(getter) else getattr(client, "max_batch_size", None)
+        _max_batch_size = int(reported) if reported else CHROMA_WRITE_BATCH_SIZE
+    return _max_batch_size
+
+
+def get_collection(name: str, create: bool = False, metadata: Optional[Dict] = None):
+    """
+    Return a cached handle to a ChromaDB collection.
+
+    Args:
+        name: Collection name (profile_id)
+        create: Create the collection if it does not exist
+        metadata: Metadata recorded when the collection is created; ignored for
+            existing collections
+
+    Raises:
+        CollectionNotFoundError: If the collection does not exist and create is False
+    """
+    collection = _collections.get(name)
+    if collection is not None:
+        _stats["collection_hits"] += 1
+        return collection
+
+    with _lock:
+        collection = _collections.get(name)
+        if collection is None:
+            client = get_chroma_client()
+            try:
+                collection = client.get_collection(name=name)
+            except (NotFoundError, ValueError) as e:
+                if not create:
+                    raise CollectionNotFoundError(f"Collection '{name}' does not exist") from e
+                collection = client.get_or_create_collection(name=name, metadata=metadata or None)
+            _collections[name] = collection
+            _stats["collection_opens"] += 1
+        else:
+            _stats["collection_hits"] += 1
+    return collection
+
+
+def with_collection(name: str, operation: Callable[[Any], T], create: bool = False,
+                    metadata: Optional[Dict] = None) -> T:
+    """
+    Run `operation` on the cached handle of a collection.
+
+    Handles are only invalidated by the process that deletes a collection, so
+    another worker's handle goes stale. When Chroma reports the handle's
+    collection gone, the handle is dropped and the operation retried once on a
+    reopened one, which raises CollectionNotFoundError if the collection really
+    no longer exists.
+    """
+    collection = get_collection(name, create, metadata)
+    try:
+        return operation(collection)
+    except _STALE_HANDLE_ERRORS:
+        _drop_stale(name, collection)
+    return operation(get_collection(name, create, metadata))
+
+
+def open_collection(name: str, create: bool = False, metadata: Optional[Dict] = None):
+    """`get_collection`, checked against Chroma so a stale cached handle is reopened first."""
+    def checked(collection):
+        collection.count()
+        return collection
+    return with_collection(name, checked, create, metadata)
+
+
+def collection_metadata(name: str, check: bool = False) -> Optional[Dict]:
+    """
+    Metadata of an existing collection, or None if it does not exist. With
+    `check` the cached handle is validated first (see `open_collection`).
+    """
+    try:
+        return (open_collection(name) if check else get_collection(name)).metadata or {}
+    except CollectionNotFoundError:
+        return None
+
+
+def collection_embedding_backend(name: str) -> str:
+    """
+    Embedding backend recorded in a collection's metadata. Collections created
+    before backends were recorded, and collections that do not exist yet, use
+    EMBEDDING_BACKEND.
+    """
+    return (collection_metadata(name) or {}).get("embedding_backend") or EMBEDDING_BACKEND
+
+
+def get_vector_store(name: str, embedding_function) -> Chroma:
+    """
+    Return a cached LangChain Chroma wrapper bound to the shared client.
+
+    Only opens existing collections: the wrapper would otherwise create an
+    unknown one without its embedding_backend metadata.
+
+    Raises:
+        CollectionNotFoundError: If the collection does not exist
+    """
+    store = _vector_stores.get(name)
+    if store is not None:
+        _stats["store_hits"] += 1
+        return store
+
+    with _lock:
+        store = _vector_stores.get(name)
+        if store is None:
+            get_collection(name)
+            store = Chroma(
+                client=get_chroma_client(),
+                collection_name=name,
+                embedding_function=embedding_function
+            )
+            _vector_stores[name] = store
+            _stats["store_opens"] += 1
+        else:
+            _stats["store_hits"] += 1
+    return store
+
+
+def with_vector_store(name: str, embedding_function, operation: Callable[[Chroma], T]) -> T:
+    """Run `operation` on the cached vector store, reopening it once if its handle is stale (see `with_collection`)."""
+    store = get_vector_store(name, embedding_function)
+    try:
+        return operation(store)
+    except _STALE_HANDLE_ERRORS:
+        _drop_stale(name, store)
+    return operation(get_vector_store(name, embedding_function))
+
+
+def _drop_stale(name: str, handle):
+    # The collection and vector store handles of a deleted collection are both stale
+    with _lock:
+        if _collections.get(name) is handle or _vector_stores.get(name) is handle:
+            _collections.pop(name, None)
+            _vector_stores.pop(name, None)
+            _stats["stale_handles"] += 1
+            logger.info(f"Reopening stale handles of collection '{name}'")
+
+
+def invalidate_collection(name: str):
+    """Drop cached handles for a collection so the next access reopens it."""
+    with _lock:
+        _collections.pop(name, None)
+        _vector_stores.pop(name, None)
+        _stats["invalidations"] += 1
+
+
+def delete_collection(name: str):
+    """
+    Delete a collection and invalidate its cached handles.
+
+    Raises:
+        CollectionNotFoundError: If the collection does not exist
+    """
+    with _lock:
+        try:
+            get_chroma_client().delete_collection(name=name)
+        except (NotFoundError, ValueError) as e:
+            raise CollectionNotFoundError(f"Collection '{name}' does not exist") from e
+        finally:
+            invalidate_collection(name)
+
+
+def upsert_batched(collection, ids: List[str], documents: List[str],
+                   embeddings: List[List[float]], metadatas: List[Dict]) -> int:
+    """
+    Upsert records into `collection` in batches no larger than the client allows.
+
+    Upserts keep retries idempotent: writing the same ids twice leaves one copy.
+    Each batch is its own SQLite transaction, which keeps large documents from
+    holding the write lock for the whole insert.
+
+    Returns:
+        Number of records written
+    """
+    size = max(1, min(CHROMA_WRITE_BATCH_SIZE, max_batch_size()))
+    start = time.perf_counter()
+    batches = 0
+    for offset in range(0, len(ids), size):
+        end = offset + size
+        collection.upsert(
+            ids=ids[offset:end],
+            documents=documents[offset:end],
+            embeddings=embeddings[offset:end],
+            metadatas=metadatas[offset:end]
+        )
+        batches += 1
+    with _lock:
+        _stats["write_batches"] += batches
+        _stats["chunks_written"] += len(ids)
+        _stats["write_seconds"] += time.perf_counter() - start
+    return len(ids)
+
+
+def stats() -> Dict:
+    with _lock:
+        write_seconds = _stats["write_seconds"]
+        return {
+            "persist_directory": CHROMA_PERSIST_DIRECTORY,
+            "client_open": _client is not None,
+            "cached_collections": len(_collections),
+            "cached_vector_stores": len(_vector_stores),
+            "max_batch_size": _max_batch_size,
+            "write_batch_size": CHROMA_WRITE_BATCH_SIZE,
+            **_stats,
+            "write_seconds": round(write_seconds, 3),
+            "write_chunks_per_second": round(_stats["chunks_written"] / write_seconds, 1) if write_seconds else None
+        }
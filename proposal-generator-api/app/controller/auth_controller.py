@@ -1,31 +1,22 @@
 from app.utils.response import error_response, success_response
 from fastapi import APIRouter, HTTPException
 from datetime import timedelta
+from typing import Optional
 from app.utils.token import JWTAuth
 from app.model.auth_model import TokenRequest, TokenResponse, SupabaseTokenExchangeRequest
 from loguru import logger
 from app.config import settings
-from supabase import create_client, Client
+import httpx # type: ignore
+from app.utils.supabase_db import SupabaseDB, SupabaseError, get_supabase_db
 
 router = APIRouter()
 
-# Helper to get Supabase client
-_supabase_client: Client = None
-
-def get_supabase_client():
-    global _supabase_client
-    if _supabase_client is None:
-        if settings.SUPABASE_URL and settings.SUPABASE_ANON_KEY:
-            try:
-                _supabase_client = create_client(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
-                logger.info("Supabase client initialized successfully.")
-            except Exception as e:
-                logger.error(f"Failed to initialize Supabase client: {e}", exc_info=True)
-                return None
-        else:
-            logger.warning("Supabase URL or Anon Key not configured. Supabase token exchange will fail.")
-            return None
-    return _supabase_client
+# Helper to get the pooled Supabase client of the auth project
+def get_supabase_client() -> Optional[SupabaseDB]:
+    if settings.SUPABASE_URL and settings.SUPABASE_ANON_KEY:
+        return get_supabase_db(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
+    logger.warning("Supabase URL or Anon Key not configured. Supabase token exchange will fail.")
+    return None
 
 # Helper to create backend JWT
 def create_backend_jwt(user_id: str, expires_minutes: int = 60):
@@ -47,17 +38,23 @@ async def exchange_supabase_token(request_data: SupabaseTokenExchangeRequest):
         return error_response("Authentication service temporarily unavailable.", 503)
 
     try:
-        logger.info("Attempting to validate Supabase token via supabase_client.auth.get_user().")
-        user_response = supabase_client.auth.get_user(jwt=request_data.supabase_token)
-        if not user_response or not user_response.user or not user_response.user.id:
-            logger.warning(f"Supabase token validation failed or user not found. Full response: {user_response}")
+        logger.info("Attempting to validate Supabase token via the Supabase auth user endpoint.")
+        user = await supabase_client.aget_user(request_data.supabase_token)
+        if not user or not user.get("id"):
+            logger.warning(f"Supabase token validation failed or user not found. Full response: {user}")
             return error_response("Invalid or expired Supabase token.", 401)
-        supabase_user_id = str(user_response.user.id)
+        supabase_user_id = str(user["id"])
         logger.info(f"Supabase token validated successfully for Supabase user_id: {supabase_user_id}")
         expires_delta_minutes = getattr(settings, 'ACCESS_TOKEN_EXPIRE_MINUTES', 60)
         backend_access_token = create_backend_jwt(supabase_user_id, expires_delta_minutes)
         logger.info(f"Backend JWT created for Supabase user_id: {supabase_user_id}")
         return success_response(TokenResponse(access_token=backend_access_token, token_type="bearer"))
+    except SupabaseError as e:
+        logger.error(f"Supabase error during token exchange: {e}", exc_info=True)
+        return error_response("Authentication service temporarily unavailable.", 503)
+    except httpx.HTTPError as e:
+        logger.error(f"Supabase unreachable during token exchange: {e}", exc_info=True)
+        return error_response("Authentication service temporarily unavailable.", 503)
     except HTTPException as e:
         logger.error(f"HTTPException during Supabase token exchange: {e.detail}", exc_info=True)
         return error_response(str(e.detail), e.status_code)
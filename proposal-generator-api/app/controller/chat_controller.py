@@ -1,12 +1,14 @@
+import json
 import logging
 from fastapi import APIRouter, HTTPException, Body, Request # type: ignore
+from fastapi.responses import StreamingResponse # type: ignore
 
 # Models
 from app.model.chat_model import ChatRequest, ChatResponse, SourceDocument
 from app.model.doc_model import ErrorResponse # For OpenAPI responses
 
 # RAG Pipeline
-from app.RAG.rag import get_rag_response
+from app.RAG.rag import aget_rag_response, astream_rag_response
 
 # Response Utilities
 from app.utils.response import success_response, error_response # Assuming you have this
@@ -50,13 +52,14 @@ async def query_rag_pipeline(
         # logger.info(f"Chat query request for user_id: {current_user_id}, profile_id: {request.profile_id}")
         logger.info(f"Chat query request for profile_id: {request.profile_id}")
         
-        rag_result = get_rag_response(
+        rag_result = await aget_rag_response(
             query=request.query,
             collection_name=request.profile_id,
             profile_id=request.profile_id,
             k_retrieval=request.k_retrieval,
             retriever_filter=request.retriever_filter,
-            custom_system_prompt=request.system_prompt
+            custom_system_prompt=request.system_prompt,
+            use_answer_cache=request.use_answer_cache
         )   
 
         # Log conversation history usage
@@ -64,6 +67,8 @@ async def query_rag_pipeline(
         logger.info(f"- Conversation history used: {rag_result.get('conversation_history_used', False)}")
         logger.info(f"- Conversation history length: {rag_result.get('conversation_history_length', 0)} characters")
         logger.info(f"- Source documents found: {rag_result.get('num_source_documents', 0)}")
+        logger.info(f"- Stage timings (ms): {rag_result.get('timings')}")
+        logger.info(f"- Prompt context usage: {rag_result.get('context_usage')}")
 
         # Transform source_documents dicts to SourceDocument model instances if they exist
         source_docs_models = []
@@ -75,7 +80,10 @@ async def query_rag_pipeline(
             ChatResponse(
                 answer=rag_result["answer"],
                 source_documents=source_docs_models if source_docs_models else None, # Ensure None if empty
-                profile_id=rag_result["collection_used"]
+                profile_id=rag_result["collection_used"],
+                answer_cache_hit=rag_result.get("answer_cache_hit", False),
+                timings=rag_result.get("timings"),
+                context_usage=rag_result.get("context_usage")
             )
         )
     except HTTPException as e:
@@ -83,4 +91,43 @@ async def query_rag_pipeline(
         return error_response(str(e.detail), e.status_code)
     except Exception as e:
         logger.error(f"Unexpected error in chat controller while querying RAG: {str(e)}", exc_info=True)
-        return error_response("An unexpected error occurred while processing your chat request.", 500) 
\ No newline at end of file
+        return error_response("An unexpected error occurred while processing your chat request.", 500)
+
+def _format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/query/stream",
+            summary="Query the RAG pipeline and stream the answer as server-sent events.",
+            responses={
+                200: {"content": {"text/event-stream": {}}, "description": "Stream of sources, token and done events"},
+                422: {"model": ErrorResponse, "description": "Validation Error (e.g., invalid filter, bad request parameters)"}
+            }
+)
+async def query_rag_pipeline_stream(request: ChatRequest = Body(...)):
+    """
+    Same inputs as `/query`, but the answer is streamed as server-sent events:
+
+    - **sources**: retrieved source documents, sent first
+    - **token**: incremental answer text, sent as Gemini produces it
+    - **done**: final summary (answer length, history usage, prompt tokens per section, stage timings)
+    - **error**: sent instead of the remaining events if the pipeline fails
+    """
+    logger.info(f"Chat stream request for profile_id: {request.profile_id}")
+
+    async def event_stream():
+        async for event in astream_rag_response(
+            query=request.query,
+            collection_name=request.profile_id,
+            profile_id=request.profile_id,
+            k_retrieval=request.k_retrieval,
+            retriever_filter=request.retriever_filter,
+            custom_system_prompt=request.system_prompt,
+            use_answer_cache=request.use_answer_cache
+        ):
+            yield _format_sse(event["event"], event["data"])
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
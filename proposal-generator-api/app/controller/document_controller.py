@@ -1,11 +1,11 @@
 import os
+import asyncio
 import shutil
 import logging
 import tempfile
 import io
 import uuid
 import hashlib
-import chromadb
 # import pymupdf # No longer directly used here, but indirectly by read_pdf
 from fastapi import APIRouter, UploadFile, HTTPException, File, Depends, Body, Form # Added Form
 from typing import List, Optional # Added Optional
@@ -15,13 +15,20 @@ from app.RAG.embed import (
     chunk_by_headings, 
     store_chunks_in_chromadb, 
     read_pdf,
-    delete_collection_from_chromadb # Added delete_collection_from_chromadb
+    delete_collection_from_chromadb, # Added delete_collection_from_chromadb
+    delete_file_from_collection,
+    find_duplicate_document,
+    document_exists
 )
+from app.RAG.ingest import get_ingestion_queue, QueueFullError, IngestionJob, INGEST_WAIT_DEFAULT
+from app.RAG.embedding_engine import EMBEDDING_BACKEND, EMBEDDING_BACKENDS
+from app.RAG import vectorstore
 # import pymupdf4llm # No longer directly used here, but indirectly by read_pdf
 
 # Imports from model
 from app.model.doc_model import (
     FileUploadResponse,
+    IngestionStatusResponse,
     ErrorResponse, 
     ErrorDetail, # Kept for context, though not directly used for raising errors here
     validate_uploaded_pdf, 
@@ -33,6 +40,7 @@ from app.model.doc_model import (
 )
 # Import for success_response
 from app.utils.response import success_response, error_response
+from app.utils.upload import spool_upload
 
 
 # Configure logging
@@ -41,6 +49,34 @@ logging.basicConfig(level=logging.INFO)
 
 router = APIRouter()
 
+
+async def _queued_response(job: IngestionJob, wait: Optional[bool], queued_detail: str, done_detail: str):
+    """
+    Answer for a submitted job: 202 "processing" right away, or with `wait`
+    (INGEST_WAIT_DEFAULT when not given) the "completed" response with
+    `chunks_created` once the job has finished.
+    """
+    if not (INGEST_WAIT_DEFAULT if wait is None else wait):
+        return success_response(FileUploadResponse(
+            document_id=job.document_id,
+            collection_id=job.collection_name,
+            status="processing",
+            filename=job.filename,
+            detail=queued_detail
+        ), 202)
+
+    await asyncio.wrap_future(job.future)
+    if job.status != "completed":
+        return error_response(f"Error processing document: {job.error}", 500)
+    return success_response(FileUploadResponse(
+        document_id=job.document_id,
+        collection_id=job.collection_name,
+        status="completed",
+        filename=job.filename,
+        detail=done_detail,
+        chunks_created=job.chunks_created
+    ))
+
 @router.post("/upload",
             summary="Upload a document and create embeddings",
             response_model=FileUploadResponse
@@ -48,48 +84,154 @@ router = APIRouter()
 async def upload_document(
     file: UploadFile = File(...),
     profileID: str = Form(...),  # Changed from Body to Form
+    embeddingBackend: Optional[str] = Form(None),
+    wait: Optional[bool] = Form(None),
 ):
+    """
+    Hands the PDF to the background ingestion queue. By default the response
+    is sent once the document is stored ("completed" with `chunks_created`);
+    with `wait=false` it returns 202 "processing" right away and
+    /doc/status/{document_id} reports parse / embed / store progress.
+
+    `embeddingBackend` (google | local | fake) picks the embedding backend of a
+    new collection; it is recorded on the collection and must match on later uploads.
+    """
     try:
         # Validate the uploaded file
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
 
+        if embeddingBackend:
+            if embeddingBackend not in EMBEDDING_BACKENDS:
+                return error_response(f"Unknown embedding backend '{embeddingBackend}'", 400)
+            current = await asyncio.to_thread(vectorstore.collection_metadata, profileID)
+            recorded = (current or {}).get("embedding_backend") or EMBEDDING_BACKEND
+            if current is not None and recorded != embeddingBackend:
+                return error_response(f"Collection '{profileID}' uses embedding backend '{recorded}'", 409)
+
         # Generate a unique document ID
         document_id = str(uuid.uuid4())
         
-        # Read and validate PDF content
-        pdf_bytes = await file.read()
-        if not validate_pdf_bytes(pdf_bytes, file.filename):
-            raise HTTPException(status_code=400, detail="Invalid PDF file")
-
-        # Create a temporary file to process the PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(pdf_bytes)
-            tmp_file.flush()
-            
-            try:
-                # Extract text from PDF
-                chunks = read_pdf(tmp_file.name, source=file.filename)
-                
-                # Store chunks in ChromaDB
-                collection = store_chunks_in_chromadb(chunks, profileID, document_id)
-                
-                return success_response(FileUploadResponse(
-                    document_id=document_id,
-                    collection_id=profileID,
-                    status="completed",
-                    filename=file.filename,
-                    detail="Document processed successfully",
-                    chunks_created=len(chunks)
-                ))
-            finally:
-                # Clean up temporary file
-                os.unlink(tmp_file.name)
-                
+        # Stream the PDF to a spool file; the queue deletes it when the job finishes
+        upload = await spool_upload(file)
+
+        # Identical content already stored or being ingested in this collection: reuse it
+        existing = await asyncio.to_thread(find_duplicate_document, profileID, upload.sha256)
+        if existing is None:
+            active = await asyncio.to_thread(get_ingestion_queue().find_active, profileID, upload.sha256)
+            if active is not None:
+                existing = {"document_id": active["document_id"], "chunks": None}
+        if existing is not None:
+            os.unlink(upload.path)
+            stored = existing["chunks"] is not None
+            logger.info(f"Upload '{file.filename}' duplicates document '{existing['document_id']}' in '{profileID}'")
+            return success_response(FileUploadResponse(
+                document_id=existing["document_id"],
+                collection_id=profileID,
+                status="completed" if stored else "processing",
+                filename=file.filename,
+                detail="Document already exists in this collection" if stored
+                       else "Identical document is already being processed",
+                chunks_created=existing["chunks"]
+            ))
+
+        try:
+            job = await asyncio.to_thread(
+                get_ingestion_queue().submit, document_id, profileID, file.filename, upload.path,
+                upload.sha256, embedding_backend=embeddingBackend
+            )
+        except QueueFullError as e:
+            os.unlink(upload.path)
+            logger.warning(str(e))
+            return error_response(f"{e}. Please retry shortly.", 503)
+
+        return await _queued_response(
+            job, wait, "Document queued for processing", "Document processed successfully"
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing document: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
 
+@router.post("/replace",
+            summary="Replace a stored document with a revised version",
+            response_model=FileUploadResponse
+)
+async def replace_document(
+    file: UploadFile = File(...),
+    profileID: str = Form(...),
+    document_id: str = Form(...),
+    wait: Optional[bool] = Form(None),
+):
+    """
+    Queues a revised PDF for an existing document. Only chunks whose content
+    changed are embedded; removed chunks are deleted and the rest are kept.
+    Responds like /doc/upload: once stored by default, or with 202 and progress
+    at /doc/status/{document_id} when `wait=false`.
+    """
+    try:
+        if not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail="Only PDF files are supported")
+
+        upload = await spool_upload(file)
+
+        # Same bytes as another document: keep both entries intact; as the stored version: nothing to do
+        existing = await asyncio.to_thread(find_duplicate_document, profileID, upload.sha256)
+        if existing is not None and existing["document_id"] != document_id:
+            os.unlink(upload.path)
+            return error_response(
+                f"Revised file is identical to document '{existing['document_id']}' in collection '{profileID}'", 409
+            )
+        if existing is not None:
+            os.unlink(upload.path)
+            return success_response(FileUploadResponse(
+                document_id=document_id,
+                collection_id=profileID,
+                status="completed",
+                filename=file.filename,
+                detail="Document is unchanged",
+                chunks_created=existing["chunks"]
+            ))
+
+        if not await asyncio.to_thread(document_exists, profileID, document_id):
+            os.unlink(upload.path)
+            return error_response(f"Document '{document_id}' not found in collection '{profileID}'", 404)
+
+        try:
+            job = await asyncio.to_thread(
+                get_ingestion_queue().submit, document_id, profileID, file.filename, upload.path,
+                upload.sha256, replace=True
+            )
+        except QueueFullError as e:
+            os.unlink(upload.path)
+            logger.warning(str(e))
+            return error_response(f"{e}. Please retry shortly.", 503)
+        except ValueError as e:
+            os.unlink(upload.path)
+            return error_response(str(e), 409)
+
+        return await _queued_response(
+            job, wait, "Revised document queued for processing", "Document replaced successfully"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error replacing document: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error replacing document: {str(e)}")
+
+@router.get("/status/{document_id}",
+            summary="Get ingestion progress for an uploaded document",
+            response_model=IngestionStatusResponse
+)
+async def get_document_status(document_id: str):
+    status = await asyncio.to_thread(get_ingestion_queue().status, document_id)
+    if status is None:
+        return error_response(f"No ingestion job found for document '{document_id}'", 404)
+    return success_response(IngestionStatusResponse(**status))
+
 @router.post("/delete",
             summary="Delete a ChromaDB collection by name",
             response_model=DeleteCollectionResponse,
@@ -128,22 +270,20 @@ async def delete_file_from_collection_endpoint(request: DeleteFileRequest = Body
     try:
         logger.info(f"Attempting to delete file {request.file_id} from collection: {request.collection_name}")
         
-        chroma_client = chromadb.PersistentClient(path="chromadb_store")
-        collection = chroma_client.get_collection(name=request.collection_name)
-        
         # Delete all chunks associated with this file_id
-        collection.delete(
-            where={"file_id": request.file_id}
-        )
+        delete_file_from_collection(request.collection_name, request.file_id)
         
         logger.info(f"Successfully deleted file {request.file_id} from collection: {request.collection_name}")
         return success_response(DeleteCollectionResponse(
             collection_name=request.collection_name,
             detail=f"File '{request.file_id}' has been successfully deleted from collection '{request.collection_name}'."
         ))
-    except ValueError as ve:
-        logger.error(f"Collection or file not found: {str(ve)}", exc_info=True)
-        return error_response("Collection or file not found", 404)
+    except HTTPException as e:
+        if e.status_code == 404:
+            logger.error(f"Collection or file not found: {e.detail}", exc_info=True)
+            return error_response("Collection or file not found", 404)
+        logger.error(f"HTTPException during file deletion: {e.detail}", exc_info=True)
+        return error_response(str(e.detail), e.status_code)
     except Exception as e:
         logger.error(f"Error deleting file from collection: {str(e)}", exc_info=True)
         return error_response(f"Error deleting file: {str(e)}", 500)
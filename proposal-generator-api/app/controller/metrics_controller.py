@@ -0,0 +1,120 @@
+from fastapi import APIRouter # type: ignore
+from loguru import logger
+
+from app.RAG.embedding_cache import get_embedding_cache
+from app.RAG.embedding_engine import EMBEDDING_BACKEND, engine_stats
+from app.RAG import vectorstore, lexical_index
+from app.RAG.answer_cache import get_answer_cache
+from app.RAG.ingest import get_ingestion_queue
+from app.RAG.pdf_parser import get_pdf_parser
+from app.RAG.document_index import get_document_index
+from app.RAG.llm import pool_stats
+from app.RAG.rag import prompt_cache_stats, history_cache_stats
+from app.RAG.reranker import reranker_stats
+from app.utils.response import success_response, error_response
+from app.utils.supabase_db import supabase_stats
+
+router = APIRouter()
+
+@router.get("/embeddings", summary="Embedding engine and cache counters")
+async def embedding_metrics():
+    """
+    Returns embedding engine counters and embedding cache hit/miss statistics.
+    Only engines already created are reported (`engine` is the default backend's,
+    null until it is first used), so this never loads an embedding model.
+    """
+    try:
+        cache = get_embedding_cache()
+        engines = engine_stats()
+        return success_response({
+            "engine": engines.get(EMBEDDING_BACKEND.lower()),
+            "engines": engines,
+            "cache": cache.stats() if cache else {"enabled": False}
+        })
+    except Exception as e:
+        logger.error(f"Error collecting embedding metrics: {str(e)}", exc_info=True)
+        return error_response("Error collecting embedding metrics.", 500)
+
+@router.get("/vectorstore", summary="ChromaDB client and collection handle cache counters")
+async def vectorstore_metrics():
+    """
+    Returns counters for the pooled ChromaDB client and its collection handle cache.
+    """
+    try:
+        return success_response(vectorstore.stats())
+    except Exception as e:
+        logger.error(f"Error collecting vector store metrics: {str(e)}", exc_info=True)
+        return error_response("Error collecting vector store metrics.", 500)
+
+@router.get("/retrieval", summary="BM25 lexical index and cross-encoder reranker counters")
+async def retrieval_metrics():
+    """
+    Returns build counters and per-collection size of the lexical indexes used by
+    hybrid retrieval, and call/latency counters of the reranker.
+    """
+    try:
+        return success_response({
+            "lexical_index": lexical_index.stats(),
+            "reranker": reranker_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error collecting retrieval metrics: {str(e)}", exc_info=True)
+        return error_response("Error collecting retrieval metrics.", 500)
+
+@router.get("/llm", summary="LLM client pool and prompt template cache counters")
+async def llm_metrics():
+    """
+    Returns pooled chat model client counters and prompt template cache statistics.
+    """
+    try:
+        return success_response({
+            "clients": pool_stats(),
+            "prompt_cache": prompt_cache_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error collecting LLM metrics: {str(e)}", exc_info=True)
+        return error_response("Error collecting LLM metrics.", 500)
+
+@router.get("/history", summary="Conversation history cache and Supabase client counters")
+async def history_metrics():
+    """
+    Returns memory read, full load and delta query counters of the per-profile
+    conversation history cache (with rolling summary refresh counters), and
+    request/coalescing counters of the pooled Supabase clients.
+    """
+    try:
+        return success_response({
+            "cache": history_cache_stats(),
+            "supabase": supabase_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error collecting history cache metrics: {str(e)}", exc_info=True)
+        return error_response("Error collecting history cache metrics.", 500)
+
+@router.get("/answer-cache", summary="Semantic answer cache counters")
+async def answer_cache_metrics():
+    """
+    Returns hit/miss counters and size of the semantic answer cache.
+    """
+    try:
+        cache = get_answer_cache()
+        return success_response(cache.stats() if cache else {"enabled": False})
+    except Exception as e:
+        logger.error(f"Error collecting answer cache metrics: {str(e)}", exc_info=True)
+        return error_response("Error collecting answer cache metrics.", 500)
+
+@router.get("/ingestion", summary="Background ingestion queue and PDF parser pool counters")
+async def ingestion_metrics():
+    """
+    Returns worker, queue depth and job outcome counters for document ingestion,
+    page counters of the PDF parser process pool and duplicate upload counters.
+    """
+    try:
+        return success_response({
+            "queue": get_ingestion_queue().stats(),
+            "pdf_parser": get_pdf_parser().stats(),
+            "document_index": get_document_index().stats()
+        })
+    except Exception as e:
+        logger.error(f"Error collecting ingestion metrics: {str(e)}", exc_info=True)
+        return error_response("Error collecting ingestion metrics.", 500)
@@ -1,10 +1,23 @@
+import asyncio
+from contextlib import asynccontextmanager
 from app.route import setup_routes
 from fastapi import FastAPI # type: ignore
 from app.middleware import setup_middlewares
 from app.config import settings
 from app.logger import setup_logger
 
-app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the PDF parser worker processes before the first upload arrives
+    from app.RAG.pdf_parser import get_pdf_parser
+    await asyncio.to_thread(get_pdf_parser().warm_up)
+    # Load the cross-encoder (when enabled) so no request pays for it
+    from app.RAG.reranker import get_reranker
+    await asyncio.to_thread(get_reranker)
+    yield
+    get_pdf_parser().shutdown()
+
+app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG, lifespan=lifespan)
 
 # Setup logger
 setup_logger(settings)
@@ -1,8 +1,9 @@
 from app.config import settings
 from fastapi import FastAPI # type: ignore  
-from .logging import log_requests_middleware
+from .logging import RequestLoggingMiddleware
 from fastapi.middleware.cors import CORSMiddleware # type: ignore
 from .jwt_auth import JWTAuthMiddleware # type: ignore  
+from .upload_limit import UploadSizeLimitMiddleware
 
 def setup_middlewares(app: FastAPI):
     """Apply all middlewares to the FastAPI app"""
@@ -19,6 +20,9 @@ def setup_middlewares(app: FastAPI):
     # Add JWT authentication middleware after CORS
     # Temporarily disabled authentication
     # app.add_middleware(JWTAuthMiddleware)
+
+    # Cap upload bodies while they are received, before Starlette spools the multipart form
+    app.add_middleware(UploadSizeLimitMiddleware)
     
-    # Add logging middleware last
-    app.middleware("http")(log_requests_middleware)
\ No newline at end of file
+    # Add logging middleware last (outermost, so its duration covers the whole stack)
+    app.add_middleware(RequestLoggingMiddleware)
\ No newline at end of file
@@ -1,44 +1,126 @@
+import os
+import re
 import time
-import json
+import random
+from typing import Dict, List, Optional
+
 from loguru import logger # type: ignore
-from fastapi import Request # type: ignore  
-from starlette.responses import Response # type: ignore
-
-async def log_requests_middleware(request: Request, call_next):
-    """Enhanced middleware to log API requests with detailed debugging info"""
-
-    start_time = time.time()  # Start the timer
-    
-    # Log request details
-    headers = dict(request.headers)
-    auth_header = headers.get("authorization", "NO AUTH HEADER")
-    
-    logger.info(f"🔵 INCOMING REQUEST: {request.method} {request.url.path}")
-    logger.info(f"📋 Headers: {json.dumps(dict(headers), indent=2)}")
-    logger.info(f"🔑 Authorization Header: {auth_header}")
-    
-    # Log request body for POST/PUT/PATCH
-    request_body = None
-    if request.method in ("POST", "PUT", "PATCH"):
+
+REQUEST_LOG_LEVEL = os.getenv("REQUEST_LOG_LEVEL", "INFO")  # level of the per-request line; errors use ERROR
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0"))  # share of requests logged with their body
+REQUEST_LOG_BODY_MAX_BYTES = int(os.getenv("REQUEST_LOG_BODY_MAX_BYTES", "2048"))
+# Path prefixes whose bodies are never captured (credentials are exchanged there)
+REQUEST_LOG_SKIP_BODY_PATHS = tuple(
+    p.strip() for p in os.getenv("REQUEST_LOG_SKIP_BODY_PATHS", "/auth").split(",") if p.strip()
+)
+
+# Bodies of these content types are never captured
+_BINARY_CONTENT_TYPES = ("multipart/", "application/octet-stream", "application/pdf", "image/", "audio/", "video/")
+_BODY_METHODS = {"POST", "PUT", "PATCH"}
+# Values of JSON / form fields whose name mentions a credential are masked
+_SECRET_FIELD = re.compile(
+    r'("?[\w-]*(?:token|password|passwd|secret|api[_-]?key|authorization|credential)[\w-]*"?\s*[:=]\s*)'
+    r'("(?:[^"\\]|\\.)*"?|[^,&}\s]*)',
+    re.IGNORECASE
+)
+
+
+def _header(scope: Dict, name: bytes) -> str:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+def _redact(text: str) -> str:
+    return _SECRET_FIELD.sub(r'\1"***"', text)
+
+
+def _capturable(scope: Dict) -> bool:
+    if scope["method"] not in _BODY_METHODS or scope["path"].startswith(REQUEST_LOG_SKIP_BODY_PATHS):
+        return False
+    content_type = _header(scope, b"content-type").lower()
+    return bool(content_type) and not content_type.startswith(_BINARY_CONTENT_TYPES)
+
+
+def _render(scope: Dict, status: int, duration_ms: float, bytes_out: int, body: Optional[List[bytes]],
+            error: Optional[BaseException]) -> str:
+    client = scope.get("client")
+    line = (
+        f"{'✅' if status < 400 else '❌'} {scope['method']} {scope['path']} status={status} "
+        f"duration_ms={duration_ms:.2f} bytes_out={bytes_out} "
+        f"client={client[0] if client else '-'} user_agent=\"{_header(scope, b'user-agent')}\""
+    )
+    if scope.get("query_string"):
+        line += f" query=\"{scope['query_string'].decode('latin-1')}\""
+    if body is not None:
+        text = _redact(b"".join(body)[:REQUEST_LOG_BODY_MAX_BYTES].decode("utf-8", errors="replace"))
+        line += f" body={text!r}"
+    if error is not None:
+        line += f" error={type(error).__name__}: {error}"
+    return line
+
+
+class RequestLoggingMiddleware:
+    """
+    ASGI middleware that logs one line per request.
+
+    The line carries method, path, status, duration, response size, client and
+    user agent; headers (including Authorization) are not logged. Request bodies
+    are never re-read: the first REQUEST_LOG_BODY_MAX_BYTES the application
+    consumes are kept by reference and rendered only for a sampled share of
+    requests (none by default) and for failed (5xx or raising) ones. Bodies of
+    multipart/binary uploads and of REQUEST_LOG_SKIP_BODY_PATHS are never
+    captured, and credential-like fields are masked in the rest. The line is
+    built lazily, so nothing is formatted when the log level is disabled.
+    """
+
+    def __init__(self, app, level: str = REQUEST_LOG_LEVEL, sample_rate: float = REQUEST_LOG_SAMPLE_RATE,
+                 body_max_bytes: int = REQUEST_LOG_BODY_MAX_BYTES):
+        self.app = app
+        self.level = level
+        self.sample_rate = sample_rate
+        self.body_max_bytes = body_max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        bytes_out = 0
+        body: Optional[List[bytes]] = [] if self.body_max_bytes > 0 and _capturable(scope) else None
+        captured = 0
+
+        async def receive_capturing():
+            nonlocal captured
+            message = await receive()
+            if message["type"] == "http.request" and captured < self.body_max_bytes:
+                chunk = message.get("body", b"")
+                body.append(chunk)
+                captured += len(chunk)
+            return message
+
+        async def send_tracking(message):
+            nonlocal status, bytes_out
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_out += len(message.get("body", b""))
+            await send(message)
+
+        error: Optional[BaseException] = None
         try:
-            request_body = await request.body()
-            if request_body:
-                # Try to decode as JSON for better logging
-                try:
-                    body_json = json.loads(request_body.decode())
-                    logger.info(f"📄 Request Body (JSON): {json.dumps(body_json, indent=2)}")
-                except:
-                    logger.info(f"📄 Request Body (Raw): {request_body.decode()[:500]}...")
+            await self.app(scope, receive_capturing if body is not None else receive, send_tracking)
         except Exception as e:
-            logger.error(f"❌ Error reading request body: {e}")
-    
-    # Process the request
-    response = await call_next(request)
-    
-    duration = (time.time() - start_time) * 1000  # Convert to milliseconds
-    
-    # Log response details
-    status_emoji = "✅" if response.status_code < 400 else "❌"
-    logger.info(f"{status_emoji} RESPONSE: {request.method} {request.url.path} | Status: {response.status_code} | Time: {duration:.2f}ms")
-    
-    return response
\ No newline at end of file
+            error = e
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            failed = error is not None or status >= 500
+            with_body = body if body is not None and (failed or random.random() < self.sample_rate) else None
+            logger.opt(lazy=True).log(
+                "ERROR" if failed else self.level, "{}",
+                lambda: _render(scope, status, duration_ms, bytes_out, with_body, error)
+            )
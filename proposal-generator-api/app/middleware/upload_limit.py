@@ -0,0 +1,63 @@
+import os
+from typing import Dict, Iterable
+
+from fastapi import HTTPException # type: ignore
+
+from app.utils.response import error_response
+from app.utils.upload import UPLOAD_MAX_BYTES
+
+UPLOAD_FORM_OVERHEAD_BYTES = int(os.getenv("UPLOAD_FORM_OVERHEAD_BYTES", str(64 * 1024)))  # multipart boundaries and form fields
+UPLOAD_PATHS = ("/doc/upload", "/doc/replace")
+
+
+def _content_length(scope: Dict) -> int:
+    for key, value in scope.get("headers", ()):
+        if key == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return -1
+    return -1
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that caps the request body of the upload endpoints.
+
+    Starlette parses (and spools) the whole multipart body before a route runs,
+    so the limit in `spool_upload` only applies once the upload has already been
+    received. This guard enforces it while the body arrives instead: a declared
+    Content-Length over the limit is answered with 413 before any body is read,
+    and bodies without one (chunked) are counted as they are received and
+    rejected with 413 as soon as they pass it.
+    """
+
+    def __init__(self, app, max_bytes: int = UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD_BYTES,
+                 paths: Iterable[str] = UPLOAD_PATHS):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Uploaded file exceeds the {UPLOAD_MAX_BYTES // (1024 * 1024)} MB limit."
+        if _content_length(scope) > self.max_bytes:
+            await error_response(detail, 413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside form parsing; FastAPI re-raises HTTPException as is
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, receive_limited, send)
@@ -7,6 +7,7 @@ class ChatRequest(BaseModel):
     k_retrieval: int = Field(default=3, ge=1, le=10, description="Number of documents to retrieve.")
     retriever_filter: Optional[Dict[str, Any]] = Field(default=None, description="Optional filter for the ChromaDB retriever, e.g., {\"source\": \"filename.pdf\"}.")
     system_prompt: Optional[str] = Field(default=None, description="Optional custom system prompt to override the default.")
+    use_answer_cache: bool = Field(default=True, description="Serve near-identical repeated questions from the semantic answer cache.")
 
 class SourceDocument(BaseModel):
     page_content: str
@@ -15,4 +16,7 @@ class SourceDocument(BaseModel):
 class ChatResponse(BaseModel):
     answer: str = Field(..., description="The LLM's answer to the query.")
     source_documents: Optional[List[SourceDocument]] = Field(default=None, description="List of source documents used to generate the answer.")
-    profile_id: str = Field(..., description="The ChromaDB collection that was queried.") 
\ No newline at end of file
+    profile_id: str = Field(..., description="The ChromaDB collection that was queried.")
+    answer_cache_hit: bool = Field(default=False, description="True when the answer was served from the semantic answer cache.")
+    timings: Optional[Dict[str, float]] = Field(default=None, description="Per-stage latency in milliseconds (history, retrieval, generation, total).")
+    context_usage: Optional[Dict[str, Any]] = Field(default=None, description="Prompt tokens per section (history, documents, question) against the context budget.") 
\ No newline at end of file
@@ -21,6 +21,24 @@ class FileUploadResponse(BaseModel):
             raise ValueError('document_id must be a valid UUID string')
         return v
 
+class IngestionStatusResponse(BaseModel):
+    document_id: str
+    collection_id: str
+    filename: str
+    operation: str = "upload"  # upload | replace
+    status: str  # queued | processing | completed | failed
+    stage: str
+    pages_total: Optional[int] = None
+    pages_parsed: int = 0
+    chunks_total: Optional[int] = None
+    chunks_embedded: int = 0
+    chunks_reused: int = 0
+    chunks_stored: int = 0
+    chunks_removed: int = 0
+    error: Optional[str] = None
+    queued_seconds: Optional[float] = None
+    elapsed_seconds: Optional[float] = None
+
 class ErrorDetail(BaseModel):
     code: int
     message: str
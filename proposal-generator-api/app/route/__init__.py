@@ -6,6 +6,7 @@ from app.controller.test_controller import router as test_router
 from app.controller.auth_controller import router as auth_router
 from app.controller.document_controller import router as document_controller
 from app.controller.chat_controller import router as chat_controller
+from app.controller.metrics_controller import router as metrics_controller
 from app.utils.response import error_response
 
 def setup_routes(app: FastAPI):
@@ -64,4 +65,5 @@ def setup_routes(app: FastAPI):
     app.include_router(auth_router, prefix="/auth", tags=["Auth"])
     app.include_router(document_controller, prefix="/doc", tags=["Document"])
     app.include_router(chat_controller, prefix="/chat", tags=["Chat"])
+    app.include_router(metrics_controller, prefix="/metrics", tags=["Metrics"])
     
\ No newline at end of file
@@ -0,0 +1,229 @@
+import os
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Coroutine, Dict, List, Optional, Sequence, Tuple
+
+import httpx # type: ignore
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))  # seconds per request
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "3"))
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))  # idle seconds before a pooled connection closes
+
+# (column, operator, value), e.g. ("profile_id", "eq", profile_id) or ("created_at", "gt", timestamp)
+Filter = Tuple[str, str, Any]
+
+
+class SupabaseError(Exception):
+    """A PostgREST or GoTrue request answered with an error status."""
+
+    def __init__(self, status_code: int, message: str, code: Optional[str] = None):
+        super().__init__(f"Supabase request failed ({status_code}): {message}")
+        self.status_code = status_code
+        self.message = message
+        self.code = code  # PostgREST error code, e.g. PGRST202 for an unknown function
+
+
+@dataclass
+class SelectResult:
+    """Rows of a table query and, when requested, the exact row count."""
+    data: List[Dict]
+    count: Optional[int] = None
+
+
+class SupabaseDB:
+    """
+    Supabase data access over one pooled HTTP client.
+
+    Requests go straight to the PostgREST (/rest/v1) and GoTrue (/auth/v1)
+    endpoints through a single httpx.AsyncClient with keep-alive connections and
+    timeouts. The client lives on a dedicated event loop thread so that it can
+    be shared by coroutines (`aselect`, `aget_user`) and by synchronous code
+    running in worker threads (`select`, `get_user`) without either blocking the
+    application's event loop. Identical GET requests already in flight are
+    coalesced into one round trip.
+    """
+
+    def __init__(self, url: str, key: str, timeout: float = SUPABASE_TIMEOUT,
+                 connect_timeout: float = SUPABASE_CONNECT_TIMEOUT,
+                 max_connections: int = SUPABASE_MAX_CONNECTIONS,
+                 keepalive_expiry: float = SUPABASE_KEEPALIVE_EXPIRY):
+        self.url = url.rstrip("/")
+        self._key = key
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                    keepalive_expiry=keepalive_expiry)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple, asyncio.Task] = {}  # only touched on the client loop
+        self._stats = {"requests": 0, "coalesced": 0, "errors": 0}
+
+    # ---- table access ----
+
+    async def aselect(self, table: str, columns: str = "*", filters: Sequence[Filter] = (),
+                      order: Optional[str] = None, desc: bool = False, limit: Optional[int] = None,
+                      count: bool = False) -> SelectResult:
+        """Rows of `table` matching every filter, optionally ordered, limited and counted."""
+        params = [("select", columns)]
+        params += [(column, f"{operator}.{value}") for column, operator, value in filters]
+        if order:
+            params.append(("order", f"{order}.{'desc' if desc else 'asc'}"))
+        if limit is not None:
+            params.append(("limit", str(limit)))
+        headers = {"Prefer": "count=exact"} if count else {}
+        status, body, response_headers = await self._call(self._get(f"/rest/v1/{table}", params, headers))
+        if status >= 400:
+            raise SupabaseError(status, _error_message(body), _error_code(body))
+        return SelectResult(data=body or [], count=_content_range_count(response_headers) if count else None)
+
+    def select(self, table: str, columns: str = "*", filters: Sequence[Filter] = (),
+               order: Optional[str] = None, desc: bool = False, limit: Optional[int] = None,
+               count: bool = False) -> SelectResult:
+        """Blocking variant of `aselect` for code running outside an event loop."""
+        return self._run(self.aselect(table, columns, filters, order, desc, limit, count))
+
+    async def arpc(self, function: str, params: Dict[str, Any]) -> Any:
+        """
+        Call a stable/immutable Postgres function exposed by PostgREST.
+
+        The call is a GET with the arguments as query parameters, so concurrent
+        identical calls are coalesced like table reads.
+        """
+        path = f"/rest/v1/rpc/{function}"
+        status, body, _ = await self._call(self._get(path, [(name, str(value)) for name, value in params.items()], {}))
+        if status >= 400:
+            raise SupabaseError(status, _error_message(body), _error_code(body))
+        return body
+
+    def rpc(self, function: str, params: Dict[str, Any]) -> Any:
+        return self._run(self.arpc(function, params))
+
+    def run(self, coro: Coroutine):
+        """Run a coroutine of this client (e.g. several gathered `aselect` calls) from synchronous code."""
+        return self._run(coro)
+
+    # ---- auth ----
+
+    async def aget_user(self, jwt: str) -> Optional[Dict]:
+        """The user a Supabase access token belongs to, or None if the token is invalid or expired."""
+        status, body, _ = await self._call(self._get("/auth/v1/user", [], {"Authorization": f"Bearer {jwt}"}))
+        if status in (401, 403):
+            return None
+        if status >= 400:
+            raise SupabaseError(status, _error_message(body))
+        return body
+
+    def get_user(self, jwt: str) -> Optional[Dict]:
+        return self._run(self.aget_user(jwt))
+
+    # ---- lifecycle ----
+
+    def close(self):
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop = self._thread = self._client = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+    def stats(self) -> Dict:
+        return {"url": self.url, "in_flight": len(self._inflight), **self._stats}
+
+    # ---- internals ----
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name="supabase-db", daemon=True)
+                    thread.start()
+                    self._client = httpx.AsyncClient(base_url=self.url, timeout=self._timeout, limits=self._limits,
+                                                     headers={"apikey": self._key, "Authorization": f"Bearer {self._key}"})
+                    self._thread = thread
+                    self._loop = loop
+        return self._loop
+
+    def _run(self, coro: Coroutine):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    async def _call(self, coro: Coroutine):
+        # Hop onto the client loop; awaiting the wrapped future keeps the caller's loop free
+        loop = self._ensure_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def _get(self, path: str, params: List[Tuple[str, str]], headers: Dict[str, str]):
+        key = (path, tuple(params), tuple(sorted(headers.items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._send(path, params, headers))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _send(self, path: str, params: List[Tuple[str, str]], headers: Dict[str, str]):
+        self._stats["requests"] += 1
+        try:
+            response = await self._client.get(path, params=params, headers=headers)
+        except httpx.HTTPError:
+            self._stats["errors"] += 1
+            raise
+        if response.status_code >= 400:
+            self._stats["errors"] += 1
+        try:
+            body = response.json() if response.content else None
+        except ValueError:
+            body = response.text
+        return response.status_code, body, dict(response.headers)
+
+
+def _error_message(body: Any) -> str:
+    if isinstance(body, dict):
+        return str(body.get("message") or body.get("msg") or body.get("error_description") or body)
+    return str(body)
+
+
+def _error_code(body: Any) -> Optional[str]:
+    return body.get("code") if isinstance(body, dict) else None
+
+
+def _content_range_count(headers: Dict[str, str]) -> Optional[int]:
+    # PostgREST answers "Content-Range: 0-9/42" (or "*/0") when an exact count is requested
+    total = headers.get("content-range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+_clients: Dict[Tuple[str, str], SupabaseDB] = {}
+_clients_lock = threading.Lock()
+
+def get_supabase_db(url: str, key: str) -> SupabaseDB:
+    """Return the process-wide client for a Supabase project, created on first use."""
+    client = _clients.get((url, key))
+    if client is None:
+        with _clients_lock:
+            client = _clients.get((url, key))
+            if client is None:
+                client = SupabaseDB(url, key)
+                _clients[(url, key)] = client
+                logger.info(f"Supabase client created for {url}")
+    return client
+
+
+def supabase_stats() -> List[Dict]:
+    return [client.stats() for client in list(_clients.values())]
@@ -0,0 +1,66 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile # type: ignore
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None  # system temp dir when unset
+
+PDF_MAGIC = b"%PDF-"
+
+
+@dataclass
+class SpooledUpload:
+    """An upload written to disk: its path, size in bytes and sha256 hex digest."""
+    path: str
+    size: int
+    sha256: str
+
+
+async def spool_upload(file: UploadFile, suffix: str = ".pdf", max_bytes: int = UPLOAD_MAX_BYTES,
+                       chunk_size: int = UPLOAD_CHUNK_SIZE, magic: Optional[bytes] = PDF_MAGIC) -> SpooledUpload:
+    """
+    Copy an upload to a named spool file in fixed-size chunks.
+
+    By the time a route runs, Starlette has already received the multipart body
+    and spooled the file part (in memory up to 1 MB, then to an anonymous temp
+    file), so this is a second copy: it gives the parser a path it can open,
+    checks the PDF magic bytes and computes the sha256 on the way. The size limit
+    is enforced while the body is received by UploadSizeLimitMiddleware; the
+    check here only covers callers outside that guard. Only one chunk is held in
+    memory at a time. The caller owns the returned file and must delete it.
+
+    Raises:
+        HTTPException: 400 if the upload is empty or does not start with `magic`,
+            413 if it exceeds `max_bytes`
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=UPLOAD_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                if size == 0 and magic and not chunk.startswith(magic):
+                    raise HTTPException(status_code=400, detail=f"Uploaded file {file.filename} is not a valid PDF.")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Uploaded file exceeds the {max_bytes // (1024 * 1024)} MB limit."
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(spool.write, chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail=f"Uploaded file {file.filename} is empty.")
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledUpload(path=path, size=size, sha256=digest.hexdigest())
@@ -0,0 +1,82 @@
+"""
+Load benchmark for the RAG chat pipeline with stubbed backends.
+
+Runs N concurrent chat requests on one event loop, first through the blocking
+get_rag_response (what the endpoint used to do) and then through the native
+async aget_rag_response. Embeddings, the LLM and the Supabase history fetch are
+replaced by local fakes with configurable latency; Chroma runs for real in a
+temporary directory.
+
+Usage:
+    python -m benchmarks.bench_async_rag --concurrency 1 8 32
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+parser.add_argument("--embed-latency", type=float, default=0.05)
+parser.add_argument("--llm-latency", type=float, default=0.3)
+parser.add_argument("--history-latency", type=float, default=0.05)
+args = parser.parse_args()
+
+# Select offline backends before the app modules read their configuration
+os.environ["EMBEDDING_BACKEND"] = "fake"
+os.environ["FAKE_EMBEDDING_LATENCY"] = str(args.embed_latency)
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+os.environ["EMBEDDING_CACHE_ENABLED"] = "false"
+os.environ["CHROMA_PERSIST_DIRECTORY"] = tempfile.mkdtemp(prefix="bench_chroma_")
+
+from app.RAG import rag # noqa: E402
+from app.RAG.embed import store_chunks_in_chromadb # noqa: E402
+
+COLLECTION = "bench-profile"
+
+
+def history_stub(profile_id: str, limit: int = 10) -> str:
+    time.sleep(args.history_latency)
+    return "USER: hello\nASSISTANT: hi"
+
+
+async def ahistory_stub(profile_id: str, limit: int = 10) -> str:
+    await asyncio.sleep(args.history_latency)
+    return "USER: hello\nASSISTANT: hi"
+
+
+rag.fetch_conversation_as_context_string = history_stub
+rag.afetch_conversation_as_context_string = ahistory_stub
+
+
+async def blocking_request(i: int):
+    # The old endpoint: async def handler calling the synchronous pipeline
+    return rag.get_rag_response(f"question {i}", COLLECTION, COLLECTION)
+
+
+async def async_request(i: int):
+    return await rag.aget_rag_response(f"question {i}", COLLECTION, COLLECTION)
+
+
+async def run(request, concurrency: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def main():
+    chunks = [{"text": f"Section {i} of the benchmark proposal document.", "source": "bench.pdf"} for i in range(50)]
+    store_chunks_in_chromadb(chunks, COLLECTION, "00000000-0000-0000-0000-000000000000")
+
+    print(f"{'concurrency':>11} | {'blocking (s)':>12} | {'async (s)':>9} | {'req/s async':>11}")
+    for concurrency in args.concurrency:
+        blocking = asyncio.run(run(blocking_request, concurrency))
+        native = asyncio.run(run(async_request, concurrency))
+        print(f"{concurrency:>11} | {blocking:>12.3f} | {native:>9.3f} | {concurrency / native:>11.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
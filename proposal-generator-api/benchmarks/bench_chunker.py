@@ -0,0 +1,81 @@
+"""
+Chunking benchmark: token-budget MarkdownChunker vs. the previous regex split.
+
+Generates a large synthetic markdown document whose sections range from a few
+words to several thousand, then reports run time and the resulting chunk size
+distribution (estimated tokens) for both chunkers. The legacy implementation is
+reproduced here as it was before the token-aware chunker replaced it.
+
+Usage:
+    python -m benchmarks.bench_chunker --sections 5000
+"""
+import re
+import sys
+import time
+import random
+import argparse
+import statistics
+
+from app.RAG.chunker import chunk_markdown, estimate_tokens, CHUNK_MAX_TOKENS, CHUNK_MIN_TOKENS
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--sections", type=int, default=5000)
+parser.add_argument("--seed", type=int, default=7)
+parser.add_argument("--repeat", type=int, default=3)
+
+
+def legacy_chunk_by_headings(markdown: str, source: str, fallback_chunk_size: int = 300):
+    chunks = []
+    sections = re.split(r"(#+ .+)", markdown.strip())
+    if len(sections) > 1:
+        for i in range(1, len(sections), 2):
+            heading = sections[i].strip()
+            body = sections[i + 1].strip() if i + 1 < len(sections) else ""
+            if len(body.split()) < 10:
+                continue
+            chunks.append({"text": f"{heading}\n\n{body}", "source": source})
+    else:
+        words = markdown.split()
+        for start in range(0, len(words), fallback_chunk_size):
+            chunks.append({"text": " ".join(words[start:start + fallback_chunk_size]), "source": source})
+    return chunks
+
+
+def generate_markdown(sections: int, seed: int) -> str:
+    rng = random.Random(seed)
+    vocabulary = ["proposal", "scope", "deliverable", "milestone", "pricing", "staffing",
+                  "requirements", "integration", "timeline", "acceptance", "risk", "support"]
+    parts = []
+    for i in range(sections):
+        words = rng.choice([4, 30, 120, 400, 1500, 4000])
+        body = " ".join(rng.choice(vocabulary) for _ in range(words))
+        parts.append(f"{'#' * rng.randint(1, 3)} Section {i}\n\n{body}\n")
+    return "\n".join(parts)
+
+
+def measure(name: str, chunk, markdown: str, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = chunk(markdown, "bench.md")
+        best = min(best, time.perf_counter() - start)
+    sizes = [estimate_tokens(c["text"]) for c in chunks]
+    over = sum(1 for size in sizes if size > CHUNK_MAX_TOKENS)
+    under = sum(1 for size in sizes if size < CHUNK_MIN_TOKENS)
+    print(f"{name:>8} | {best:>7.3f} | {len(chunks):>7} | {min(sizes):>5} | {statistics.mean(sizes):>6.0f} | "
+          f"{max(sizes):>6} | {statistics.pstdev(sizes):>6.0f} | {over:>6} | {under:>6}")
+
+
+def main():
+    args = parser.parse_args()
+    markdown = generate_markdown(args.sections, args.seed)
+    print(f"{len(markdown) / 1e6:.1f} MB markdown, {args.sections} sections, "
+          f"budgets {CHUNK_MIN_TOKENS}-{CHUNK_MAX_TOKENS} tokens")
+    print(f"{'chunker':>8} | {'seconds':>7} | {'chunks':>7} | {'min':>5} | {'mean':>6} | {'max':>6} | "
+          f"{'stdev':>6} | {'> max':>6} | {'< min':>6}")
+    measure("regex", legacy_chunk_by_headings, markdown, args.repeat)
+    measure("tokens", chunk_markdown, markdown, args.repeat)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""
+Offline benchmark for the batched embedding engine.
+
+Compares the old one-request-per-chunk loop with the batched, concurrent engine
+against a local fake embedder that simulates network latency.
+
+Usage:
+    python -m benchmarks.bench_embedding --chunks 300 --latency 0.05
+"""
+import argparse
+import time
+
+from app.RAG.embedding_engine import EmbeddingEngine, FakeEmbeddingBackend
+
+
+def run(chunks: int, latency: float, per_item_latency: float):
+    texts = [f"Section {i}: proposal text for chunk number {i}" for i in range(chunks)]
+    backend = FakeEmbeddingBackend(latency=latency, per_item_latency=per_item_latency)
+
+    start = time.perf_counter()
+    for text in texts:
+        backend.embed_batch([text], "retrieval_document")
+    serial = time.perf_counter() - start
+    print(f"serial (1 chunk/request)        : {serial:7.3f}s")
+
+    for batch_size, concurrency in [(25, 1), (25, 4), (50, 4), (100, 4)]:
+        engine = EmbeddingEngine(backend, batch_size=batch_size, max_concurrency=concurrency)
+        start = time.perf_counter()
+        engine.embed(texts)
+        elapsed = time.perf_counter() - start
+        print(f"batch={batch_size:<3} concurrency={concurrency:<2}     : {elapsed:7.3f}s  ({serial / elapsed:5.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated round trip per request (s)")
+    parser.add_argument("--per-item-latency", type=float, default=0.0005, help="Simulated cost per text (s)")
+    args = parser.parse_args()
+    run(args.chunks, args.latency, args.per_item_latency)
@@ -0,0 +1,71 @@
+"""
+BM25 lexical index benchmark: build time, memory footprint and query latency.
+
+Indexes a synthetic corpus of proposal-like chunks with names and SKUs mixed
+in, then times queries that combine common words with rare exact terms, the
+shape hybrid retrieval adds to every chat request.
+
+Usage:
+    python -m benchmarks.bench_lexical --chunks 50000 --queries 500
+"""
+import sys
+import time
+import random
+import argparse
+import statistics
+
+from app.RAG.lexical_index import LexicalIndex
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--chunks", type=int, default=50000)
+parser.add_argument("--words", type=int, default=300, help="words per chunk")
+parser.add_argument("--queries", type=int, default=500)
+parser.add_argument("--seed", type=int, default=7)
+
+VOCABULARY = ["proposal", "scope", "deliverable", "milestone", "pricing", "staffing", "requirements",
+              "integration", "timeline", "acceptance", "risk", "support", "the", "and", "of", "for"]
+NAMES = [f"{first} {last}" for first in ("rajeev", "anna", "li", "omar", "sofia", "ken")
+         for last in ("menon", "schmidt", "wei", "haddad", "rossi", "tanaka")]
+
+
+def generate_chunks(count: int, words: int, rng: random.Random):
+    for i in range(count):
+        body = [rng.choice(VOCABULARY) for _ in range(words)]
+        body[rng.randrange(words)] = rng.choice(NAMES)
+        body[rng.randrange(words)] = f"SKU-{rng.randrange(100000):05d}"
+        yield f"bench_chunk_{i}", " ".join(body), {"file_id": f"doc_{i // 50}"}
+
+
+def main():
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    index = LexicalIndex()
+
+    start = time.perf_counter()
+    batch = []
+    for record in generate_chunks(args.chunks, args.words, rng):
+        batch.append(record)
+        if len(batch) == 1000:
+            index.add(*map(list, zip(*batch)))
+            batch = []
+    if batch:
+        index.add(*map(list, zip(*batch)))
+    build = time.perf_counter() - start
+    stats = index.stats()
+    print(f"{args.chunks} chunks, {stats['terms']} terms, {stats['postings']} postings "
+          f"(~{stats['postings'] * 8 / 1e6:.1f} MB of posting arrays), built in {build:.2f}s")
+
+    queries = [f"who is {rng.choice(NAMES)}" if i % 2 else f"pricing for SKU-{rng.randrange(100000):05d}"
+               for i in range(args.queries)]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, 24)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    print(f"query ms: mean {statistics.mean(latencies):.2f} | p50 {latencies[len(latencies) // 2]:.2f} | "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:.2f} | max {latencies[-1]:.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Micro-benchmark of per-request LLM setup overhead.
+
+"before" rebuilds the Gemini chat client and the prompt template on every
+request, as generate_answer / get_rag_response used to. "after" goes through
+the pooled client and the prompt template cache. No network calls are made.
+
+Usage:
+    python -m benchmarks.bench_llm_setup --requests 200
+"""
+import os
+import time
+import argparse
+
+# Constructing the Gemini client only needs a key to be present
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-placeholder-key")
+os.environ["LLM_BACKEND"] = "google"
+
+from langchain_core.prompts import ChatPromptTemplate # type: ignore # noqa: E402
+from langchain_google_genai import ChatGoogleGenerativeAI # type: ignore # noqa: E402
+
+from app.RAG.llm import LLM_MODEL, get_chat_model # noqa: E402
+from app.RAG.rag import DEFAULT_SYSTEM_PROMPT, get_prompt_template # noqa: E402
+
+CUSTOM_PROMPTS = [None, "You write concise proposals.", "Answer as a senior consultant."]
+
+
+def before(custom_system_prompt):
+    system_prompt = custom_system_prompt + "\n\n" + DEFAULT_SYSTEM_PROMPT if custom_system_prompt else DEFAULT_SYSTEM_PROMPT
+    ChatPromptTemplate.from_messages([("system", system_prompt), ("human", "{question}")])
+    ChatGoogleGenerativeAI(model=LLM_MODEL)
+
+
+def after(custom_system_prompt):
+    get_prompt_template(custom_system_prompt)
+    get_chat_model()
+
+
+def measure(fn, requests: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        fn(CUSTOM_PROMPTS[i % len(CUSTOM_PROMPTS)])
+    return (time.perf_counter() - start) / requests * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    after(None)  # warm the pool and cache once, as the first request would
+    before_ms = measure(before, args.requests)
+    after_ms = measure(after, args.requests)
+    print(f"setup per request before: {before_ms:8.3f} ms")
+    print(f"setup per request after : {after_ms:8.3f} ms  ({before_ms / after_ms:,.0f}x less)")
@@ -0,0 +1,44 @@
+"""
+CPU throughput of the local sentence-transformers embedding backend.
+
+Embeds synthetic chunks through the engine once per (runtime, threads) setting
+and reports chunks/sec, so torch vs ONNX / quantized weights and thread counts
+can be compared without network access. The model is downloaded from the
+Hugging Face hub on first run.
+
+Usage:
+    python -m benchmarks.bench_local_embedding --chunks 512 --threads 1 4 --runtime torch onnx
+"""
+import time
+import argparse
+
+from app.RAG.embedding_engine import EmbeddingEngine, LocalEmbeddingBackend, LOCAL_EMBEDDING_MODEL
+
+
+def run(chunks: int, words: int, batch_size: int, model: str, runtimes, threads, weights: str):
+    texts = [f"Section {i}: " + " ".join(["proposal scope milestone pricing staffing"] * (words // 5))
+             for i in range(chunks)]
+    print(f"{chunks} chunks of ~{words} words, batch size {batch_size}, model {model}")
+    for runtime in runtimes:
+        for count in threads:
+            backend = LocalEmbeddingBackend(model=model, runtime=runtime, threads=count,
+                                            weights=weights if runtime != "torch" else "")
+            engine = EmbeddingEngine(backend, batch_size=batch_size, max_batch_size=batch_size, max_concurrency=1)
+            engine.embed(texts[:batch_size])  # warm up
+            start = time.perf_counter()
+            engine.embed(texts)
+            elapsed = time.perf_counter() - start
+            print(f"runtime={runtime:<8} threads={count:<2}: {elapsed:7.2f}s  {chunks / elapsed:7.1f} chunks/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--model", default=LOCAL_EMBEDDING_MODEL)
+    parser.add_argument("--runtime", nargs="+", default=["torch"], help="torch | onnx | openvino")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--weights", default="", help="weights file for non-torch runtimes, e.g. a quantized ONNX export")
+    args = parser.parse_args()
+    run(args.chunks, args.words, args.batch_size, args.model, args.runtime, args.threads, args.weights)
@@ -0,0 +1,64 @@
+"""
+PDF-to-markdown throughput benchmark for the parser process pool.
+
+Generates a corpus of synthetic PDFs with pymupdf, then converts the whole
+corpus once per pool size and reports pages/sec. Pool size 0 is the old
+behaviour: pymupdf4llm running in the calling process.
+
+Usage:
+    python -m benchmarks.bench_pdf_parse --documents 4 --pages 64 --workers 0 1 2 4
+"""
+import sys
+import time
+import argparse
+import tempfile
+import os
+
+import pymupdf # type: ignore
+
+from app.RAG.pdf_parser import PdfParser
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--documents", type=int, default=4)
+parser.add_argument("--pages", type=int, default=64, help="pages per generated document")
+parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+parser.add_argument("--pages-per-task", type=int, default=16)
+
+
+def generate_corpus(directory: str, documents: int, pages: int):
+    paths = []
+    body = "The proposal covers scope, milestones, staffing and pricing for the engagement. " * 30
+    for d in range(documents):
+        doc = pymupdf.open()
+        for p in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Section {d}.{p}", fontsize=20)
+            page.insert_textbox(pymupdf.Rect(72, 100, 520, 760), body, fontsize=10)
+        path = os.path.join(directory, f"bench_{d}.pdf")
+        doc.save(path)
+        paths.append(path)
+    return paths
+
+
+def main():
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix="bench_pdf_") as directory:
+        paths = generate_corpus(directory, args.documents, args.pages)
+        total_pages = args.documents * args.pages
+        print(f"{total_pages} pages in {args.documents} documents, {args.pages_per_task} pages per task")
+        print(f"{'workers':>7} | {'seconds':>8} | {'pages/s':>8}")
+        for workers in args.workers:
+            pdf_parser = PdfParser(workers=workers, pages_per_task=args.pages_per_task)
+            if workers:
+                # Start the worker processes outside the timed region
+                pdf_parser.to_markdown(paths[0])
+            start = time.perf_counter()
+            for path in paths:
+                pdf_parser.to_markdown(path)
+            elapsed = time.perf_counter() - start
+            pdf_parser.shutdown()
+            print(f"{workers:>7} | {elapsed:>8.2f} | {total_pages / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Per-request overhead of the request logging middleware.
+
+Drives a minimal ASGI app directly (no server, no sockets) with and without
+RequestLoggingMiddleware for a GET, a small JSON POST and a multipart PDF
+upload, logging to a sink that discards lines. Overhead is reported in
+microseconds per request with the request level enabled and disabled, and the
+run fails if any enabled-level overhead exceeds the budget.
+
+Usage:
+    python -m benchmarks.bench_request_logging --requests 20000 --budget-us 50
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+from loguru import logger # type: ignore
+
+from app.middleware.logging import RequestLoggingMiddleware
+
+
+async def app(scope, receive, send):
+    # Consume the whole body like a route handler would, then answer with JSON
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get("more_body", False)
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'{"status": "ok"}'})
+
+
+def make_request(method: str, path: str, content_type: bytes, body: bytes, chunk_size: int = 65536):
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": b"",
+        "client": ("127.0.0.1", 50000),
+        "headers": [(b"content-type", content_type), (b"user-agent", b"bench"),
+                    (b"authorization", b"Bearer secret"), (b"content-length", str(len(body)).encode())],
+    }
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    return scope, chunks
+
+
+async def run(handler, scope, chunks, requests: int) -> float:
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        position = 0
+
+        async def receive():
+            nonlocal position
+            position += 1
+            return {"type": "http.request", "body": chunks[position - 1], "more_body": position < len(chunks)}
+
+        await handler(scope, receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--upload-mb", type=float, default=5.0)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    parser.add_argument("--budget-us", type=float, default=50.0, help="max overhead per request with logging enabled")
+    args = parser.parse_args()
+
+    cases = {
+        "GET /metrics/llm": make_request("GET", "/metrics/llm", b"", b""),
+        "POST /chat/query (json)": make_request("POST", "/chat/query", b"application/json",
+                                                json.dumps({"query": "What is the timeline?" * 20}).encode()),
+        "POST /doc/upload (multipart)": make_request("POST", "/doc/upload", b"multipart/form-data; boundary=x",
+                                                     b"%PDF-" + b"\0" * int(args.upload_mb * 1024 * 1024)),
+    }
+    lines = []
+    logger.remove()
+    print(f"{args.requests} requests per case, body sample rate {args.sample_rate}, budget {args.budget_us:.0f} us")
+    print(f"{'case':<30} | {'bare us':>8} | {'INFO on us':>10} | {'INFO off us':>11}")
+    over_budget = False
+    for name, (scope, chunks) in cases.items():
+        requests = args.requests if len(chunks) == 1 else max(100, args.requests // 100)
+        bare = asyncio.run(run(app, scope, chunks, requests))
+        middleware = RequestLoggingMiddleware(app, level="INFO", sample_rate=args.sample_rate)
+
+        sink = logger.add(lines.append, level="INFO", format="{message}")
+        enabled = asyncio.run(run(middleware, scope, chunks, requests)) - bare
+        logger.remove(sink)
+        sink = logger.add(lines.append, level="WARNING", format="{message}")
+        disabled = asyncio.run(run(middleware, scope, chunks, requests)) - bare
+        logger.remove(sink)
+
+        over_budget |= enabled > args.budget_us
+        print(f"{name:<30} | {bare:>8.1f} | {enabled:>+10.1f} | {disabled:>+11.1f}")
+        lines.clear()
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
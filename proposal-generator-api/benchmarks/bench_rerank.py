@@ -0,0 +1,59 @@
+"""
+Cross-encoder rerank cost on CPU per candidate-pool size.
+
+Scores synthetic proposal chunks (about 300 tokens each, close to the chunker's
+budget) against a query, one batched forward pass per call, and reports the
+latency of a rerank call for each pool size. The model is downloaded from the
+Hugging Face hub on first run; no API keys are needed.
+
+Usage:
+    python -m benchmarks.bench_rerank --pool 8 16 32 64 128 --repeat 5
+"""
+import sys
+import time
+import random
+import argparse
+import statistics
+
+from langchain_core.documents import Document # type: ignore
+
+from app.RAG.reranker import CrossEncoderReranker, RERANK_MODEL
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--pool", type=int, nargs="+", default=[8, 16, 32, 64, 128])
+parser.add_argument("--k", type=int, default=6)
+parser.add_argument("--words", type=int, default=220, help="words per candidate chunk")
+parser.add_argument("--repeat", type=int, default=5)
+parser.add_argument("--model", default=RERANK_MODEL)
+
+
+def generate_documents(count: int, words: int, rng: random.Random):
+    vocabulary = ["proposal", "scope", "deliverable", "milestone", "pricing", "staffing", "requirements",
+                  "integration", "timeline", "acceptance", "risk", "support", "engineer", "client"]
+    return [Document(page_content=" ".join(rng.choice(vocabulary) for _ in range(words)), metadata={"i": i})
+            for i in range(count)]
+
+
+def main():
+    args = parser.parse_args()
+    rng = random.Random(7)
+    reranker = CrossEncoderReranker(model_name=args.model)
+    query = "What is the proposed timeline and staffing for the integration milestone?"
+    # Warm up outside the timed region (weights load lazily, first pass allocates buffers)
+    reranker.rerank(query, generate_documents(4, args.words, rng), args.k)
+
+    print(f"model {args.model}, {args.words} words per candidate, top {args.k} kept")
+    print(f"{'pool':>5} | {'mean ms':>8} | {'p50 ms':>8} | {'ms/candidate':>12}")
+    for pool in args.pool:
+        documents = generate_documents(pool, args.words, rng)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            reranker.rerank(query, documents, args.k)
+            timings.append((time.perf_counter() - start) * 1000)
+        mean = statistics.mean(timings)
+        print(f"{pool:>5} | {mean:>8.1f} | {statistics.median(timings):>8.1f} | {mean / pool:>12.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Supabase data-access layer against a local stub PostgREST server.
+
+Starts a threaded HTTP server that answers /rest/v1/messages after a fixed
+delay, then issues concurrent history reads for a few profiles through
+SupabaseDB: identical reads in flight share one round trip, and all requests
+reuse pooled keep-alive connections. Reports wall time, requests that
+reached the server and connections it accepted. No Supabase project needed.
+
+Usage:
+    python -m benchmarks.bench_supabase --requests 200 --profiles 5 --latency 0.05
+"""
+import json
+import time
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app.utils.supabase_db import SupabaseDB
+
+
+class StubPostgREST(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    latency = 0.05
+    requests = 0
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            StubPostgREST.connections += 1
+
+    def do_GET(self):
+        with self.lock:
+            StubPostgREST.requests += 1
+        time.sleep(self.latency)
+        query = parse_qs(urlparse(self.path).query)
+        profile = query.get("profile_id", ["eq.unknown"])[0][3:]
+        limit = int(query.get("limit", ["10"])[0])
+        rows = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"{profile} message {i}",
+                 "created_at": f"2026-01-01T00:00:{i:02d}"} for i in range(limit)]
+        body = json.dumps(rows).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def run_reads(db: SupabaseDB, requests: int, profiles: int):
+    return await asyncio.gather(*(
+        db.aselect("messages", "role, content, created_at", filters=[("profile_id", "eq", f"profile-{i % profiles}")],
+                   order="created_at", desc=True, limit=10)
+        for i in range(requests)
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--profiles", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub server seconds per request")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    StubPostgREST.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPostgREST)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    db = SupabaseDB(f"http://127.0.0.1:{server.server_port}", "stub-key")
+
+    print(f"{args.requests} concurrent reads over {args.profiles} profiles, {args.latency * 1000:.0f} ms server latency")
+    for round_ in range(1, args.rounds + 1):
+        served, connected = StubPostgREST.requests, StubPostgREST.connections
+        start = time.perf_counter()
+        results = asyncio.run(run_reads(db, args.requests, args.profiles))
+        elapsed = time.perf_counter() - start
+        assert all(len(result.data) == 10 for result in results)
+        print(f"round {round_}: {elapsed * 1000:7.1f} ms, {StubPostgREST.requests - served} requests served, "
+              f"{StubPostgREST.connections - connected} new connections")
+    print(f"client stats: {db.stats()}")
+    db.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+-- Per-profile conversation statistics in one round trip, used by
+-- app.RAG.conv.get_conversation_stats through PostgREST (GET /rest/v1/rpc/conversation_stats).
+-- Apply to the conversation Supabase project (SQL editor or `psql -f`).
+
+-- Counting by profile and grouping by role are answered from these indexes
+-- (index-only scans), without reading message bodies.
+create index if not exists messages_profile_id_role_idx on public.messages (profile_id, role);
+create index if not exists conversations_profile_id_idx on public.conversations (profile_id);
+
+create or replace function public.conversation_stats(p_profile_id uuid)
+returns json
+language sql
+stable
+security invoker
+as $$
+    with roles as (
+        select role, count(*) as messages
+        from public.messages
+        where profile_id = p_profile_id
+        group by role
+    )
+    select json_build_object(
+        'total_messages', coalesce((select sum(messages) from roles), 0),
+        'total_conversations', (select count(*) from public.conversations where profile_id = p_profile_id),
+        'role_distribution', coalesce((select json_object_agg(role, messages) from roles), '{}'::json)
+    );
+$$;
+
+grant execute on function public.conversation_stats(uuid) to anon, authenticated;
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time, so they are pinned before any app module loads:
+# offline embeddings, no process-wide caches, and SQLite stores in a throwaway directory.
+_TMP = tempfile.mkdtemp(prefix="rag-tests-")
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+os.environ.setdefault("HISTORY_SUMMARY_ENABLED", "false")
+os.environ.setdefault("CHROMA_PERSIST_DIRECTORY", os.path.join(_TMP, "chromadb_store"))
+os.environ.setdefault("DOCUMENT_INDEX_PATH", os.path.join(_TMP, "document_index.sqlite3"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
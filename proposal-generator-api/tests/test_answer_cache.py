@@ -0,0 +1,99 @@
+from app.RAG.answer_cache import SemanticAnswerCache, answer_scope
+
+
+class MemoryGenerations:
+    """Shared generation counters, standing in for the SQLite document index."""
+
+    def __init__(self):
+        self.counters = {}
+
+    def generation(self, collection):
+        return self.counters.get(collection, 0)
+
+    def bump_generation(self, collection):
+        self.counters[collection] = self.generation(collection) + 1
+        return self.counters[collection]
+
+
+def _scope(**overrides):
+    settings = {"retriever_filter": None, "custom_system_prompt": None, "k_retrieval": 4,
+                "profile_id": "p1", "conversation_history": ""}
+    settings.update(overrides)
+    return answer_scope(**settings)
+
+
+def test_scope_separates_profiles_conversations_and_settings():
+    base = _scope()
+
+    assert _scope() == base
+    assert _scope(profile_id="p2") != base
+    assert _scope(conversation_history="user: earlier question") != base
+    assert _scope(retriever_filter={"file_id": "a"}) != base
+    assert _scope(custom_system_prompt="Be brief") != base
+    assert _scope(k_retrieval=8) != base
+
+
+def test_hit_above_threshold_miss_below():
+    cache = SemanticAnswerCache(threshold=0.95, generations=MemoryGenerations())
+    cache.store("docs", "s", [1.0, 0.0], {"response": "cached"})
+
+    hit = cache.lookup("docs", "s", [1.0, 0.05])
+    assert hit["response"] == "cached"
+    assert "answer_cache_similarity" in hit
+    assert cache.lookup("docs", "s", [0.5, 0.5]) is None
+    assert cache.lookup("docs", "other-scope", [1.0, 0.0]) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
+
+
+def test_returned_responses_are_copies():
+    cache = SemanticAnswerCache(generations=MemoryGenerations())
+    cache.store("docs", "s", [1.0, 0.0], {"sources": ["a"]})
+
+    cache.lookup("docs", "s", [1.0, 0.0])["sources"].append("b")
+
+    assert cache.lookup("docs", "s", [1.0, 0.0])["sources"] == ["a"]
+
+
+def test_answer_from_an_older_generation_is_not_stored():
+    generations = MemoryGenerations()
+    cache = SemanticAnswerCache(generations=generations)
+    generation = cache.generation("docs")
+    generations.bump_generation("docs")  # documents changed while the answer was generated
+
+    cache.store("docs", "s", [1.0, 0.0], {"response": "stale"}, generation=generation)
+
+    assert cache.stats()["stale_stores"] == 1
+    assert cache.lookup("docs", "s", [1.0, 0.0]) is None
+
+
+def test_invalidation_reaches_other_workers():
+    generations = MemoryGenerations()
+    worker_a = SemanticAnswerCache(generations=generations)
+    worker_b = SemanticAnswerCache(generations=generations)
+    worker_b.store("docs", "s", [1.0, 0.0], {"response": "cached"})
+    worker_b.store("other", "s", [1.0, 0.0], {"response": "kept"})
+
+    worker_a.invalidate("docs")
+
+    assert worker_b.lookup("docs", "s", [1.0, 0.0]) is None
+    assert worker_b.lookup("other", "s", [1.0, 0.0])["response"] == "kept"
+    assert worker_b.stats()["invalidations"] == 1
+
+
+def test_invalidate_with_a_known_generation_does_not_bump_again():
+    generations = MemoryGenerations()
+    cache = SemanticAnswerCache(generations=generations)
+    cache.store("docs", "s", [1.0, 0.0], {"response": "cached"})
+
+    cache.invalidate("docs", generation=generations.bump_generation("docs"))
+
+    assert generations.generation("docs") == 1
+    assert cache.lookup("docs", "s", [1.0, 0.0]) is None
+
+
+def test_entries_are_capped_per_scope():
+    cache = SemanticAnswerCache(max_entries=2, generations=MemoryGenerations())
+    for i in range(3):
+        cache.store("docs", "s", [1.0, float(i)], {"response": i})
+
+    assert cache.stats()["entries"] == 2
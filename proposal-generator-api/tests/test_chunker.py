@@ -0,0 +1,57 @@
+import pytest
+
+from app.RAG.chunker import MarkdownChunker, chunk_markdown, estimate_tokens
+
+
+def _words(count, prefix="w"):
+    # Four characters or fewer: one estimated token per word
+    return " ".join(f"{prefix}{i % 100}" for i in range(count))
+
+
+def test_sections_are_merged_up_to_max_tokens():
+    markdown = "\n".join(f"# S{i}\n\n{_words(10)}\n" for i in range(6))
+    chunks = chunk_markdown(markdown, "doc.pdf", min_tokens=5, max_tokens=40, overlap_tokens=0)
+
+    assert all(estimate_tokens(chunk["text"]) <= 40 for chunk in chunks)
+    assert len(chunks) < 6
+    assert "".join(chunk["text"] for chunk in chunks).count("# S") == 6
+    assert {chunk["source"] for chunk in chunks} == {"doc.pdf"}
+
+
+def test_small_trailing_section_is_folded_into_previous_chunk():
+    markdown = f"# Big\n\n{_words(30)}\n\n# Tail\n\nend"
+    chunks = chunk_markdown(markdown, "doc.pdf", min_tokens=10, max_tokens=40, overlap_tokens=0)
+
+    assert len(chunks) == 1
+    assert chunks[0]["text"].endswith("# Tail\n\nend")
+
+
+def test_oversized_section_is_split_into_overlapping_windows():
+    chunks = chunk_markdown(f"# Long\n\n{_words(200)}", "doc.pdf", min_tokens=0, max_tokens=50, overlap_tokens=10)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk["text"].startswith("# Long\n\n")
+        assert estimate_tokens(chunk["text"]) <= 50
+    bodies = [chunk["text"][len("# Long\n\n"):].split() for chunk in chunks]
+    for previous, current in zip(bodies, bodies[1:]):
+        assert previous[-10:] == current[:10]
+
+
+def test_feeding_pages_matches_one_pass():
+    markdown = "\n".join(f"# S{i}\n\n{_words(25 + i * 7)}\n" for i in range(8))
+    expected = chunk_markdown(markdown, "doc.pdf", min_tokens=8, max_tokens=60, overlap_tokens=6)
+
+    chunker = MarkdownChunker("doc.pdf", min_tokens=8, max_tokens=60, overlap_tokens=6)
+    chunks = []
+    for start in range(0, len(markdown), 37):
+        chunks.extend(chunker.feed(markdown[start:start + 37]))
+    chunks.extend(chunker.flush())
+
+    assert chunks == expected
+
+
+@pytest.mark.parametrize("min_tokens, max_tokens, overlap_tokens", [(10, 5, 0), (0, 0, 0), (0, 10, 10), (0, 10, -1)])
+def test_invalid_budgets_are_rejected(min_tokens, max_tokens, overlap_tokens):
+    with pytest.raises(ValueError):
+        MarkdownChunker("doc.pdf", min_tokens, max_tokens, overlap_tokens)
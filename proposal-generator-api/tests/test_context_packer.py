@@ -0,0 +1,87 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document  # type: ignore # noqa: E402
+
+from app.RAG.chunker import estimate_tokens  # noqa: E402
+from app.RAG.context_packer import CONTEXT_MIN_TRUNCATED_TOKENS, pack_context, truncate_to_tokens  # noqa: E402
+
+
+def _sentences(topic, count):
+    return " ".join(f"The {topic} clause number {i} applies to every order." for i in range(count))
+
+
+def test_everything_fits_untouched():
+    docs = [Document(page_content=_sentences("pricing", 2)), Document(page_content=_sentences("delivery", 2))]
+
+    packed = pack_context(docs, "user: hi", budget=1000)
+
+    assert packed["documents"] == docs
+    assert packed["history"] == "user: hi"
+    assert packed["usage"]["documents_used"] == 2
+    assert packed["usage"]["history_truncated"] is False
+
+
+def test_history_keeps_the_most_recent_lines_within_its_share():
+    history = "\n".join(f"user: question {i} about the proposal timeline" for i in range(50))
+
+    packed = pack_context([], history, budget=200, history_share=0.25)
+
+    assert packed["usage"]["history_truncated"] is True
+    assert packed["usage"]["history_tokens"] <= 50
+    assert packed["history"].splitlines()[-1] == history.splitlines()[-1]
+
+
+def test_documents_stay_within_budget_and_one_is_truncated():
+    docs = [Document(page_content=_sentences(topic, 10), metadata={"source": topic})
+            for topic in ("pricing", "delivery", "warranty")]
+    budget = estimate_tokens(docs[0].page_content) + CONTEXT_MIN_TRUNCATED_TOKENS + 10
+
+    packed = pack_context(docs, "", budget=budget)
+    usage = packed["usage"]
+
+    assert usage["document_tokens"] <= budget
+    assert usage["documents_truncated"] == 1
+    assert usage["documents_dropped"] == 1
+    truncated = packed["documents"][1]
+    assert truncated.metadata == {"source": "delivery", "truncated": True}
+    assert truncated.page_content.endswith(".")
+    assert docs[1].page_content.startswith(truncated.page_content)
+
+
+def test_too_small_remainder_drops_instead_of_truncating():
+    docs = [Document(page_content=_sentences("pricing", 10)), Document(page_content=_sentences("delivery", 10))]
+    budget = estimate_tokens(docs[0].page_content) + CONTEXT_MIN_TRUNCATED_TOKENS - 1
+
+    packed = pack_context(docs, "", budget=budget)
+
+    assert packed["usage"]["documents_truncated"] == 0
+    assert packed["usage"]["documents_dropped"] == 1
+
+
+def test_overlapping_chunks_are_deduplicated():
+    text = _sentences("pricing", 6)
+    docs = [Document(page_content=text), Document(page_content=text + " One extra line."),
+            Document(page_content=_sentences("delivery", 2))]
+
+    packed = pack_context(docs, "", budget=1000)
+
+    assert packed["usage"]["documents_deduplicated"] == 1
+    assert [doc.page_content for doc in packed["documents"]] == [text, docs[2].page_content]
+
+
+def test_rerank_scores_set_the_order():
+    docs = [Document(page_content="low", metadata={"rerank_score": 0.1}),
+            Document(page_content="high", metadata={"rerank_score": 0.9})]
+
+    assert pack_context(docs, "", budget=100)["context"] == "high\n\nlow"
+
+
+def test_truncate_to_tokens_cuts_words_when_no_sentence_fits():
+    text = "word " * 100
+
+    truncated = truncate_to_tokens(text, 10)
+
+    assert truncated.endswith(" ...")
+    assert estimate_tokens(truncated) <= 11
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from app.RAG.embedding_cache import EmbeddingCache, embedding_cache_key
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "embeddings.sqlite3")
+
+
+def test_key_ignores_whitespace_and_unicode_form():
+    key = embedding_cache_key("model", "retrieval_document", "café  au\nlait ")
+    assert key == embedding_cache_key("model", "retrieval_document", "café au lait")
+
+
+def test_key_depends_on_model_and_task_type():
+    key = embedding_cache_key("model", "retrieval_document", "text")
+    assert key != embedding_cache_key("other-model", "retrieval_document", "text")
+    assert key != embedding_cache_key("model", "retrieval_query", "text")
+
+
+def test_vectors_round_trip_through_disk(path):
+    cache = EmbeddingCache(path, memory_items=4)
+    cache.set_many({"a": [0.25, -1.5, 3.0]})
+
+    reopened = EmbeddingCache(path, memory_items=4)
+    assert reopened.get_many(["a", "missing"]) == [[0.25, -1.5, 3.0], None]
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.stats()["misses"] == 1
+
+
+def test_memory_lru_keeps_most_recent_vectors(path):
+    cache = EmbeddingCache(path, memory_items=2)
+    cache.set_many({"a": [1.0], "b": [2.0], "c": [3.0]})
+
+    cache.get_many(["c"])
+    assert cache.stats()["memory_hits"] == 1
+    cache.get_many(["a"])  # evicted from memory, still on disk
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_eviction_drops_least_recently_used(path):
+    cache = EmbeddingCache(path, memory_items=16, max_entries=10, touch_interval=3600)
+    cache.set_many({f"k{i}": [float(i)] for i in range(10)})
+    time.sleep(0.01)
+    touched = [f"k{i}" for i in range(5)]
+    cache.get_many(touched)
+    cache.flush()
+    time.sleep(0.01)
+
+    cache.set_many({"new": [42.0]})
+
+    stats = cache.stats()
+    assert stats["evictions"] == 2
+    assert stats["disk_entries"] == 9
+    on_disk = EmbeddingCache(path, memory_items=16)
+    assert None not in on_disk.get_many(touched + ["new"])
+    assert on_disk.get_many([f"k{i}" for i in range(5, 10)]).count(None) == 2
+
+
+def test_access_times_are_batched(path):
+    cache = EmbeddingCache(path, touch_interval=3600, touch_batch=3)
+    cache.set_many({"a": [1.0], "b": [2.0], "c": [3.0]})
+
+    cache.get_many(["a", "b"])
+    assert cache.stats()["pending_touches"] == 2
+    assert cache.stats()["touch_flushes"] == 0
+    cache.get_many(["c"])
+    assert cache.stats()["pending_touches"] == 0
+    assert cache.stats()["touch_flushes"] == 1
@@ -0,0 +1,83 @@
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_chroma")
+
+from app.RAG import hybrid  # noqa: E402
+from app.RAG.lexical_index import LexicalIndex  # noqa: E402
+
+
+class FakeCollection:
+    """Chroma collection stand-in holding (text, metadata) per id, with file_id filters."""
+
+    def __init__(self, records, dense_order):
+        self.records = records
+        self.dense_order = dense_order
+
+    @staticmethod
+    def _allowed(metadata, where):
+        if not where:
+            return True
+        condition = where["file_id"]
+        if isinstance(condition, dict):
+            return metadata["file_id"] in condition.get("$in", [condition.get("$eq")])
+        return metadata["file_id"] == condition
+
+    def query(self, query_embeddings, n_results, where=None, include=None):
+        ids = [i for i in self.dense_order if self._allowed(self.records[i][1], where)][:n_results]
+        return {"ids": [ids], "documents": [[self.records[i][0] for i in ids]],
+                "metadatas": [[self.records[i][1] for i in ids]]}
+
+    def get(self, ids, where=None, include=None):
+        ids = [i for i in ids if i in self.records and self._allowed(self.records[i][1], where)]
+        return {"ids": ids, "documents": [self.records[i][0] for i in ids],
+                "metadatas": [self.records[i][1] for i in ids]}
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    records = {
+        "a1": ("quarterly revenue summary", {"file_id": "a"}),
+        "a2": ("SKU-4411 unit price", {"file_id": "a"}),
+        "b1": ("SKU-4411 warranty terms", {"file_id": "b"}),
+        "b2": ("office opening hours", {"file_id": "b"}),
+    }
+    collection = FakeCollection(records, dense_order=["b2", "a1", "b1", "a2"])
+    index = LexicalIndex()
+    index.add(list(records), [text for text, _ in records.values()], [metadata for _, metadata in records.values()])
+    monkeypatch.setattr(hybrid.vectorstore, "with_collection", lambda name, operation: operation(collection))
+    monkeypatch.setattr(hybrid, "get_lexical_index", lambda name, coll: index)
+    return collection
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = hybrid.reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], rrf_k=60)
+
+    assert fused[0] == "y"
+    assert set(fused) == {"x", "y", "z", "w"}
+
+
+def test_reciprocal_rank_fusion_breaks_ties_by_first_ranking():
+    assert hybrid.reciprocal_rank_fusion([["x"], ["y"]]) == ["x", "y"]
+
+
+def test_file_id_filter_restricts_both_rankings(collection):
+    documents = hybrid.hybrid_search("profile", "SKU-4411", [0.0], k=2, where={"file_id": "a"})
+
+    assert {doc.metadata["file_id"] for doc in documents} == {"a"}
+    assert documents[0].page_content == "SKU-4411 unit price"
+
+
+def test_lexical_hits_are_fused_with_dense_results(collection):
+    documents = hybrid.hybrid_search("profile", "SKU-4411 warranty", [0.0], k=1)
+
+    # Dense ranks b2 first, but b1 is near the top of both rankings
+    assert [doc.page_content for doc in documents] == ["SKU-4411 warranty terms"]
+
+
+def test_dense_only_while_the_lexical_index_builds(collection, monkeypatch):
+    monkeypatch.setattr(hybrid, "get_lexical_index", lambda name, coll: None)
+
+    documents = hybrid.hybrid_search("profile", "SKU-4411", [0.0], k=2)
+
+    assert [doc.page_content for doc in documents] == ["office opening hours", "quarterly revenue summary"]
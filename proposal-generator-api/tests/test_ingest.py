@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+for module in ("pymupdf4llm", "pymupdf", "google.generativeai", "chromadb", "langchain_chroma", "langchain_core"):
+    pytest.importorskip(module)
+
+from app.RAG import ingest  # noqa: E402
+from app.RAG.ingest import IngestionJob, job_status  # noqa: E402
+
+
+class RecordingIndex:
+    def __init__(self):
+        self.saved = []
+
+    def save_job(self, record):
+        self.saved.append(record)
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = RecordingIndex()
+    monkeypatch.setattr(ingest, "get_document_index", lambda: index)
+    return index
+
+
+def _job():
+    return IngestionJob("doc-1", "collection", "file.pdf", "/tmp/file.pdf", "hash")
+
+
+def test_stage_only_moves_forward(index):
+    job = _job()
+    job.update(chunks_embedded=4)
+    assert job.stage == "embedding"
+
+    job.update(chunks_stored=2)
+    job.update(chunks_embedded=8)  # the embedding thread reports after the first stored batch
+    assert job.stage == "storing"
+
+
+def test_counters_never_decrease(index):
+    job = _job()
+    job.update(chunks_total=10, chunks_embedded=6)
+    job.update(chunks_embedded=3, chunks_total=8)
+
+    status = job.to_dict()
+    assert (status["chunks_embedded"], status["chunks_total"]) == (6, 10)
+
+
+def test_progress_writes_are_throttled_but_state_changes_are_not(index, monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_JOB_SYNC_INTERVAL", 60.0)
+    job = _job()
+    for embedded in range(1, 6):
+        job.update(chunks_embedded=embedded)
+    assert len(index.saved) == 1
+
+    job.set_state(status="completed", stage="done")
+    assert len(index.saved) == 2
+    assert index.saved[-1]["status"] == "completed"
+
+
+def test_abandoned_job_is_reported_failed(index):
+    job = _job()
+    job.set_state(status="processing", started_at=time.time())
+    record = {**index.saved[-1], "updated_at": time.time() - ingest.INGEST_JOB_STALE_AFTER - 1}
+
+    assert job_status(record)["status"] == "failed"
+    assert job_status(index.saved[-1])["status"] == "processing"
@@ -0,0 +1,50 @@
+from app.RAG.lexical_index import LexicalIndex, tokenize
+
+
+def _index():
+    index = LexicalIndex()
+    index.add(
+        ["a1", "a2", "b1", "b2"],
+        ["invoice SKU-4411 shipped", "payment terms net 30", "invoice overdue reminder", "SKU-4411 pricing sheet"],
+        [{"file_id": "a"}, {"file_id": "a"}, {"file_id": "b"}, {"file_id": "b"}]
+    )
+    return index
+
+
+def test_tokenize_keeps_identifiers_and_numbers():
+    assert tokenize("SKU-4411 costs $30") == ["sku", "4411", "costs", "30"]
+
+
+def test_search_ranks_by_bm25():
+    ranked = _index().search("invoice SKU-4411", 4)
+
+    assert [chunk_id for chunk_id, _ in ranked][0] == "a1"  # the only chunk with every term
+    assert {chunk_id for chunk_id, _ in ranked} == {"a1", "b1", "b2"}
+    scores = [score for _, score in ranked]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_file_filter_applies_before_the_limit():
+    index = _index()
+
+    assert [chunk_id for chunk_id, _ in index.search("invoice", 1, file_ids=["b"])] == ["b1"]
+    assert index.search("payment", 5, file_ids=["b"]) == []
+
+
+def test_removed_chunks_are_not_returned():
+    index = _index()
+    index.remove_file("a")
+    index.remove_ids(["b2"])
+
+    assert [chunk_id for chunk_id, _ in index.search("invoice SKU-4411", 5)] == ["b1"]
+    assert len(index) == 1
+
+
+def test_compaction_keeps_results():
+    index = _index()
+    index.add([f"x{i}" for i in range(8)], ["filler text"] * 8, [{"file_id": "x"}] * 8)
+    index.remove_file("x")
+
+    assert index.stats()["compactions"] == 1
+    assert index.stats()["tombstones"] == 0
+    assert [chunk_id for chunk_id, _ in index.search("pricing", 5, file_ids=["b"])] == ["b2"]